@@ -0,0 +1,270 @@
+"""Contagens agregadas calculadas uma única vez sobre códigos inteiros."""
+from __future__ import annotations
+
+import math
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from importacao import importar_sob_demanda
+
+np = importar_sob_demanda("numpy")
+pd = importar_sob_demanda("pandas")
+
+Agrupamento = Tuple[str, ...]
+Contagens = Dict[Agrupamento, "pd.Series"]
+
+# Acima deste número de combinações possíveis o bincount desperdiçaria memória
+LIMITE_BINCOUNT = 1 << 22
+# Acima deste, o código combinado das colunas não caberia num int64
+LIMITE_CODIGO_COMBINADO = 1 << 62
+
+
+def planejar_agrupamentos(especs: Iterable[Dict]) -> List[Agrupamento]:
+    """Reúne, sem repetição, os agrupamentos declarados em ``contagens`` nas especificações."""
+    agrupamentos: List[Agrupamento] = []
+    for spec in especs:
+        for colunas in spec.get("contagens", []):
+            agrupamento = tuple(colunas)
+            if agrupamento not in agrupamentos:
+                agrupamentos.append(agrupamento)
+    return agrupamentos
+
+
+def fatorar(serie: pd.Series) -> Tuple[np.ndarray, pd.Index]:
+    """Devolve códigos inteiros (-1 para ausentes) e os valores distintos ordenados."""
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        return serie.cat.codes.to_numpy(dtype=np.int64), serie.cat.categories
+    try:
+        codigos, valores = pd.factorize(serie, sort=True)
+    except TypeError:
+        # Tipos misturados que não se ordenam: mantém a ordem de aparição
+        codigos, valores = pd.factorize(serie, sort=False)
+    return codigos.astype(np.int64), pd.Index(valores)
+
+
+def _contar_combinacoes(combinado: np.ndarray, tamanho: int) -> Tuple[np.ndarray, np.ndarray]:
+    if tamanho <= LIMITE_BINCOUNT:
+        quantidades = np.bincount(combinado, minlength=tamanho)
+        presentes = np.flatnonzero(quantidades)
+        return presentes, quantidades[presentes]
+    return np.unique(combinado, return_counts=True)
+
+
+def _valores_dos_codigos(valores: pd.Index, codigos: np.ndarray) -> pd.Index:
+    # Índices inteiros não aceitam preenchimento; sem código -1 (ausente) ele não é necessário
+    if (codigos < 0).any():
+        return valores.take(codigos, allow_fill=True, fill_value=np.nan)
+    return valores.take(codigos)
+
+
+def calcular_contagens(df: pd.DataFrame, agrupamentos: Sequence[Agrupamento]) -> Contagens:
+    """Conta as combinações de valores de cada agrupamento.
+
+    Cada coluna é fatorada uma única vez, mesmo que apareça em vários
+    agrupamentos; as contagens saem de ``np.bincount`` sobre os códigos
+    combinados. O resultado de cada agrupamento é uma série indexada pelos
+    valores (``MultiIndex`` quando há mais de uma coluna), em ordem
+    crescente, incluindo as combinações com valores ausentes (``NaN``).
+
+    Args:
+        df (pd.DataFrame): O DataFrame pré-processado.
+        agrupamentos (Sequence[Tuple[str, ...]]): As colunas de cada contagem.
+
+    Returns:
+        Dict[Tuple[str, ...], pd.Series]: As contagens por agrupamento.
+    """
+    fatorados: Dict[str, Tuple[np.ndarray, pd.Index]] = {}
+    contagens: Contagens = {}
+    for agrupamento in agrupamentos:
+        for coluna in agrupamento:
+            if coluna not in fatorados:
+                fatorados[coluna] = fatorar(df[coluna])
+
+        bases = [len(fatorados[coluna][1]) + 1 for coluna in agrupamento]
+        tamanho = math.prod(bases)
+        if tamanho <= LIMITE_CODIGO_COMBINADO:
+            # Código 0 reservado para ausentes em cada coluna
+            combinado = np.zeros(len(df), dtype=np.int64)
+            for coluna, base in zip(agrupamento, bases):
+                combinado = combinado * base + (fatorados[coluna][0] + 1)
+
+            presentes, quantidades = _contar_combinacoes(combinado, tamanho)
+
+            codigos_presentes = []
+            resto = presentes
+            for base in reversed(bases):
+                codigos_presentes.append(resto % base - 1)
+                resto = resto // base
+            codigos_presentes.reverse()
+        else:
+            # Muitas colunas de alta cardinalidade estourariam o código combinado:
+            # conta as linhas de códigos, que saem na mesma ordem lexicográfica
+            linhas, quantidades = np.unique(
+                np.column_stack([fatorados[coluna][0] for coluna in agrupamento]), axis=0, return_counts=True
+            )
+            codigos_presentes = list(linhas.T)
+
+        niveis = [
+            _valores_dos_codigos(fatorados[coluna][1], codigos)
+            for coluna, codigos in zip(agrupamento, codigos_presentes)
+        ]
+
+        if len(agrupamento) == 1:
+            indice = niveis[0].rename(agrupamento[0])
+        else:
+            indice = pd.MultiIndex.from_arrays(niveis, names=list(agrupamento))
+        contagens[agrupamento] = pd.Series(quantidades.astype(np.int64), index=indice, name="qtd")
+    return contagens
+
+
+def obter_contagem(
+    df: pd.DataFrame,
+    contagens: Optional[Contagens],
+    *colunas: str,
+    incluir_ausentes: bool = False,
+) -> pd.Series:
+    """Busca a contagem pré-calculada do agrupamento, calculando-a se faltar.
+
+    Sem ``incluir_ausentes`` as combinações com algum valor ausente são
+    descartadas, como no ``groupby`` padrão do pandas.
+    """
+    agrupamento = tuple(colunas)
+    if contagens is not None and agrupamento in contagens:
+        contagem = contagens[agrupamento]
+    else:
+        contagem = calcular_contagens(df, [agrupamento])[agrupamento]
+    if incluir_ausentes:
+        return contagem
+    if isinstance(contagem.index, pd.MultiIndex):
+        completos = np.ones(len(contagem), dtype=bool)
+        for nivel in range(contagem.index.nlevels):
+            completos &= ~pd.isna(contagem.index.get_level_values(nivel))
+        return contagem[completos]
+    return contagem[contagem.index.notna()]
+
+
+def agrupamentos_particionados(agrupamentos: Iterable[Sequence[str]], coluna: str) -> List[Agrupamento]:
+    """Os mesmos agrupamentos, cada um também agrupado por ``coluna`` (à frente, se ainda não a tiver)."""
+    return [tuple(colunas) if coluna in colunas else (coluna, *colunas) for colunas in agrupamentos]
+
+
+def particionar_contagens(
+    contagens: Contagens,
+    agrupamentos: Sequence[Agrupamento],
+    coluna: str,
+) -> Dict[object, Contagens]:
+    """Separa, por valor de ``coluna``, contagens calculadas com os agrupamentos particionados.
+
+    ``contagens`` precisa trazer cada agrupamento de ``agrupamentos_particionados``;
+    uma única contagem agrupada por ``coluna`` vira uma contagem por valor,
+    no mesmo formato (e ordem) de ``calcular_contagens`` sobre as linhas com
+    aquele valor. ``coluna`` sai do índice quando não fazia parte do
+    agrupamento original. Linhas sem valor em ``coluna`` não entram em
+    nenhuma partição.
+
+    Args:
+        contagens (Contagens): Contagens com os agrupamentos particionados.
+        agrupamentos (Sequence[Tuple[str, ...]]): Os agrupamentos originais.
+        coluna (str): A coluna de partição.
+
+    Returns:
+        Dict[object, Contagens]: As contagens de cada valor, na ordem dos valores no índice.
+    """
+    particoes: Dict[object, Contagens] = {}
+    vazias: Dict[Agrupamento, pd.Series] = {}
+    for agrupamento, particionado in zip(agrupamentos, agrupamentos_particionados(agrupamentos, coluna)):
+        contagem = contagens[particionado]
+        nivel = particionado.index(coluna)
+        codigos, valores = fatorar(pd.Series(contagem.index.get_level_values(nivel)))
+        if coluna not in agrupamento:
+            contagem = pd.Series(contagem.to_numpy(), index=contagem.index.droplevel(nivel), name=contagem.name)
+        # Ordenação estável: dentro de cada valor as combinações mantêm a ordem original
+        ordem = np.argsort(codigos, kind="stable")
+        limites = np.searchsorted(codigos[ordem], np.arange(-1, len(valores)), side="right")
+        for codigo, valor in enumerate(valores):
+            inicio, fim = limites[codigo], limites[codigo + 1]
+            if inicio < fim:
+                particoes.setdefault(valor, {})[agrupamento] = contagem.iloc[ordem[inicio:fim]]
+        vazias[agrupamento] = contagem.iloc[:0]
+    # Sem nenhuma linha num agrupamento, o valor recebe a contagem vazia, não a global
+    for contagens_valor in particoes.values():
+        for agrupamento, vazia in vazias.items():
+            contagens_valor.setdefault(agrupamento, vazia)
+    return particoes
+
+
+def somar_contagens(total: Contagens, parcial: Contagens) -> Contagens:
+    """Acumula em ``total`` as contagens de ``parcial`` (por exemplo, de outro lote)."""
+    for agrupamento, contagem in parcial.items():
+        anterior = total.get(agrupamento)
+        if anterior is None:
+            total[agrupamento] = contagem
+            continue
+        combinado = pd.concat([anterior, contagem])
+        niveis = list(range(combinado.index.nlevels))
+        total[agrupamento] = combinado.groupby(level=niveis, dropna=False, sort=False).sum()
+    return total
+
+
+def _ordenar_contagem(contagem: pd.Series) -> pd.Series:
+    # Ausentes primeiro em cada nível, como o código 0 em calcular_contagens
+    niveis = [contagem.index.get_level_values(nivel) for nivel in range(contagem.index.nlevels)]
+    ordem = np.lexsort([fatorar(pd.Series(nivel))[0] for nivel in reversed(niveis)])
+    niveis = [nivel.take(ordem) for nivel in niveis]
+    if len(niveis) == 1:
+        indice = niveis[0]
+    else:
+        # Refaz o MultiIndex para que ausentes voltem a ser código -1, não um nível
+        indice = pd.MultiIndex.from_arrays(niveis, names=contagem.index.names)
+    return pd.Series(contagem.to_numpy(dtype=np.int64)[ordem], index=indice, name="qtd")
+
+
+def ordenar_contagens(contagens: Contagens) -> Contagens:
+    """Coloca contagens acumuladas na mesma ordem e tipo devolvidos por ``calcular_contagens``."""
+    return {agrupamento: _ordenar_contagem(contagem) for agrupamento, contagem in contagens.items()}
+
+
+def quantis_de_contagem(contagem: pd.Series, nivel_valor: str, quantis: Sequence[float]) -> pd.DataFrame:
+    """Quantis de ``nivel_valor`` em cada grupo formado pelos demais níveis da contagem.
+
+    Equivale a ``groupby(...)[nivel_valor].quantile(q)`` (interpolação
+    linear) sobre as linhas originais, mas parte das contagens: cada valor
+    distinto pesa a sua quantidade, então o resultado também vale para
+    contagens somadas entre lotes ou planilhas. Tudo é vetorizado; as
+    posições de cada quantil saem de um ``searchsorted`` sobre a soma acumulada.
+
+    Args:
+        contagem (pd.Series): Contagem com ``MultiIndex`` (ver ``calcular_contagens``), sem ausentes.
+        nivel_valor (str): O nível numérico cujos quantis são calculados.
+        quantis (Sequence[float]): Os quantis desejados, entre 0 e 1.
+
+    Returns:
+        pd.DataFrame: Uma linha por grupo, com ``qtd`` e uma coluna por quantil.
+    """
+    grupos = [nome for nome in contagem.index.names if nome != nivel_valor]
+    quadro = contagem[contagem > 0].reset_index()
+    quadro.sort_values(grupos + [nivel_valor], kind="stable", inplace=True)
+    valores = quadro[nivel_valor].to_numpy(dtype=np.float64)
+    acumulado = np.cumsum(quadro["qtd"].to_numpy(dtype=np.int64))
+
+    # Linhas já ordenadas por grupo: cada grupo ocupa um trecho contíguo
+    novo_grupo = np.zeros(len(quadro), dtype=bool)
+    novo_grupo[:1] = True
+    for coluna in grupos:
+        serie = quadro[coluna].to_numpy()
+        novo_grupo[1:] |= serie[1:] != serie[:-1]
+    inicios = np.flatnonzero(novo_grupo)
+    fins = np.append(inicios[1:], len(quadro)) - 1
+    antes = np.where(inicios > 0, acumulado[inicios - 1], 0)
+    totais = acumulado[fins] - antes
+
+    resultado = quadro.iloc[inicios][grupos].reset_index(drop=True)
+    resultado["qtd"] = totais
+    for quantil in quantis:
+        posicao = (totais - 1) * quantil
+        abaixo = np.floor(posicao).astype(np.int64)
+        acima = np.minimum(abaixo + 1, totais - 1)
+        # O elemento de posição p (0-based) do grupo está na primeira linha com acumulado > p
+        inferior = valores[np.searchsorted(acumulado, antes + abaixo, side="right")]
+        superior = valores[np.searchsorted(acumulado, antes + acima, side="right")]
+        resultado[quantil] = inferior + (posicao - abaixo) * (superior - inferior)
+    return resultado
@@ -0,0 +1,268 @@
+#!/usr/bin/env -S ./.venv/bin/python
+"""Mede o desempenho de cada fase do build sobre exportações sintéticas do SUAP."""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from metricas import pico_rss_mb, rss_atual_mb
+
+LINHAS_PADRAO = [10_000, 100_000]
+DIRETORIO_PADRAO = Path("out/bench")
+VERSAO_RELATORIO = 1
+# Folga para o ruído entre execuções ao verificar regressões (--tolerancia)
+TOLERANCIA_PADRAO_PCT = 10.0
+# O --check lê só o cabeçalho: o tempo não deve crescer com o número de linhas
+LIMITE_CABECALHO_S = 0.5
+
+
+@contextmanager
+def medir(fases: Dict[str, Dict], nome: str, linhas: int) -> Iterator[None]:
+    inicio = time.perf_counter()
+    yield
+    segundos = time.perf_counter() - inicio
+    rss = rss_atual_mb()
+    fases[nome] = {
+        "segundos": round(segundos, 6),
+        "linhas_por_segundo": round(linhas / segundos, 1) if segundos > 0 else None,
+        "pico_rss_mb": round(pico_rss_mb(), 1),
+        "rss_mb": None if rss is None else round(rss, 1),
+    }
+
+
+def medir_arquivo(caminho: Path, linhas: int) -> Dict:
+    """Roda o build fase a fase sobre ``caminho`` e devolve os tempos e a memória.
+
+    Deve rodar num processo próprio, para que o pico de RSS seja só deste arquivo.
+    """
+    import construir_datasets as cd
+    from agregacao import calcular_contagens, planejar_agrupamentos
+
+    especs = cd.especs_padrao()
+    fases: Dict[str, Dict] = {}
+    construtores: Dict[str, Dict] = {}
+    inicio_total = time.perf_counter()
+
+    with medir(fases, "cabecalho_check", linhas):
+        cd.ler_cabecalho_planilha(caminho)
+    with medir(fases, "carregar", linhas):
+        cabecalho = cd.ler_cabecalho(caminho)
+        df = cd.carregar_dataframe(caminho, cd.colunas_necessarias(especs.values()), cabecalho)
+    with medir(fases, "pre_processar", linhas):
+        df, fontes_disponiveis = cd.pre_processar(
+            df, copiar=False, derivadas=cd.derivadas_necessarias(especs.values())
+        )
+    with medir(fases, "contagens", linhas):
+        contagens = calcular_contagens(df, planejar_agrupamentos(especs.values()))
+
+    with tempfile.TemporaryDirectory() as diretorio_saida:
+        for nome_arquivo, spec in especs.items():
+            tempos: Dict[str, Dict] = {}
+            with medir(tempos, "construir", linhas):
+                gerado, mensagem = cd.gerar_dataset(df, fontes_disponiveis, nome_arquivo, spec, contagens)
+            registro = {"construir_s": tempos["construir"]["segundos"]}
+            if gerado is None:
+                registro["pulado"] = mensagem
+            else:
+                with medir(tempos, "escrever", linhas):
+                    destino = Path(diretorio_saida) / nome_arquivo
+                    qualidade_brotli = spec.get("qualidade_brotli", cd.QUALIDADE_BROTLI)
+                    cd.escrever_json(gerado, destino.with_suffix(".json"), qualidade_brotli)
+                    cd.escrever_csv(gerado, destino, qualidade_brotli)
+                registro["escrever_s"] = tempos["escrever"]["segundos"]
+                registro["linhas_saida"] = len(gerado)
+            construtores[nome_arquivo] = registro
+
+    fases["construtores"] = {
+        "segundos": round(sum(r["construir_s"] for r in construtores.values()), 6),
+        "pico_rss_mb": round(pico_rss_mb(), 1),
+    }
+    fases["escrever_saidas"] = {
+        "segundos": round(sum(r.get("escrever_s", 0.0) for r in construtores.values()), 6),
+        "pico_rss_mb": round(pico_rss_mb(), 1),
+    }
+    total = time.perf_counter() - inicio_total
+    return {
+        "linhas": linhas,
+        "arquivo": str(caminho),
+        "tamanho_arquivo_mb": round(caminho.stat().st_size / (1024 * 1024), 2),
+        "total_s": round(total, 6),
+        "linhas_por_segundo": round(linhas / total, 1),
+        "pico_rss_mb": round(pico_rss_mb(), 1),
+        "fases": fases,
+        "construtores": construtores,
+    }
+
+
+def _medir_em_subprocesso(caminho: Path, linhas: int) -> Dict:
+    comando = [sys.executable, __file__, "--medir-arquivo", str(caminho), "--linhas", str(linhas)]
+    resultado = subprocess.run(
+        comando,
+        check=True,
+        capture_output=True,
+        text=True,
+        cwd=Path(__file__).resolve().parent,
+    )
+    return json.loads(resultado.stdout)
+
+
+def executar(linhas: Iterable[int], diretorio: Path, semente: int = 0, extras: int = 4) -> Dict:
+    """Gera (ou reaproveita) as exportações sintéticas e mede cada tamanho em processo próprio.
+
+    Args:
+        linhas (Iterable[int]): Os tamanhos de exportação a medir.
+        diretorio (Path): Onde guardar as exportações geradas.
+        semente (int): Semente do gerador sintético.
+        extras (int): Colunas adicionais fora de SINONIMOS_COLUNAS.
+
+    Returns:
+        Dict: O relatório completo, pronto para ``json.dumps``.
+    """
+    import pandas as pd
+
+    from gerar_sintetico import exportacao_em_cache
+
+    execucoes: List[Dict] = []
+    for quantidade in linhas:
+        inicio = time.perf_counter()
+        caminho = exportacao_em_cache(diretorio.resolve(), quantidade, semente, extras)
+        geracao = time.perf_counter() - inicio
+        print(f"Medindo {quantidade} linhas ({caminho.name})", file=sys.stderr)
+        execucao = _medir_em_subprocesso(caminho, quantidade)
+        execucao["geracao_s"] = round(geracao, 3)
+        execucoes.append(execucao)
+    return {
+        "versao": VERSAO_RELATORIO,
+        "gerado_em": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "plataforma": platform.platform(),
+        "cpus": os.cpu_count(),
+        "semente": semente,
+        "execucoes": execucoes,
+    }
+
+
+def comparar(atual: Dict, anterior: Dict) -> List[str]:
+    """Compara os tempos por fase com um relatório anterior (mesmo número de linhas)."""
+    anteriores = {execucao["linhas"]: execucao for execucao in anterior.get("execucoes", [])}
+    linhas_relatorio = []
+    for execucao in atual["execucoes"]:
+        base = anteriores.get(execucao["linhas"])
+        if base is None:
+            continue
+        pares = [("total", execucao["total_s"], base["total_s"])]
+        for fase, dados in execucao["fases"].items():
+            if fase in base.get("fases", {}):
+                pares.append((fase, dados["segundos"], base["fases"][fase]["segundos"]))
+        for fase, agora, antes in pares:
+            variacao = (agora - antes) / antes * 100 if antes else 0.0
+            linhas_relatorio.append(
+                f"{execucao['linhas']:>9} {fase:<15} {antes:9.3f}s -> {agora:9.3f}s ({variacao:+.1f}%)"
+            )
+    return linhas_relatorio
+
+
+def regressoes(atual: Dict, anterior: Dict, tolerancia_pct: float = TOLERANCIA_PADRAO_PCT) -> List[str]:
+    """Execuções cujo tempo total passou do anterior (mesmo número de linhas) mais a tolerância."""
+    anteriores = {execucao["linhas"]: execucao for execucao in anterior.get("execucoes", [])}
+    falhas = []
+    for execucao in atual["execucoes"]:
+        base = anteriores.get(execucao["linhas"])
+        if base is None:
+            continue
+        limite = base["total_s"] * (1 + tolerancia_pct / 100)
+        if execucao["total_s"] > limite:
+            falhas.append(
+                f"{execucao['linhas']} linhas: {execucao['total_s']:.3f}s > {base['total_s']:.3f}s "
+                f"+ {tolerancia_pct:g}% ({limite:.3f}s)"
+            )
+    return falhas
+
+
+def cabecalhos_lentos(relatorio: Dict, limite_s: float = LIMITE_CABECALHO_S) -> List[str]:
+    """Execuções em que a leitura só do cabeçalho (a do ``--check``) passou de ``limite_s``."""
+    falhas = []
+    for execucao in relatorio["execucoes"]:
+        segundos = execucao["fases"]["cabecalho_check"]["segundos"]
+        if segundos > limite_s:
+            falhas.append(f"{execucao['linhas']} linhas: cabeçalho em {segundos:.3f}s > {limite_s:g}s")
+    return falhas
+
+
+def parse_args(argv: Optional[Iterable[str]] = None):
+    parser = argparse.ArgumentParser(description="Mede o desempenho do build de datasets")
+    parser.add_argument(
+        "--linhas",
+        type=int,
+        nargs="+",
+        default=LINHAS_PADRAO,
+        help="Tamanhos das exportações sintéticas (padrão: 10000 100000)",
+    )
+    parser.add_argument(
+        "--dir",
+        dest="diretorio",
+        default=str(DIRETORIO_PADRAO),
+        help=f"Diretório das exportações geradas (padrão: {DIRETORIO_PADRAO})",
+    )
+    parser.add_argument("--semente", type=int, default=0, help="Semente do gerador sintético (padrão: 0)")
+    parser.add_argument(
+        "--extras",
+        type=int,
+        default=4,
+        help="Colunas adicionais fora de SINONIMOS_COLUNAS (padrão: 4)",
+    )
+    parser.add_argument("--json", dest="caminho_json", help="Grava o relatório neste arquivo (padrão: stdout)")
+    parser.add_argument("--comparar", dest="caminho_anterior", help="Relatório JSON anterior para comparar")
+    parser.add_argument(
+        "--tolerancia",
+        type=float,
+        metavar="PCT",
+        help=f"Com --comparar, sai com erro se o tempo total piorar mais que PCT%% (ex.: {TOLERANCIA_PADRAO_PCT:g})",
+    )
+    parser.add_argument("--medir-arquivo", dest="medir_arquivo", help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[Iterable[str]] = None) -> None:
+    args = parse_args(argv)
+    if args.medir_arquivo:
+        # Modo interno: um único arquivo, relatório no stdout
+        print(json.dumps(medir_arquivo(Path(args.medir_arquivo), args.linhas[0])))
+        return
+
+    relatorio = executar(args.linhas, Path(args.diretorio), args.semente, args.extras)
+    texto = json.dumps(relatorio, ensure_ascii=False, indent=2)
+    if args.caminho_json:
+        Path(args.caminho_json).write_text(texto + "\n", encoding="utf-8")
+        print(f"Relatório: {args.caminho_json}", file=sys.stderr)
+    else:
+        print(texto)
+
+    falhas = cabecalhos_lentos(relatorio)
+    for falha in falhas:
+        print(f"Leitura do cabeçalho lenta: {falha}", file=sys.stderr)
+
+    if args.caminho_anterior:
+        anterior = json.loads(Path(args.caminho_anterior).read_text(encoding="utf-8"))
+        for linha in comparar(relatorio, anterior):
+            print(linha, file=sys.stderr)
+        if args.tolerancia is not None:
+            regredidas = regressoes(relatorio, anterior, args.tolerancia)
+            for falha in regredidas:
+                print(f"Regressão: {falha}", file=sys.stderr)
+            falhas += regredidas
+    if falhas:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Cache em disco dos quadros lidos da planilha mestre.
+
+As entradas são pickles, e ``pickle.load`` executa o que o arquivo mandar:
+o diretório de cache só pode ser um em que apenas o próprio usuário grava.
+Por isso o padrão fica no cache do usuário, e não ao lado da planilha, cujo
+diretório pode ser compartilhado.
+"""
+import os
+import pickle
+import sys
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+NOME_DIRETORIO_CACHE = "tabula"
+EXTENSAO = ".pkl"
+LIMITE_PADRAO_MB = 512
+
+# Diretórios em que a gravação já falhou (o aviso sai uma vez por diretório)
+_SEM_GRAVACAO: set = set()
+
+
+def diretorio_cache_padrao() -> Path:
+    """``$XDG_CACHE_HOME/tabula`` (ou ``~/.cache/tabula``), do próprio usuário."""
+    base = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(base) / NOME_DIRETORIO_CACHE
+
+
+def chave_cache(entrada: Dict, *partes: str) -> str:
+    """Monta a chave a partir do hash e do mtime da entrada (ver ``manifesto.descrever_entrada``)."""
+    return "-".join([entrada["sha256"][:32], str(entrada["mtime_ns"]), *partes])
+
+
+def ler_cache(diretorio: Path, chave: str) -> Optional[Any]:
+    caminho = diretorio / f"{chave}{EXTENSAO}"
+    try:
+        with caminho.open("rb") as arquivo:
+            objeto = pickle.load(arquivo)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+        return None
+    # Marca o uso para a política de descarte (mais antigo sai primeiro)
+    try:
+        os.utime(caminho)
+    except OSError:
+        pass
+    return objeto
+
+
+def gravar_cache(diretorio: Path, chave: str, objeto: Any, limite_mb: int = LIMITE_PADRAO_MB) -> bool:
+    """Grava ``objeto`` de forma atômica e descarta entradas antigas acima de ``limite_mb``.
+
+    Um diretório sem permissão de escrita (ou um disco cheio) não interrompe
+    o build: o cache só deixa de ser gravado. Devolve se a entrada foi gravada.
+    """
+    caminho = diretorio / f"{chave}{EXTENSAO}"
+    temporario = caminho.with_name(f".{caminho.name}.tmp")
+    try:
+        diretorio.mkdir(parents=True, exist_ok=True)
+        with temporario.open("wb") as arquivo:
+            pickle.dump(objeto, arquivo, protocol=pickle.HIGHEST_PROTOCOL)
+        temporario.replace(caminho)
+    except OSError as erro:
+        try:
+            temporario.unlink(missing_ok=True)
+        except OSError:
+            pass
+        if diretorio not in _SEM_GRAVACAO:
+            _SEM_GRAVACAO.add(diretorio)
+            print(f"Aviso: cache de quadros não gravado em {diretorio} ({erro})", file=sys.stderr)
+        return False
+    aplicar_limite(diretorio, limite_mb * 1024 * 1024, preservar=caminho)
+    return True
+
+
+def aplicar_limite(diretorio: Path, limite_bytes: int, preservar: Optional[Path] = None) -> None:
+    """Remove as entradas usadas há mais tempo até o cache caber em ``limite_bytes``."""
+    entradas = []
+    for caminho in diretorio.glob(f"*{EXTENSAO}"):
+        try:
+            estado = caminho.stat()
+        except OSError:
+            continue
+        entradas.append((estado.st_mtime_ns, estado.st_size, caminho))
+    total = sum(tamanho for _, tamanho, _ in entradas)
+    for _, tamanho, caminho in sorted(entradas, key=lambda entrada: entrada[0]):
+        if total <= limite_bytes:
+            break
+        if caminho == preservar:
+            continue
+        try:
+            caminho.unlink()
+        except OSError:
+            continue
+        total -= tamanho
@@ -0,0 +1,198 @@
+#!/usr/bin/env -S ./.venv/bin/python
+"""Teste de carga local do servidor do dashboard: vazão e latência sob clientes simultâneos."""
+import argparse
+import http.client
+import itertools
+import json
+import statistics
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import urlsplit
+
+CAMINHOS_PADRAO = ["/", "/datasets/datasets.bundle.json", "/datasets/turno.json"]
+
+
+class Trabalhador(threading.Thread):
+    """Cliente com conexão persistente que faz requisições até a cota compartilhada acabar."""
+
+    def __init__(
+        self,
+        host: str,
+        porta: int,
+        caminhos: List[str],
+        cabecalhos: Dict[str, str],
+        etags: Dict[str, str],
+        senhas: "itertools.count",
+        total: int,
+    ) -> None:
+        super().__init__(daemon=True)
+        self.host = host
+        self.porta = porta
+        self.caminhos = caminhos
+        self.cabecalhos = cabecalhos
+        self.etags = etags
+        self.senhas = senhas
+        self.total = total
+        self.latencias: List[float] = []
+        self.status: Counter = Counter()
+        self.bytes = 0
+
+    def run(self) -> None:
+        conexao = http.client.HTTPConnection(self.host, self.porta, timeout=30)
+        for senha in self.senhas:
+            if senha >= self.total:
+                break
+            caminho = self.caminhos[senha % len(self.caminhos)]
+            cabecalhos = dict(self.cabecalhos)
+            if caminho in self.etags:
+                cabecalhos["If-None-Match"] = self.etags[caminho]
+            inicio = time.perf_counter()
+            try:
+                conexao.request("GET", caminho, headers=cabecalhos)
+                resposta = conexao.getresponse()
+                self.bytes += len(resposta.read())
+            except (OSError, http.client.HTTPException):
+                self.status["erro"] += 1
+                conexao.close()
+                conexao = http.client.HTTPConnection(self.host, self.porta, timeout=30)
+                continue
+            self.latencias.append(time.perf_counter() - inicio)
+            self.status[str(resposta.status)] += 1
+        conexao.close()
+
+
+def obter_etags(host: str, porta: int, caminhos: List[str], cabecalhos: Dict[str, str]) -> Dict[str, str]:
+    """ETag atual de cada caminho, para simular clientes com o dashboard já em cache."""
+    etags = {}
+    conexao = http.client.HTTPConnection(host, porta, timeout=30)
+    for caminho in caminhos:
+        conexao.request("GET", caminho, headers=cabecalhos)
+        resposta = conexao.getresponse()
+        resposta.read()
+        etag = resposta.getheader("ETag")
+        if etag:
+            etags[caminho] = etag
+    conexao.close()
+    return etags
+
+
+def percentil(valores: List[float], fracao: float) -> Optional[float]:
+    if not valores:
+        return None
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(fracao * len(ordenados)))]
+
+
+def executar_carga(
+    url: str,
+    caminhos: List[str],
+    requisicoes: int,
+    concorrencia: int,
+    codificacao: str = "br, gzip",
+    condicional: bool = False,
+) -> Dict:
+    """Dispara ``requisicoes`` GETs em ``concorrencia`` conexões simultâneas contra ``url``.
+
+    Args:
+        url (str): A raiz do servidor (``http://host:porta``).
+        caminhos (List[str]): Os caminhos requisitados, em rodízio.
+        requisicoes (int): O total de requisições.
+        concorrencia (int): O número de clientes simultâneos.
+        codificacao (str): O ``Accept-Encoding`` enviado (vazio para nenhum).
+        condicional (bool): Se deve enviar ``If-None-Match`` com a ETag atual.
+
+    Returns:
+        Dict: Vazão, latências em milissegundos, status e bytes recebidos.
+    """
+    partes = urlsplit(url)
+    host, porta = partes.hostname or "localhost", partes.port or 80
+    cabecalhos = {"Accept-Encoding": codificacao} if codificacao else {}
+    etags = obter_etags(host, porta, caminhos, cabecalhos) if condicional else {}
+
+    senhas = itertools.count()
+    trabalhadores = [
+        Trabalhador(host, porta, caminhos, cabecalhos, etags, senhas, requisicoes) for _ in range(concorrencia)
+    ]
+    inicio = time.perf_counter()
+    for trabalhador in trabalhadores:
+        trabalhador.start()
+    for trabalhador in trabalhadores:
+        trabalhador.join()
+    segundos = time.perf_counter() - inicio
+
+    latencias = [latencia for trabalhador in trabalhadores for latencia in trabalhador.latencias]
+    status: Counter = Counter()
+    for trabalhador in trabalhadores:
+        status.update(trabalhador.status)
+
+    def ms(valor: Optional[float]) -> Optional[float]:
+        return None if valor is None else round(valor * 1000, 2)
+
+    return {
+        "url": url,
+        "caminhos": caminhos,
+        "requisicoes": requisicoes,
+        "concorrencia": concorrencia,
+        "accept_encoding": codificacao,
+        "condicional": condicional,
+        "segundos": round(segundos, 3),
+        "requisicoes_por_segundo": round(len(latencias) / segundos, 1) if segundos > 0 else None,
+        "latencia_ms": {
+            "media": ms(statistics.fmean(latencias)) if latencias else None,
+            "p50": ms(percentil(latencias, 0.50)),
+            "p95": ms(percentil(latencias, 0.95)),
+            "p99": ms(percentil(latencias, 0.99)),
+            "max": ms(max(latencias)) if latencias else None,
+        },
+        "status": dict(sorted(status.items())),
+        "bytes_recebidos": sum(trabalhador.bytes for trabalhador in trabalhadores),
+    }
+
+
+def parse_args(argv: Optional[Iterable[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Mede a vazão do servidor do dashboard")
+    parser.add_argument("--url", default="http://localhost:8000", help="Raiz do servidor (padrão: http://localhost:8000)")
+    parser.add_argument(
+        "--caminhos",
+        nargs="+",
+        default=CAMINHOS_PADRAO,
+        metavar="CAMINHO",
+        help=f"Caminhos requisitados em rodízio (padrão: {' '.join(CAMINHOS_PADRAO)})",
+    )
+    parser.add_argument("--requisicoes", type=int, default=2000, help="Total de requisições (padrão: 2000)")
+    parser.add_argument("--concorrencia", type=int, default=16, help="Clientes simultâneos (padrão: 16)")
+    parser.add_argument(
+        "--accept-encoding",
+        dest="codificacao",
+        default="br, gzip",
+        help="Accept-Encoding enviado; '' desliga a compressão (padrão: 'br, gzip')",
+    )
+    parser.add_argument(
+        "--condicional", action="store_true", help="Envia If-None-Match, como um navegador com cache"
+    )
+    parser.add_argument("--json", dest="caminho_json", help="Grava o resultado neste arquivo (padrão: stdout)")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[Iterable[str]] = None) -> None:
+    args = parse_args(argv)
+    if args.requisicoes < 1 or args.concorrencia < 1:
+        sys.exit("--requisicoes e --concorrencia devem ser positivos")
+    try:
+        resultado = executar_carga(
+            args.url, args.caminhos, args.requisicoes, args.concorrencia, args.codificacao, args.condicional
+        )
+    except OSError as erro:
+        sys.exit(f"Servidor inacessível em {args.url}: {erro}")
+    texto = json.dumps(resultado, ensure_ascii=False, indent=2)
+    if args.caminho_json:
+        with open(args.caminho_json, "w", encoding="utf-8") as arquivo:
+            arquivo.write(texto + "\n")
+    print(texto)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,69 @@
 #!/usr/bin/env -S ./.venv/bin/python
 """Constrói datasets CSV agregados a partir da exportação mestre do SUAP."""
+from __future__ import annotations
+
 import argparse
+import glob
+import hashlib
+import io
+import json
 import math
 import re
+import shutil
 import sys
-import importlib
+import multiprocessing
+import warnings
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager, redirect_stdout
 from datetime import datetime, timedelta
 from pathlib import Path
 import unicodedata
-from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from agregacao import (
+    Agrupamento,
+    Contagens,
+    agrupamentos_particionados,
+    calcular_contagens,
+    ordenar_contagens,
+    particionar_contagens,
+    planejar_agrupamentos,
+    somar_contagens,
+)
+from cache_quadros import (
+    LIMITE_PADRAO_MB,
+    NOME_DIRETORIO_CACHE,
+    chave_cache,
+    diretorio_cache_padrao,
+    gravar_cache,
+    ler_cache,
+)
+from construtores import CONSTRUTORES, carregar_construtor
+from grafico_utils import mapear_por_categoria
+from importacao import importar_sob_demanda
+from leitura_lotes import ler_cabecalho_planilha, ler_planilha_em_lotes
+from manifesto import (
+    assinatura_construtor,
+    carregar_manifesto,
+    dataset_atualizado,
+    descrever_entrada,
+    hash_codigo_base,
+    salvar_manifesto,
+)
+from metricas import ColetorMetricas, PERFILADORES, ativar, coletor_ativo, etapa
+from saidas import (
+    QUALIDADE_BROTLI,
+    QUALIDADE_BROTLI_RAPIDA,
+    SUFIXOS_COMPRIMIDOS,
+    gravar_com_variantes,
+    gravar_indice_particoes,
+    gravar_pacote,
+)
+from vigilancia import INTERVALO_PADRAO, vigiar
 
-import pandas as pd
+# Carregados só no primeiro uso: --check e builds sem nada pendente não os importam
+np = importar_sob_demanda("numpy")
+pd = importar_sob_demanda("pandas")
 
 # Mapeamento de nomes de colunas canônicas para sinônimos (insensível a acentos e maiúsculas/minúsculas)
 SINONIMOS_COLUNAS = {
@@ -96,82 +149,219 @@ SINONIMOS_COLUNAS = {
 
 COLUNAS_DATA = ["data_matricula", "data_conclusao", "data_integralizacao"]
 
+EXTENSOES_PLANILHA = {".xls", ".xlsx", ".xlsm"}
+
+# Subdiretório do conjunto geral no modo com várias planilhas
+NOME_CONJUNTO_GERAL = "todos"
+
+# Colunas textuais de baixa cardinalidade mantidas como pd.Categorical após o pré-processamento
+COLUNAS_CATEGORICAS = [
+    "curso",
+    "situacao_curso",
+    "situacao_sistema",
+    "modalidade",
+    "turno",
+    "forma_ingresso",
+    "campus",
+    "cota_mec",
+    "cota_sistec",
+    "etnia_raca",
+    "necessidades_especiais",
+    "estado",
+    "cidade",
+    "polo",
+    "transporte_publico",
+    "transporte_tipo",
+    "tipo_escola_origem",
+    "natureza_participacao",
+]
+
+# Colunas derivadas em pre_processar e as colunas (canônicas ou derivadas) de que dependem
+DEPENDENCIAS_DERIVADAS = {
+    "status_simplificado": ["situacao_curso", "situacao_sistema"],
+    "percentual_progresso_num": ["percentual_progresso"],
+    "bucket_progresso": ["percentual_progresso_num"],
+    "tem_ne": ["necessidades_especiais"],
+    "tempo_curso_meses": ["data_matricula", "data_conclusao", "status_simplificado"],
+    "coorte_ano": ["ano_ingresso", "data_matricula"],
+}
+
+# Dimensões do cubo de contagens (cubo.csv), fatiado e somado no front-end. Sem
+# "curso": com ele o cubo fica quase uma linha por matrícula (qtd média ~1)
+DIMENSOES_CUBO = [
+    "campus",
+    "modalidade",
+    "turno",
+    "status_simplificado",
+    "cota_mec",
+    "etnia_raca",
+]
+
+# Colunas pelas quais os datasets podem ser particionados (--particoes) e as
+# usadas quando a opção vem sem argumentos
+DIMENSOES_PARTICAO = ["campus", "curso", "polo"]
+PARTICOES_PADRAO = ["campus", "curso"]
+
+# Subdiretório da saída com uma pasta por dimensão e valor de partição
+DIRETORIO_PARTICOES = "particoes"
+
+# Prefixos (texto normalizado) que definem cada situação simplificada, na ordem de avaliação
+PREFIXOS_STATUS = {
+    ("concl", "form"): "Concluído",
+    ("ativ", "curs"): "Ativo",
+    ("tranc",): "Trancado",
+    ("cancel", "evad", "desl"): "Evasão/Cancelado",
+}
+
+MARCADORES_NEGATIVOS_NE = (
+    "nao",
+    "naopossui",
+    "naoseaplica",
+    "naodeclarado",
+    "naoinformado",
+    "sem",
+    "0",
+)
+
+ROTULOS_BUCKET = ["0-25%", "25-50%", "50-75%", "75-100%"]
+
+DIAS_POR_MES = 30.4375
+
+# Cada especificação declara as contagens de que o construtor precisa em
+# "contagens"; todas são calculadas numa única passada antes dos construtores.
+# "pacote": False deixa o dataset fora do datasets.bundle (baixado sob demanda),
+# "qualidade_brotli" troca a qualidade das variantes .br dos arquivos grandes e
+# "opcional": True tira o dataset do build padrão (só sai com --only).
 ESPECS_SAIDA = {
     "alunos_por_situacao.csv": {
         "builder": "alunos_por_situacao",
         "requires": ["status_simplificado"],
         "sources_any": [["situacao_curso", "situacao_sistema"]],
+        "contagens": [["situacao_curso"], ["situacao_sistema"], ["status_simplificado"]],
     },
     "modalidade.csv": {
         "builder": "modalidade",
         "requires": ["modalidade"],
         "sources_all": ["modalidade"],
+        "contagens": [["modalidade"]],
     },
     "dist_percentual_progresso.csv": {
         "builder": "dist_percentual_progresso",
         "requires": ["bucket_progresso"],
         "sources_all": ["percentual_progresso"],
+        "contagens": [["bucket_progresso"]],
     },
     "turno.csv": {
         "builder": "turno",
         "requires": ["turno"],
         "sources_all": ["turno"],
+        "contagens": [["turno"]],
     },
     "forma_ingresso.csv": {
         "builder": "forma_ingresso",
         "requires": ["forma_ingresso"],
         "sources_all": ["forma_ingresso"],
+        "contagens": [["forma_ingresso"]],
     },
     "cota_mec.csv": {
         "builder": "cota_mec",
         "requires": ["cota_mec"],
         "sources_all": ["cota_mec"],
+        "contagens": [["cota_mec"]],
     },
     "cota_sistec.csv": {
         "builder": "cota_sistec",
         "requires": ["cota_sistec"],
         "sources_all": ["cota_sistec"],
+        "contagens": [["cota_sistec"]],
     },
     "cotas.csv": {
         "builder": "cotas",
         "requires": ["cota_mec", "cota_sistec"],
         "sources_all": ["cota_mec", "cota_sistec"],
+        "contagens": [["cota_mec"], ["cota_sistec"]],
     },
     "etnia_raca.csv": {
         "builder": "etnia_raca",
         "requires": ["etnia_raca"],
         "sources_all": ["etnia_raca"],
+        "contagens": [["etnia_raca"]],
     },
     "necessidades_especiais.csv": {
         "builder": "necessidades_especiais",
         "requires": ["tem_ne"],
         "sources_all": ["necessidades_especiais"],
+        "contagens": [["tem_ne"]],
     },
     "tipo_escola_origem.csv": {
         "builder": "tipo_escola_origem",
         "requires": ["tipo_escola_origem"],
         "sources_all": ["tipo_escola_origem"],
+        "contagens": [["tipo_escola_origem"]],
     },
     "natureza_participacao.csv": {
         "builder": "natureza_participacao",
         "requires": ["natureza_participacao"],
         "sources_all": ["natureza_participacao"],
+        "contagens": [["natureza_participacao"]],
     },
     "transporte_tipo.csv": {
         "builder": "transporte_tipo",
         "requires": ["transporte_publico", "transporte_tipo"],
         "sources_all": ["transporte_publico", "transporte_tipo"],
+        "contagens": [["transporte_tipo", "transporte_publico"]],
     },
     "natureza_escola.csv": {
         "builder": "natureza_escola",
         "requires": ["natureza_participacao", "tipo_escola_origem"],
         "sources_all": ["natureza_participacao", "tipo_escola_origem"],
+        "contagens": [["natureza_participacao", "tipo_escola_origem"]],
     },
     "situacao_escola.csv": {
         "builder": "situacao_escola",
         "requires": ["status_simplificado", "tipo_escola_origem"],
         "sources_any": [["situacao_curso", "situacao_sistema"]],
         "sources_all": ["tipo_escola_origem"],
+        "contagens": [["status_simplificado", "tipo_escola_origem"]],
+    },
+    "coorte_situacao.csv": {
+        "builder": "coorte_situacao",
+        "requires": ["coorte_ano", "curso", "status_simplificado"],
+        "sources_any": [["ano_ingresso", "data_matricula"], ["situacao_curso", "situacao_sistema"]],
+        "sources_all": ["curso"],
+        "contagens": [["coorte_ano", "curso", "status_simplificado"]],
+        # Os três datasets de coorte ainda não têm gráfico: só saem com --only
+        "opcional": True,
+        "pacote": False,
+    },
+    "tempo_conclusao.csv": {
+        "builder": "tempo_conclusao",
+        "requires": ["curso", "coorte_ano", "status_simplificado", "tempo_curso_meses"],
+        "sources_any": [["ano_ingresso", "data_matricula"], ["situacao_curso", "situacao_sistema"]],
+        "sources_all": ["curso", "data_matricula", "data_conclusao"],
+        "contagens": [["curso", "coorte_ano", "status_simplificado", "tempo_curso_meses"]],
+        "opcional": True,
+        "pacote": False,
+    },
+    "curva_conclusao.csv": {
+        "builder": "curva_conclusao",
+        "requires": ["coorte_ano", "status_simplificado", "tempo_curso_meses"],
+        "sources_any": [["ano_ingresso", "data_matricula"], ["situacao_curso", "situacao_sistema"]],
+        "sources_all": ["data_matricula", "data_conclusao"],
+        "contagens": [["coorte_ano", "status_simplificado", "tempo_curso_meses"]],
+        "opcional": True,
+        "pacote": False,
+    },
+    "cubo.csv": {
+        "builder": "cubo",
+        # Dimensões ausentes na planilha entram como um único valor vazio
+        "sources_any": [["campus", "modalidade", "turno", "cota_mec", "etnia_raca"]],
+        "contagens": [DIMENSOES_CUBO],
+        "pacote": False,
+        "qualidade_brotli": QUALIDADE_BROTLI_RAPIDA,
+        # Nenhum gráfico lê o cubo ainda; com poucas linhas por célula ele pesa
+        # mais que os demais datasets juntos
+        "opcional": True,
     },
 }
 
@@ -197,6 +387,17 @@ def resolver_colunas(colunas: Sequence[str]) -> Dict[str, str]:
     return resolvido
 
 
+@contextmanager
+def _sem_aviso_dayfirst() -> Iterator[None]:
+    # dayfirst=True é de propósito (datas brasileiras); em textos ISO o pandas a
+    # ignora, corretamente, mas avisa a cada chamada
+    with warnings.catch_warnings():
+        warnings.filterwarnings(
+            "ignore", message="Parsing dates in .* format when dayfirst=True", category=UserWarning
+        )
+        yield
+
+
 def parse_datetime_excel(valor):
     if pd.isna(valor):
         return pd.NaT
@@ -208,7 +409,8 @@ def parse_datetime_excel(valor):
         texto = valor.strip()
         if not texto:
             return pd.NaT
-        parsed = pd.to_datetime(texto, errors="coerce", dayfirst=True)
+        with _sem_aviso_dayfirst():
+            parsed = pd.to_datetime(texto, errors="coerce", dayfirst=True)
         if pd.isna(parsed):
             parsed = pd.to_datetime(texto, errors="coerce")
         return parsed
@@ -220,11 +422,92 @@ def parse_datetime_excel(valor):
     return pd.NaT
 
 
+DATA_BASE_EXCEL = datetime(1899, 12, 30)
+
+
+def _seriais_excel_para_datetime(valores: pd.Series) -> np.ndarray:
+    # Decompõe dia/segundo/microssegundo como timedelta(days=...) faz na conversão escalar
+    fracao_dia, dias = np.modf(valores.to_numpy(dtype="float64"))
+    fracao_segundo, segundos = np.modf(fracao_dia * 86400.0)
+    microssegundos = (
+        dias.astype("int64") * 86_400_000_000
+        + segundos.astype("int64") * 1_000_000
+        + np.round(fracao_segundo * 1e6).astype("int64")
+    )
+    return np.datetime64(DATA_BASE_EXCEL, "us") + microssegundos.astype("timedelta64[us]")
+
+
+def _formatos_candidatos(textos: Iterable[str]) -> List[str]:
+    """Formatos a tentar em lote, na ordem em que a conversão célula a célula os escolheria."""
+    for texto in textos:
+        with _sem_aviso_dayfirst():
+            formato = pd.tseries.api.guess_datetime_format(texto, dayfirst=True)
+        if not formato:
+            continue
+        if "%d" in formato and "%m" in formato and formato.index("%m") < formato.index("%d"):
+            # O mês só vem antes do dia quando a leitura dayfirst era impossível
+            # para a amostra; valores ambíguos seguem a leitura dayfirst.
+            invertido = formato.replace("%d", "{dia}").replace("%m", "%d").replace("{dia}", "%m")
+            return [invertido, formato]
+        return [formato]
+    return []
+
+
+def _textos_para_datetime(textos: pd.Series) -> np.ndarray:
+    """Converte textos de data em lote, um ``to_datetime`` por formato encontrado.
+
+    Os formatos são inferidos como na conversão célula a célula
+    (``dayfirst=True``); só o que não casa com nenhum deles passa por
+    ``parse_datetime_excel``, uma vez por valor distinto.
+    """
+    convertido = pd.Series(pd.NaT, index=textos.index, dtype="datetime64[us]")
+    pendentes = textos.ne("").to_numpy(copy=True)
+    while pendentes.any():
+        formatos = _formatos_candidatos(textos[pendentes].unique())
+        progresso = False
+        for formato in formatos:
+            lote = pd.to_datetime(textos[pendentes], format=formato, errors="coerce")
+            convertidos = np.zeros(len(textos), dtype=bool)
+            convertidos[pendentes] = lote.notna().to_numpy()
+            if convertidos.any():
+                convertido[convertidos] = lote[lote.notna()].to_numpy()
+                pendentes &= ~convertidos
+                progresso = True
+        if not progresso:
+            break
+
+    if pendentes.any():
+        restantes = textos[pendentes]
+        fallback = {texto: parse_datetime_excel(texto) for texto in restantes.unique()}
+        convertido[pendentes] = pd.to_datetime(restantes.map(fallback), errors="coerce").to_numpy()
+    return convertido.to_numpy(dtype="datetime64[us]")
+
+
 def garantir_datetime(series: pd.Series) -> pd.Series:
     if series is None:
         return pd.Series(dtype="datetime64[ns]")
-    convertido = series.apply(parse_datetime_excel)
-    return pd.to_datetime(convertido, errors="coerce")
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return pd.to_datetime(series, errors="coerce")
+
+    # Separa a coluna por tipo: seriais do Excel, textos e datas já convertidas
+    resultado = np.full(len(series), np.datetime64("NaT"), dtype="datetime64[us]")
+    if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+        presentes = series.notna().to_numpy()
+        resultado[presentes] = _seriais_excel_para_datetime(series[presentes])
+        return pd.Series(resultado, index=series.index, name=series.name)
+
+    presentes = series.notna()
+    datas = presentes & _mascara_tipos(series, datetime)
+    numeros = presentes & _mascara_tipos(series, (int, float)) & ~datas
+    textos = presentes & _mascara_tipos(series, str)
+
+    if datas.any():
+        resultado[datas.to_numpy()] = pd.to_datetime(series[datas].tolist()).to_numpy(dtype="datetime64[us]")
+    if numeros.any():
+        resultado[numeros.to_numpy()] = _seriais_excel_para_datetime(series[numeros])
+    if textos.any():
+        resultado[textos.to_numpy()] = _textos_para_datetime(series[textos].astype(object).str.strip())
+    return pd.Series(resultado, index=series.index, name=series.name)
 
 
 def parse_percentual(valor) -> float:
@@ -265,13 +548,7 @@ def simplificar_status(texto: Optional[str]) -> str:
     normalizado = normalizar_texto(texto)
     if not normalizado:
         return "Outros"
-    prefixos = {
-        ("concl", "form"): "Concluído",
-        ("ativ", "curs"): "Ativo",
-        ("tranc",): "Trancado",
-        ("cancel", "evad", "desl"): "Evasão/Cancelado",
-    }
-    for chaves, rotulo in prefixos.items():
+    for chaves, rotulo in PREFIXOS_STATUS.items():
         if any(normalizado.startswith(chave) for chave in chaves):
             return rotulo
     return "Outros"
@@ -297,16 +574,7 @@ def tem_necessidade_especial(valor) -> str:
     normalizado = normalizar_texto(valor)
     if not normalizado:
         return "Não"
-    marcadores_negativos = {
-        "nao",
-        "naopossui",
-        "naoseaplica",
-        "naodeclarado",
-        "naoinformado",
-        "sem",
-        "0",
-    }
-    if any(normalizado.startswith(marcador) for marcador in marcadores_negativos):
+    if any(normalizado.startswith(marcador) for marcador in MARCADORES_NEGATIVOS_NE):
         return "Não"
     if normalizado in {"n", "na"}:
         return "Não"
@@ -317,10 +585,163 @@ def meses_entre(inicio: Optional[pd.Timestamp], fim: Optional[pd.Timestamp]) ->
     if inicio is None or pd.isna(inicio) or fim is None or pd.isna(fim):
         return math.nan
     delta_dias = (fim - inicio).days
-    return round(delta_dias / 30.4375, 2)
+    return round(delta_dias / DIAS_POR_MES, 2)
+
+
+# Versões colunares das funções acima. Cada uma devolve exatamente o mesmo
+# resultado que aplicar a função escalar correspondente célula a célula.
+# Colunas textuais usam mapear_por_categoria, que roda a função escalar
+# apenas uma vez por valor distinto.
+
+
+def _mascara_tipos(series: pd.Series, tipos) -> pd.Series:
+    return series.map(lambda valor: isinstance(valor, tipos)).astype(bool)
+
+
+def _como_texto(series: pd.Series) -> pd.Series:
+    """Equivalente colunar de ``str(valor)``, com ``None`` virando texto vazio."""
+    valores = series.to_numpy(dtype=object)
+    texto = np.where(valores == None, "", valores.astype(str))  # noqa: E711
+    return pd.Series(texto, index=series.index, dtype=object)
+
+
+def parse_percentual_serie(series: pd.Series) -> pd.Series:
+    resultado = pd.Series(math.nan, index=series.index, dtype="float64")
+    if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+        return resultado.mask(series.notna(), series.astype("float64"))
+
+    presentes = series.notna()
+    numericos = presentes & _mascara_tipos(series, (int, float))
+    resultado[numericos] = series[numericos].astype("float64")
+
+    textuais = presentes & ~numericos
+    if textuais.any():
+        texto = _como_texto(series[textuais]).str.strip()
+        texto = texto.str.replace("%", "", regex=False).str.replace(" ", "", regex=False)
+        # Mantém apenas o último ponto (separador decimal) e troca a vírgula por ponto
+        texto = texto.str.replace(r"\.(?=.*\.)", "", regex=True).str.replace(",", ".", regex=False)
+        extraido = texto.str.extract(r"(-?\d+(?:\.\d+)?)", expand=False)
+        resultado[textuais] = pd.to_numeric(extraido, errors="coerce").astype("float64")
+    return resultado
+
+
+def bucketize_progresso_serie(series: pd.Series) -> pd.Series:
+    valores = series.astype("float64").clip(0.0, 100.0).to_numpy()
+    rotulos = np.select(
+        [valores < 25, valores < 50, valores < 75],
+        ROTULOS_BUCKET[:3],
+        default=ROTULOS_BUCKET[3],
+    ).astype(object)
+    rotulos[np.isnan(valores)] = None
+    return pd.Series(rotulos, index=series.index, name=series.name)
+
+
+def meses_entre_series(inicio: pd.Series, fim: pd.Series) -> pd.Series:
+    delta_dias = (fim - inicio).dt.days
+    return (delta_dias / DIAS_POR_MES).round(2).astype("float64")
+
+
+def parse_ano_serie(series: pd.Series, datas_fallback: pd.Series) -> pd.Series:
+    resultado = pd.Series(math.nan, index=series.index, dtype="float64")
+    presentes = series.notna()
+    numericos = presentes & _mascara_tipos(series, (int, float))
+    resultado[numericos] = np.trunc(series[numericos].astype("float64"))
+
+    textuais = presentes & ~numericos
+    if textuais.any():
+        extraido = _como_texto(series[textuais]).str.strip().str.extract(r"((?:19|20)\d{2})", expand=False)
+        resultado[textuais] = pd.to_numeric(extraido, errors="coerce").astype("float64")
+
+    return resultado.fillna(datas_fallback.dt.year.astype("float64"))
+
+
+def _colunas_referenciadas(especs: Iterable[Dict]) -> List[str]:
+    referenciadas: List[str] = []
+    for spec in especs:
+        referenciadas.extend(spec.get("requires", []))
+        referenciadas.extend(spec.get("sources_all", []))
+        for grupo in spec.get("sources_any", []):
+            referenciadas.extend(grupo)
+        for colunas in spec.get("contagens", []):
+            referenciadas.extend(colunas)
+    return referenciadas
+
+
+def expandir_dependencias(colunas: Iterable[str]) -> set:
+    """Acrescenta a ``colunas`` tudo de que elas dependem, segundo DEPENDENCIAS_DERIVADAS."""
+    pendentes = list(colunas)
+    necessarias = set()
+    while pendentes:
+        coluna = pendentes.pop()
+        if coluna not in necessarias:
+            necessarias.add(coluna)
+            pendentes.extend(DEPENDENCIAS_DERIVADAS.get(coluna, []))
+    return necessarias
+
+
+def colunas_necessarias(especs: Iterable[Dict]) -> List[str]:
+    """Colunas canônicas da planilha de que os datasets de ``especs`` dependem."""
+    necessarias = expandir_dependencias(_colunas_referenciadas(especs))
+    return [canonica for canonica in SINONIMOS_COLUNAS if canonica in necessarias]
+
+
+def derivadas_necessarias(especs: Iterable[Dict]) -> List[str]:
+    """Colunas derivadas em ``pre_processar`` de que os datasets de ``especs`` dependem."""
+    necessarias = expandir_dependencias(_colunas_referenciadas(especs))
+    return [derivada for derivada in DEPENDENCIAS_DERIVADAS if derivada in necessarias]
+
+
+def especs_particionadas(especs: Dict[str, Dict], dimensoes: Sequence[str]) -> List[Dict]:
+    """Cópias das especificações com cada contagem agrupada também por uma das ``dimensoes``.
+
+    Planejadas junto com as originais, fazem as contagens das partições
+    saírem da mesma passada (e as colunas de partição serem lidas).
+    """
+    return [
+        dict(spec, contagens=agrupamentos_particionados(spec.get("contagens", []), dimensao))
+        for dimensao in dimensoes
+        for spec in especs.values()
+    ]
+
+
+def assinaturas_datasets(especs: Dict[str, Dict], particoes: Optional[Sequence[str]] = None) -> Dict[str, str]:
+    """Assinatura de cada dataset; as partições pedidas entram nela, então mudá-las regera os datasets."""
+    return {
+        nome: assinatura_construtor(dict(spec, particoes=list(particoes)) if particoes else spec)
+        for nome, spec in especs.items()
+    }
+
+
+def especs_padrao() -> Dict[str, Dict]:
+    """Os datasets do build padrão: os de ESPECS_SAIDA que não são opcionais."""
+    return {nome: spec for nome, spec in ESPECS_SAIDA.items() if not spec.get("opcional")}
+
+
+def selecionar_especs(
+    apenas: Optional[Sequence[str]] = None,
+    excluir: Optional[Sequence[str]] = None,
+) -> Dict[str, Dict]:
+    """Filtra ESPECS_SAIDA pelos nomes dados (com ou sem ``.csv``).
 
+    Sem ``apenas``, parte dos datasets padrão; os opcionais só entram pedidos por nome.
 
-def carregar_dataframe(caminho: Path) -> pd.DataFrame:
+    Raises:
+        ValueError: Se algum nome não corresponder a um dataset conhecido.
+    """
+    def normalizar(nomes: Sequence[str]) -> set:
+        arquivos = {nome if nome.endswith(".csv") else f"{nome}.csv" for nome in nomes}
+        desconhecidos = sorted(arquivos - set(ESPECS_SAIDA))
+        if desconhecidos:
+            raise ValueError(f"Dataset(s) desconhecido(s): {', '.join(desconhecidos)}")
+        return arquivos
+
+    escolhidos = normalizar(apenas) if apenas else set(especs_padrao())
+    if excluir:
+        escolhidos -= normalizar(excluir)
+    return {nome: spec for nome, spec in ESPECS_SAIDA.items() if nome in escolhidos}
+
+
+def _ler_excel(caminho: Path, **opcoes) -> pd.DataFrame:
     if not caminho.exists():
         raise FileNotFoundError(f"Arquivo não encontrado: {caminho}")
     ext = caminho.suffix.lower()
@@ -330,63 +751,347 @@ def carregar_dataframe(caminho: Path) -> pd.DataFrame:
     elif ext in {".xlsx", ".xlsm"}:
         engine = "openpyxl"
     try:
-        return pd.read_excel(caminho, engine=engine)
+        return pd.read_excel(caminho, engine=engine, **opcoes)
     except ImportError as err:
         sys.exit(f"Dependência ausente para leitura de {ext}: {err}")
 
 
-def pre_processar(df: pd.DataFrame) -> Tuple[pd.DataFrame, set]:
-    df = df.copy()
-    resolvido = resolver_colunas(df.columns)
-    df = df.rename(columns={origem: destino for destino, origem in resolvido.items()})
-    fontes_disponiveis = set(resolvido.keys())
+def ler_cabecalho(caminho: Path) -> List[str]:
+    """Lê apenas a linha de cabeçalho da planilha (nomes como o pandas os entrega)."""
+    return list(_ler_excel(caminho, nrows=0).columns)
 
-    # Garante que as colunas canônicas existam
-    for canonica in SINONIMOS_COLUNAS:
-        if canonica not in df.columns:
-            df[canonica] = pd.NA
 
-    for col in COLUNAS_DATA:
-        df[col] = garantir_datetime(df[col])
+def colunas_de_origem(colunas_resolvidas: Dict[str, str], colunas: Sequence[str]) -> set:
+    """Nomes, no cabeçalho da planilha, das colunas canônicas pedidas."""
+    return {colunas_resolvidas[canonica] for canonica in colunas if canonica in colunas_resolvidas}
 
-    if "situacao_curso" in fontes_disponiveis and df["situacao_curso"].notna().any():
-        series_status = df["situacao_curso"]
+
+def carregar_dataframe(
+    caminho: Path,
+    colunas: Optional[Sequence[str]] = None,
+    cabecalho: Optional[Sequence[str]] = None,
+) -> pd.DataFrame:
+    """Lê a planilha mestre; com ``colunas`` (canônicas) lê só as de origem correspondentes.
+
+    As colunas textuais de ``COLUNAS_CATEGORICAS`` já saem como ``category``,
+    descartando os arrays de objetos antes do pré-processamento.
+    """
+    if colunas is None:
+        df = _ler_excel(caminho)
     else:
-        series_status = df["situacao_sistema"]
-    df["status_simplificado"] = series_status.apply(simplificar_status)
+        if cabecalho is None:
+            cabecalho = ler_cabecalho(caminho)
+        origens = colunas_de_origem(resolver_colunas(cabecalho), colunas)
+        # usecols como função mantém a ordem e os nomes do cabeçalho
+        df = _ler_excel(caminho, usecols=lambda nome: nome in origens)
+    for canonica, origem in resolver_colunas(df.columns).items():
+        if canonica in COLUNAS_CATEGORICAS:
+            df[origem] = df[origem].astype("category")
+    return df
+
+
+def _ler_bruto(caminho: Path, colunas: Optional[Sequence[str]]) -> Tuple[pd.DataFrame, Dict[str, str]]:
+    with etapa("carregar.excel") as medicao:
+        if colunas is None:
+            df = carregar_dataframe(caminho)
+            colunas_resolvidas = resolver_colunas(df.columns)
+        else:
+            cabecalho = ler_cabecalho(caminho)
+            df = carregar_dataframe(caminho, colunas, cabecalho)
+            colunas_resolvidas = resolver_colunas(cabecalho)
+        medicao["linhas_saida"] = len(df)
+    return df, colunas_resolvidas
+
+
+def _identificar_selecao(*selecoes: Optional[Sequence[str]]) -> str:
+    if all(selecao is None for selecao in selecoes):
+        return "todas"
+    texto = "|".join("*" if selecao is None else ",".join(selecao) for selecao in selecoes)
+    return hashlib.sha256(texto.encode("utf-8")).hexdigest()[:12]
+
+
+# Modo residente: por planilha, o último resultado de carregar_pre_processado e a
+# identidade dele (conteúdo, seleção, código e dia), mantidos entre builds
+_PRE_PROCESSADO_EM_MEMORIA: Optional[Dict[str, Tuple[str, Tuple]]] = None
 
-    df["percentual_progresso_num"] = df["percentual_progresso"].apply(parse_percentual)
-    df["bucket_progresso"] = df["percentual_progresso_num"].apply(bucketize_progresso)
 
-    if "necessidades_especiais" in fontes_disponiveis:
-        df["tem_ne"] = df["necessidades_especiais"].apply(tem_necessidade_especial)
+def manter_pre_processado_em_memoria() -> None:
+    """Mantém em memória o último quadro pré-processado de cada planilha (usado por ``--vigiar``)."""
+    global _PRE_PROCESSADO_EM_MEMORIA
+    if _PRE_PROCESSADO_EM_MEMORIA is None:
+        _PRE_PROCESSADO_EM_MEMORIA = {}
+
+
+def descartar_pre_processado(manter: Iterable[Path]) -> None:
+    """Tira da memória os quadros das planilhas que não estão em ``manter`` (que saíram da entrada)."""
+    if _PRE_PROCESSADO_EM_MEMORIA is None:
+        return
+    caminhos = {str(caminho) for caminho in manter}
+    for caminho in [caminho for caminho in _PRE_PROCESSADO_EM_MEMORIA if caminho not in caminhos]:
+        del _PRE_PROCESSADO_EM_MEMORIA[caminho]
+
+
+def carregar_pre_processado(
+    caminho_entrada: Path,
+    diretorio_cache: Optional[Path] = None,
+    limite_cache_mb: int = LIMITE_PADRAO_MB,
+    entrada: Optional[Dict] = None,
+    colunas: Optional[Sequence[str]] = None,
+    derivadas: Optional[Sequence[str]] = None,
+) -> Tuple[pd.DataFrame, set, Dict[str, str]]:
+    """Lê a planilha e aplica ``pre_processar``, reaproveitando o cache quando houver.
+
+    Com ``colunas`` (canônicas, ver ``colunas_necessarias``) só as colunas de
+    origem correspondentes são lidas; as demais chegam vazias. ``derivadas``
+    restringe as colunas derivadas calculadas (ver ``pre_processar``). Com
+    ``diretorio_cache`` o resultado pré-processado (válido para o código e
+    o dia atuais) e o quadro bruto são guardados por hash e mtime da entrada
+    e pelas seleções de colunas; uma nova leitura da mesma planilha dispensa o Excel.
+    No modo residente (``manter_pre_processado_em_memoria``) o resultado de
+    cada planilha também fica em memória, identificado pelo conteúdo (não
+    pelo mtime): no lote de várias planilhas, as que não mudaram não são
+    relidas quando outra muda. Uma nova versão da planilha substitui a anterior.
+
+    Returns:
+        Tuple[pd.DataFrame, set, Dict[str, str]]: O quadro pré-processado, as
+        fontes disponíveis e as colunas resolvidas no cabeçalho completo.
+    """
+    memoria = _PRE_PROCESSADO_EM_MEMORIA
+    if diretorio_cache is None and memoria is None:
+        df, colunas_resolvidas = _ler_bruto(caminho_entrada, colunas)
+        df, fontes_disponiveis = pre_processar(df, copiar=False, derivadas=derivadas)
+        return df, fontes_disponiveis, colunas_resolvidas
+
+    if entrada is None:
+        entrada = descrever_entrada(caminho_entrada)
+    selecao = _identificar_selecao(colunas, derivadas)
+    codigo = hash_codigo_base()[:16]
+    # tempo_curso_meses depende da data atual, então o pré-processado vale por um dia
+    hoje = datetime.today().date().isoformat()
+    if memoria is not None:
+        identidade = "-".join((entrada["sha256"], selecao, codigo, hoje))
+        residente = memoria.get(str(caminho_entrada))
+        if residente is not None and residente[0] == identidade:
+            return residente[1]
+    if diretorio_cache is None:
+        df, colunas_resolvidas = _ler_bruto(caminho_entrada, colunas)
+        df, fontes_disponiveis = pre_processar(df, copiar=False, derivadas=derivadas)
+        resultado = (df, fontes_disponiveis, colunas_resolvidas)
     else:
-        df["tem_ne"] = pd.NA
-
-    hoje = pd.Timestamp(datetime.today().date())
-    df["tempo_curso_meses"] = df.apply(
-        lambda row: meses_entre(
-            row.get("data_matricula"),
-            row.get("data_conclusao")
-            if row.get("status_simplificado") == "Concluído"
-            else hoje,
+        chave_pre = chave_cache(entrada, "pre", selecao, codigo, hoje)
+        resultado = _carregar_com_cache(
+            caminho_entrada, diretorio_cache, limite_cache_mb, entrada, colunas, derivadas, chave_pre
         )
-        if not pd.isna(row.get("data_matricula"))
-        else math.nan,
-        axis=1,
-    )
+    if memoria is not None:
+        memoria[str(caminho_entrada)] = (identidade, resultado)
+    return resultado
 
-    df["coorte_ano"] = df.apply(
-        lambda row: parse_ano(
-            row.get("ano_ingresso"),
-            row.get("data_matricula"),
-        ),
-        axis=1,
-    )
+
+def _carregar_com_cache(
+    caminho_entrada: Path,
+    diretorio_cache: Path,
+    limite_cache_mb: int,
+    entrada: Dict,
+    colunas: Optional[Sequence[str]],
+    derivadas: Optional[Sequence[str]],
+    chave_pre: str,
+) -> Tuple[pd.DataFrame, set, Dict[str, str]]:
+    with etapa("carregar.cache_pre_processado"):
+        em_cache = ler_cache(diretorio_cache, chave_pre)
+    if em_cache is not None:
+        return em_cache
+
+    chave_bruto = chave_cache(entrada, "bruto", _identificar_selecao(colunas))
+    with etapa("carregar.cache_bruto"):
+        bruto = ler_cache(diretorio_cache, chave_bruto)
+    if bruto is None:
+        bruto = _ler_bruto(caminho_entrada, colunas)
+        with etapa("carregar.gravar_cache"):
+            gravar_cache(diretorio_cache, chave_bruto, bruto, limite_cache_mb)
+    df, colunas_resolvidas = bruto
+    df, fontes_disponiveis = pre_processar(df, copiar=False, derivadas=derivadas)
+    resultado = (df, fontes_disponiveis, colunas_resolvidas)
+    with etapa("carregar.gravar_cache"):
+        gravar_cache(diretorio_cache, chave_pre, resultado, limite_cache_mb)
+    return resultado
+
+
+def pre_processar(
+    df: pd.DataFrame,
+    fonte_status: Optional[str] = None,
+    copiar: bool = True,
+    derivadas: Optional[Iterable[str]] = None,
+) -> Tuple[pd.DataFrame, set]:
+    """Padroniza as colunas e deriva as colunas usadas pelos construtores.
+
+    ``fonte_status`` fixa a coluna de origem de ``status_simplificado``; sem
+    ela usa-se ``situacao_curso`` quando preenchida, senão ``situacao_sistema``.
+    Lotes de uma mesma planilha devem receber a mesma fonte. Com
+    ``copiar=False`` o quadro recebido é reaproveitado e não deve mais ser usado.
+    Com ``derivadas`` só essas colunas de DEPENDENCIAS_DERIVADAS (e as de que
+    dependem) são calculadas; as demais ficam de fora do quadro.
+    """
+    if derivadas is None:
+        calcular = set(DEPENDENCIAS_DERIVADAS)
+    else:
+        calcular = expandir_dependencias(derivadas)
+
+    with etapa("pre_processar", len(df)) as medicao:
+        with etapa("pre_processar.colunas", len(df)):
+            if copiar:
+                df = df.copy()
+            resolvido = resolver_colunas(df.columns)
+            df.rename(columns={origem: destino for destino, origem in resolvido.items()}, inplace=True)
+            fontes_disponiveis = set(resolvido.keys())
+
+            # Garante que as colunas canônicas existam
+            for canonica in SINONIMOS_COLUNAS:
+                if canonica not in df.columns:
+                    df[canonica] = pd.NA
+
+        with etapa("pre_processar.datas", len(df)):
+            for col in COLUNAS_DATA:
+                df[col] = garantir_datetime(df[col])
+
+        with etapa("pre_processar.categorias", len(df)):
+            for col in COLUNAS_CATEGORICAS:
+                df[col] = df[col].astype("category")
+
+        if "status_simplificado" in calcular:
+            with etapa("pre_processar.status_simplificado", len(df)):
+                if fonte_status is None:
+                    if "situacao_curso" in fontes_disponiveis and df["situacao_curso"].notna().any():
+                        fonte_status = "situacao_curso"
+                    else:
+                        fonte_status = "situacao_sistema"
+                df["status_simplificado"] = mapear_por_categoria(df[fonte_status], simplificar_status)
+
+        if "percentual_progresso_num" in calcular:
+            with etapa("pre_processar.percentual_progresso", len(df)):
+                df["percentual_progresso_num"] = parse_percentual_serie(df["percentual_progresso"])
+                if "bucket_progresso" in calcular:
+                    df["bucket_progresso"] = bucketize_progresso_serie(df["percentual_progresso_num"])
+                # Faixas já calculadas em float64; a coluna numérica em si só precisa de float32
+                df["percentual_progresso_num"] = df["percentual_progresso_num"].astype("float32")
+
+        if "tem_ne" in calcular:
+            with etapa("pre_processar.tem_ne", len(df)):
+                if "necessidades_especiais" in fontes_disponiveis:
+                    df["tem_ne"] = mapear_por_categoria(
+                        df["necessidades_especiais"], tem_necessidade_especial
+                    )
+                else:
+                    df["tem_ne"] = pd.NA
+
+        if "tempo_curso_meses" in calcular:
+            with etapa("pre_processar.tempo_curso_meses", len(df)):
+                hoje = pd.Timestamp(datetime.today().date())
+                fim = df["data_conclusao"].where(df["status_simplificado"] == "Concluído", hoje)
+                df["tempo_curso_meses"] = meses_entre_series(df["data_matricula"], fim)
+
+        if "coorte_ano" in calcular:
+            with etapa("pre_processar.coorte_ano", len(df)):
+                coorte = parse_ano_serie(df["ano_ingresso"], df["data_matricula"])
+                # Sem anos ausentes o resultado linha a linha era inteiro; preserva esse tipo
+                df["coorte_ano"] = coorte.astype("int64") if coorte.notna().all() else coorte
+
+        medicao["linhas_saida"] = len(df)
 
     return df, fontes_disponiveis
 
 
+def _montar_amostra(primeiros: Dict[str, object], colunas: Sequence[str]) -> pd.DataFrame:
+    # Uma linha com o primeiro valor preenchido de cada coluna: basta para as
+    # verificações de colunas e de fonte de status feitas antes dos construtores
+    return pd.DataFrame({coluna: [primeiros.get(coluna, np.nan)] for coluna in colunas})
+
+
+def amostrar(df: pd.DataFrame) -> pd.DataFrame:
+    """Reduz ``df`` a uma linha com o primeiro valor preenchido de cada coluna."""
+    primeiros = {}
+    for coluna in df.columns:
+        indice = df[coluna].first_valid_index()
+        if indice is not None:
+            primeiros[coluna] = df[coluna].at[indice]
+    return _montar_amostra(primeiros, df.columns)
+
+
+def _medir_lotes(lotes: Iterator[pd.DataFrame]) -> Iterator[pd.DataFrame]:
+    # Cada leitura de lote vira uma chamada da etapa "carregar.lote"
+    while True:
+        with etapa("carregar.lote") as medicao:
+            lote = next(lotes, None)
+            if lote is not None:
+                medicao["linhas_saida"] = len(lote)
+        if lote is None:
+            return
+        yield lote
+
+
+def contar_em_lotes(
+    caminho_entrada: Path,
+    agrupamentos: Sequence[Agrupamento],
+    tamanho_lote: int,
+    colunas: Optional[Sequence[str]] = None,
+    derivadas: Optional[Sequence[str]] = None,
+) -> Tuple[Contagens, pd.DataFrame, set, Dict[str, str]]:
+    """Lê a planilha em lotes e acumula as contagens sem manter o quadro inteiro.
+
+    Cada lote é pré-processado e contado separadamente; como as contagens se
+    somam, o resultado é o mesmo da leitura completa. ``status_simplificado``
+    vem de ``situacao_curso`` sempre que a coluna existir; enquanto nenhum
+    valor dela aparecer, as contagens são também acumuladas a partir de
+    ``situacao_sistema`` e usadas se ``situacao_curso`` estiver toda vazia.
+    ``colunas`` e ``derivadas`` restringem a leitura e o pré-processamento
+    como em ``carregar_pre_processado``.
+
+    Returns:
+        Tuple[Contagens, pd.DataFrame, set, Dict[str, str]]: As contagens, um
+        quadro de amostra com uma linha, as fontes disponíveis e as colunas
+        resolvidas.
+    """
+    contagens: Contagens = {}
+    alternativas: Optional[Contagens] = None
+    primeiros: Dict[str, object] = {}
+    colunas_lote: Sequence[str] = []
+    fontes_disponiveis: set = set()
+    colunas_resolvidas = resolver_colunas(ler_cabecalho(caminho_entrada))
+    origens = None if colunas is None else colunas_de_origem(colunas_resolvidas, colunas)
+
+    usa_status = derivadas is None or "status_simplificado" in expandir_dependencias(derivadas)
+
+    fonte_status = "situacao_sistema"
+    lotes = _medir_lotes(ler_planilha_em_lotes(caminho_entrada, tamanho_lote, origens))
+    for numero, bruto in enumerate(lotes):
+        if numero == 0 and "situacao_curso" in resolver_colunas(bruto.columns):
+            fonte_status = "situacao_curso"
+            if usa_status:
+                alternativas = {}
+        lote, fontes_disponiveis = pre_processar(bruto, fonte_status, derivadas=derivadas)
+        with etapa("contagens", len(lote)):
+            somar_contagens(contagens, calcular_contagens(lote, agrupamentos))
+
+        if alternativas is not None:
+            if lote["situacao_curso"].notna().any():
+                alternativas = None
+            else:
+                lote_sistema, _ = pre_processar(bruto, "situacao_sistema", derivadas=derivadas)
+                with etapa("contagens", len(lote_sistema)):
+                    somar_contagens(alternativas, calcular_contagens(lote_sistema, agrupamentos))
+
+        colunas_lote = lote.columns
+        for coluna in colunas_lote:
+            if coluna not in primeiros:
+                indice = lote[coluna].first_valid_index()
+                if indice is not None:
+                    primeiros[coluna] = lote[coluna].at[indice]
+
+    if alternativas is not None:
+        contagens = alternativas
+    amostra = _montar_amostra(primeiros, colunas_lote)
+    return ordenar_contagens(contagens), amostra, fontes_disponiveis, colunas_resolvidas
+
+
 def resolver_coluna_status(df: pd.DataFrame, fontes_disponiveis: set) -> str:
     if "situacao_curso" in fontes_disponiveis and df["situacao_curso"].notna().any():
         return "situacao_curso"
@@ -395,8 +1100,49 @@ def resolver_coluna_status(df: pd.DataFrame, fontes_disponiveis: set) -> str:
     return "status_simplificado"
 
 
-def escrever_csv(df: pd.DataFrame, caminho: Path) -> None:
-    df.to_csv(caminho, index=False, sep=";", encoding="utf-8")
+def escrever_csv(df: pd.DataFrame, caminho: Path, qualidade_brotli: int = QUALIDADE_BROTLI) -> bool:
+    """Grava o CSV e as versões ``.csv.gz``/``.csv.br`` de forma atômica (ver ``saidas``).
+
+    Devolve ``False`` se o CSV já tinha o mesmo conteúdo.
+    """
+    return gravar_com_variantes(caminho, df.to_csv(index=False, sep=";").encode("utf-8"), qualidade_brotli)
+
+
+def quadro_para_json(df: pd.DataFrame) -> bytes:
+    """Serializa o quadro em colunas: ``{"colunas": [...], "valores": [[...], ...]}``.
+
+    ``valores[i]`` traz a coluna ``colunas[i]`` inteira; ausentes viram ``null``
+    e números continuam números, então o front-end não precisa de parser.
+    Colunas categóricas vão como códigos inteiros, com os rótulos uma única
+    vez em ``"categorias"`` (``{"coluna": [...]}``).
+    """
+    valores = []
+    categorias = {}
+    for coluna in df.columns:
+        serie = df[coluna]
+        if isinstance(serie.dtype, pd.CategoricalDtype):
+            categorias[str(coluna)] = serie.cat.categories.astype(object).tolist()
+            codigos = serie.cat.codes.astype(object)
+            valores.append(codigos.where(codigos >= 0, None).tolist())
+            continue
+        serie = serie.astype(object)
+        valores.append(serie.where(serie.notna(), None).tolist())
+    documento = {"colunas": [str(coluna) for coluna in df.columns], "valores": valores}
+    if categorias:
+        documento["categorias"] = categorias
+    texto = json.dumps(
+        documento,
+        ensure_ascii=False,
+        separators=(",", ":"),
+        allow_nan=False,
+        default=lambda valor: valor.item(),
+    )
+    return texto.encode("utf-8")
+
+
+def escrever_json(df: pd.DataFrame, caminho: Path, qualidade_brotli: int = QUALIDADE_BROTLI) -> bool:
+    """Grava o JSON em colunas ao lado do CSV, com as mesmas versões comprimidas."""
+    return gravar_com_variantes(caminho, quadro_para_json(df), qualidade_brotli)
 
 
 def tem_colunas_necessarias(df: pd.DataFrame, requires: Iterable[str]) -> bool:
@@ -421,56 +1167,962 @@ def tem_fontes_necessarias(disponiveis: set, spec: Dict) -> bool:
     return True
 
 
-def construir_datasets(caminho_entrada: Path, diretorio_saida: Path) -> None:
-    df = carregar_dataframe(caminho_entrada)
-    df, fontes_disponiveis = pre_processar(df)
-    diretorio_saida.mkdir(parents=True, exist_ok=True)
+def gerar_dataset(
+    df: pd.DataFrame,
+    fontes_disponiveis: set,
+    nome_arquivo: str,
+    spec: Dict,
+    contagens: Optional[Contagens] = None,
+) -> Tuple[Optional[pd.DataFrame], Optional[str]]:
+    """Roda o construtor de um dataset de ESPECS_SAIDA, sem gravar.
 
-    for nome_arquivo, spec in ESPECS_SAIDA.items():
-        builder_name = spec.get("builder")
-        if not builder_name:
-            continue
+    Devolve o quadro gerado (``None`` se o dataset foi pulado) e, nesse
+    caso, a mensagem de progresso correspondente.
+    """
+    builder_name = spec.get("builder")
+    if not builder_name:
+        return None, None
 
-        try:
-            builder_module = importlib.import_module(f"construtores.{builder_name}")
-        except ImportError:
-            print(f"Construtor não encontrado para: {nome_arquivo}")
-            continue
+    builder_module = carregar_construtor(builder_name)
+    if builder_module is None:
+        return None, f"Construtor não encontrado para: {nome_arquivo}"
 
-        requires = spec.get("requires", [])
-        if not tem_fontes_necessarias(fontes_disponiveis, spec):
-            print(f"Dataset pulado (fontes ausentes): {nome_arquivo}")
-            continue
-        if not tem_colunas_necessarias(df, requires):
-            print(f"Dataset pulado (dados insuficientes): {nome_arquivo}")
-            continue
+    requires = spec.get("requires", [])
+    if not tem_fontes_necessarias(fontes_disponiveis, spec):
+        return None, f"Dataset pulado (fontes ausentes): {nome_arquivo}"
+    if not tem_colunas_necessarias(df, requires):
+        return None, f"Dataset pulado (dados insuficientes): {nome_arquivo}"
+
+    if builder_name == "alunos_por_situacao":
+        coluna_status = resolver_coluna_status(df, fontes_disponiveis)
+        gerado = builder_module.construir(df, coluna_status, contagens=contagens)
+    elif builder_name == "cubo":
+        gerado = builder_module.construir(df, spec["contagens"][0], contagens=contagens)
+    else:
+        gerado = builder_module.construir(df, contagens=contagens)
+
+    if gerado is None or gerado.empty:
+        return None, f"Dataset pulado (sem dados): {nome_arquivo}"
+    return gerado, None
+
+
+def construir_dataset(
+    df: pd.DataFrame,
+    fontes_disponiveis: set,
+    nome_arquivo: str,
+    spec: Dict,
+    diretorio_saida: Path,
+    contagens: Optional[Contagens] = None,
+) -> Tuple[bool, Optional[str]]:
+    """Gera e grava um dataset de ESPECS_SAIDA.
+
+    Devolve se o CSV foi gravado e a mensagem de progresso correspondente.
+    """
+    with etapa(f"construtor.{nome_arquivo}", len(df)) as medicao:
+        gerado, mensagem = gerar_dataset(df, fontes_disponiveis, nome_arquivo, spec, contagens)
+        medicao["linhas_saida"] = None if gerado is None else len(gerado)
+    if gerado is None:
+        return False, mensagem
+    caminho = diretorio_saida / nome_arquivo
+    qualidade_brotli = spec.get("qualidade_brotli", QUALIDADE_BROTLI)
+    with etapa(f"escrever.{nome_arquivo}", len(gerado)):
+        escrever_json(gerado, caminho.with_suffix(".json"), qualidade_brotli)
+        alterado = escrever_csv(gerado, caminho, qualidade_brotli)
+    if not alterado:
+        return True, f"Gerado (conteúdo igual ao anterior): {nome_arquivo}"
+    return True, f"Gerado: {nome_arquivo}"
+
+
+# Estado de cada processo trabalhador: o quadro chega uma única vez, pelo
+# inicializador, e é reutilizado por todas as tarefas daquele processo.
+_QUADRO_PROCESSO: Optional[pd.DataFrame] = None
+_FONTES_PROCESSO: set = set()
+_CONTAGENS_PROCESSO: Optional[Contagens] = None
+
+
+def _inicializar_processo(
+    df: pd.DataFrame,
+    fontes_disponiveis: set,
+    contagens: Contagens,
+    configuracao_metricas: Optional[Dict] = None,
+) -> None:
+    global _QUADRO_PROCESSO, _FONTES_PROCESSO, _CONTAGENS_PROCESSO
+    _QUADRO_PROCESSO = df
+    _FONTES_PROCESSO = fontes_disponiveis
+    _CONTAGENS_PROCESSO = contagens
+    # Coletor novo: com fork, as etapas já medidas no processo principal não se repetem
+    ativar(None if configuracao_metricas is None else ColetorMetricas(**configuracao_metricas))
+
+
+def _construir_dataset_processo(
+    nome_arquivo: str,
+    spec: Dict,
+    diretorio_saida: Path,
+) -> Tuple[bool, Optional[str], Dict[str, Dict]]:
+    gravado, mensagem = construir_dataset(
+        _QUADRO_PROCESSO,
+        _FONTES_PROCESSO,
+        nome_arquivo,
+        spec,
+        diretorio_saida,
+        _CONTAGENS_PROCESSO,
+    )
+    coletor = coletor_ativo()
+    return gravado, mensagem, {} if coletor is None else coletor.retirar_etapas()
 
-        if builder_name == "alunos_por_situacao":
-            coluna_status = resolver_coluna_status(df, fontes_disponiveis)
-            gerado = builder_module.construir(df, coluna_status)
+
+def _criar_executor(
+    df: pd.DataFrame,
+    fontes_disponiveis: set,
+    contagens: Contagens,
+    jobs: int,
+    processos: bool,
+) -> Executor:
+    if not processos:
+        return ThreadPoolExecutor(max_workers=jobs)
+    # Com fork o quadro é herdado sem serialização; nos demais métodos ele é
+    # serializado uma vez por processo, nunca por tarefa.
+    metodos = multiprocessing.get_all_start_methods()
+    contexto = multiprocessing.get_context("fork" if "fork" in metodos else None)
+    coletor = coletor_ativo()
+    return ProcessPoolExecutor(
+        max_workers=jobs,
+        mp_context=contexto,
+        initializer=_inicializar_processo,
+        initargs=(df, fontes_disponiveis, contagens, None if coletor is None else coletor.configuracao()),
+    )
+
+
+def contar_especs(df: pd.DataFrame, fontes_disponiveis: set, especs: Iterable[Dict]) -> Contagens:
+    """Calcula numa única passada as contagens das especificações cujas fontes existem."""
+    agrupamentos = planejar_agrupamentos(
+        spec for spec in especs if tem_fontes_necessarias(fontes_disponiveis, spec)
+    )
+    with etapa("contagens", len(df)) as medicao:
+        contagens = calcular_contagens(df, agrupamentos)
+        medicao["linhas_saida"] = sum(len(contagem) for contagem in contagens.values())
+    return contagens
+
+
+def executar_construtores(
+    df: pd.DataFrame,
+    fontes_disponiveis: set,
+    especs: Dict[str, Dict],
+    diretorio_saida: Path,
+    jobs: int = 1,
+    processos: bool = False,
+    contagens: Optional[Contagens] = None,
+) -> Dict[str, bool]:
+    """Roda os construtores de ``especs`` e informa, por arquivo, se o CSV foi gravado.
+
+    Sem ``contagens`` pré-calculadas elas são obtidas de ``df`` numa única passada.
+    """
+    if contagens is None:
+        contagens = contar_especs(df, fontes_disponiveis, especs.values())
+    resultados: Dict[str, bool] = {}
+
+    if jobs <= 1:
+        for nome_arquivo, spec in especs.items():
+            gravado, mensagem = construir_dataset(
+                df, fontes_disponiveis, nome_arquivo, spec, diretorio_saida, contagens
+            )
+            resultados[nome_arquivo] = gravado
+            if mensagem:
+                print(mensagem)
+        return resultados
+
+    with _criar_executor(df, fontes_disponiveis, contagens, jobs, processos) as executor:
+        if processos:
+            futuros = {
+                nome_arquivo: executor.submit(_construir_dataset_processo, nome_arquivo, spec, diretorio_saida)
+                for nome_arquivo, spec in especs.items()
+            }
         else:
-            gerado = builder_module.construir(df)
+            futuros = {
+                nome_arquivo: executor.submit(
+                    construir_dataset,
+                    df,
+                    fontes_disponiveis,
+                    nome_arquivo,
+                    spec,
+                    diretorio_saida,
+                    contagens,
+                )
+                for nome_arquivo, spec in especs.items()
+            }
+        # Mensagens na ordem de ESPECS_SAIDA, independente da ordem de término
+        coletor = coletor_ativo()
+        for nome_arquivo, futuro in futuros.items():
+            if processos:
+                gravado, mensagem, etapas = futuro.result()
+                if coletor is not None:
+                    for nome_etapa, dados in etapas.items():
+                        coletor.acumular(nome_etapa, dados)
+            else:
+                gravado, mensagem = futuro.result()
+            resultados[nome_arquivo] = gravado
+            if mensagem:
+                print(mensagem)
+    return resultados
+
+
+def nomes_de_particao(valores: Iterable[object]) -> Dict[object, str]:
+    """Nome de diretório de cada valor: o texto normalizado, só com letras minúsculas, dígitos e hífens."""
+    nomes: Dict[object, str] = {}
+    usados: set = set()
+    for valor in valores:
+        base = re.sub(r"[^a-z0-9]+", "-", normalizar_texto(str(valor))).strip("-") or "vazio"
+        nome, sufixo = base, 2
+        # Valores que só diferem em acentos ou pontuação
+        while nome in usados:
+            nome = f"{base}-{sufixo}"
+            sufixo += 1
+        usados.add(nome)
+        nomes[valor] = nome
+    return nomes
+
+
+def _remover_dataset(caminho: Path) -> None:
+    for arquivo in (caminho, caminho.with_suffix(".json")):
+        for sufixo in ("", *SUFIXOS_COMPRIMIDOS):
+            arquivo.with_name(arquivo.name + sufixo).unlink(missing_ok=True)
+
+
+def construir_particoes(
+    df: pd.DataFrame,
+    fontes_disponiveis: set,
+    especs: Dict[str, Dict],
+    diretorio_saida: Path,
+    dimensoes: Sequence[str],
+    contagens: Contagens,
+) -> None:
+    """Grava os datasets de ``especs`` separados por valor de cada uma das ``dimensoes``.
+
+    As partições saem de ``contagens``, que precisam trazer os agrupamentos
+    de ``especs_particionadas`` (calculados na mesma passada das contagens
+    globais): cada construtor roda sobre as contagens de um valor, sem
+    refiltrar o quadro. Cada valor fica em
+    ``diretorio_saida/particoes/<dimensão>/<nome>/`` e
+    ``particoes/indice.json`` lista os datasets de cada partição. Valores e
+    dimensões que não estão mais no build têm as pastas removidas.
 
-        if gerado is None or gerado.empty:
-            print(f"Dataset pulado (sem dados): {nome_arquivo}")
+    Args:
+        df (pd.DataFrame): O quadro pré-processado ou uma amostra dele.
+        fontes_disponiveis (set): As colunas canônicas presentes na planilha.
+        especs (Dict[str, Dict]): Os datasets a gerar em cada partição.
+        diretorio_saida (Path): O diretório de saída dos datasets globais.
+        dimensoes (Sequence[str]): As colunas de partição.
+        contagens (Contagens): As contagens globais e particionadas.
+    """
+    raiz = diretorio_saida / DIRETORIO_PARTICOES
+    validas = {nome: spec for nome, spec in especs.items() if tem_fontes_necessarias(fontes_disponiveis, spec)}
+    agrupamentos = planejar_agrupamentos(validas.values())
+    # As verificações de colunas dos construtores só precisam de uma linha
+    amostra = amostrar(df)
+    indice: Dict[str, Dict[str, str]] = {}
+    for dimensao in dimensoes:
+        destino_dimensao = raiz / dimensao
+        if dimensao not in fontes_disponiveis:
+            print(f"Partições puladas (coluna ausente): {dimensao}")
             continue
-        escrever_csv(gerado, diretorio_saida / nome_arquivo)
-        print(f"Gerado: {nome_arquivo}")
+        with etapa(f"particoes.{dimensao}") as medicao:
+            por_valor = particionar_contagens(contagens, agrupamentos, dimensao)
+            nomes = nomes_de_particao(por_valor)
+            gravados = 0
+            for valor, contagens_valor in por_valor.items():
+                destino = destino_dimensao / nomes[valor]
+                destino.mkdir(parents=True, exist_ok=True)
+                for nome_arquivo, spec in validas.items():
+                    gerado, _ = gerar_dataset(amostra, fontes_disponiveis, nome_arquivo, spec, contagens_valor)
+                    caminho = destino / nome_arquivo
+                    if gerado is None:
+                        _remover_dataset(caminho)
+                        continue
+                    escrever_json(gerado, caminho.with_suffix(".json"), QUALIDADE_BROTLI_RAPIDA)
+                    escrever_csv(gerado, caminho, QUALIDADE_BROTLI_RAPIDA)
+                    gravados += 1
+            medicao["linhas_saida"] = gravados
+        for pasta in destino_dimensao.iterdir():
+            if pasta.is_dir() and pasta.name not in nomes.values():
+                shutil.rmtree(pasta)
+        indice[dimensao] = {nome: valor for valor, nome in nomes.items()}
+        print(f"Partições por {dimensao}: {len(por_valor)} valor(es), {gravados} dataset(s) gerado(s)")
+    if raiz.exists():
+        for pasta in raiz.iterdir():
+            if pasta.is_dir() and pasta.name not in indice:
+                shutil.rmtree(pasta)
+    gravar_indice_particoes(raiz, indice, list(ESPECS_SAIDA))
+
+
+def _datasets_pendentes(
+    manifesto: Dict,
+    entrada: Dict,
+    codigo_base: str,
+    especs: Dict[str, Dict],
+    assinaturas: Dict[str, str],
+    diretorio_saida: Path,
+) -> Dict[str, Dict]:
+    pendentes = {}
+    for nome_arquivo, spec in especs.items():
+        if dataset_atualizado(
+            manifesto, entrada, codigo_base, nome_arquivo, assinaturas[nome_arquivo], diretorio_saida
+        ):
+            print(f"Dataset inalterado: {nome_arquivo}")
+        else:
+            pendentes[nome_arquivo] = spec
+    return pendentes
+
+
+def _registrar_manifesto(
+    diretorio_saida: Path,
+    manifesto: Dict,
+    entrada: Dict,
+    codigo_base: str,
+    assinaturas: Dict[str, str],
+    resultados: Dict[str, bool],
+) -> None:
+    # Só reaproveita registros antigos se a entrada e o código base não mudaram
+    mesma_base = (
+        manifesto.get("entrada", {}).get("sha256") == entrada["sha256"]
+        and manifesto.get("codigo_base") == codigo_base
+    )
+    datasets = dict(manifesto.get("datasets", {})) if mesma_base else {}
+    for nome_arquivo, gravado in resultados.items():
+        datasets[nome_arquivo] = {"assinatura": assinaturas[nome_arquivo], "gerado": gravado}
+    salvar_manifesto(
+        diretorio_saida,
+        {"entrada": entrada, "codigo_base": codigo_base, "datasets": datasets},
+    )
+
+
+def nomes_do_pacote() -> List[str]:
+    """Os datasets que entram no ``datasets.bundle``, na ordem de ESPECS_SAIDA."""
+    return [nome for nome, spec in ESPECS_SAIDA.items() if spec.get("pacote", True)]
+
+
+def _atualizar_pacote(diretorio_saida: Path) -> None:
+    # O pacote reúne todos os datasets do diretório, inclusive os inalterados neste build
+    arquivo = gravar_pacote(diretorio_saida, nomes_do_pacote())
+    if arquivo:
+        print(f"Pacote gerado: {arquivo}")
+
+
+def contar_arquivo(
+    caminho_entrada: Path,
+    especs: Dict[str, Dict],
+    diretorio_cache: Optional[Path] = None,
+    limite_cache_mb: int = LIMITE_PADRAO_MB,
+    tamanho_lote: Optional[int] = None,
+    entrada: Optional[Dict] = None,
+    particoes: Optional[Sequence[str]] = None,
+) -> Tuple[Contagens, pd.DataFrame, set, Dict[str, str]]:
+    """Calcula as contagens de que os datasets de ``especs`` precisam para um arquivo.
+
+    Com ``particoes`` as contagens de cada partição vêm na mesma passada
+    (ver ``especs_particionadas``).
+
+    Returns:
+        Tuple[Contagens, pd.DataFrame, set, Dict[str, str]]: As contagens, um
+        quadro de amostra com uma linha, as fontes disponíveis e as colunas
+        resolvidas.
+    """
+    especs_contagem = [*especs.values(), *especs_particionadas(especs, particoes or [])]
+    colunas = colunas_necessarias(especs_contagem)
+    derivadas = derivadas_necessarias(especs_contagem)
+    agrupamentos = planejar_agrupamentos(especs_contagem)
+    if tamanho_lote:
+        return contar_em_lotes(caminho_entrada, agrupamentos, tamanho_lote, colunas, derivadas)
+    df, fontes_disponiveis, colunas_resolvidas = carregar_pre_processado(
+        caminho_entrada, diretorio_cache, limite_cache_mb, entrada, colunas, derivadas
+    )
+    return calcular_contagens(df, agrupamentos), amostrar(df), fontes_disponiveis, colunas_resolvidas
+
+
+def construir_datasets(
+    caminho_entrada: Path,
+    diretorio_saida: Path,
+    jobs: int = 1,
+    processos: bool = False,
+    forcar: bool = False,
+    diretorio_cache: Optional[Path] = None,
+    limite_cache_mb: int = LIMITE_PADRAO_MB,
+    tamanho_lote: Optional[int] = None,
+    especs: Optional[Dict[str, Dict]] = None,
+    particoes: Optional[Sequence[str]] = None,
+) -> None:
+    """Gera os datasets de ``especs`` (padrão: os de ``especs_padrao``) em ``diretorio_saida``.
+
+    Com ``particoes`` os datasets gerados também são gravados por valor de
+    cada uma dessas colunas (ver ``construir_particoes``).
+    """
+    if not caminho_entrada.exists():
+        raise FileNotFoundError(f"Arquivo não encontrado: {caminho_entrada}")
+    diretorio_saida.mkdir(parents=True, exist_ok=True)
+    if especs is None:
+        especs = especs_padrao()
+    descartar_pre_processado([caminho_entrada])
+
+    manifesto = {} if forcar else carregar_manifesto(diretorio_saida)
+    with etapa("manifesto.entrada"):
+        entrada = descrever_entrada(caminho_entrada, manifesto.get("entrada"))
+    codigo_base = hash_codigo_base()
+    assinaturas = assinaturas_datasets(especs, particoes)
+
+    pendentes = _datasets_pendentes(manifesto, entrada, codigo_base, especs, assinaturas, diretorio_saida)
+    if not pendentes:
+        _atualizar_pacote(diretorio_saida)
+        return
+
+    if tamanho_lote:
+        # Em lotes o quadro completo nunca existe: os construtores recebem as
+        # contagens acumuladas e uma amostra para as verificações de colunas
+        contagens, df, fontes_disponiveis, colunas_resolvidas = contar_arquivo(
+            caminho_entrada, pendentes, tamanho_lote=tamanho_lote, particoes=particoes
+        )
+    else:
+        # Só as colunas da planilha e as derivadas de que os pendentes dependem
+        especs_contagem = [*pendentes.values(), *especs_particionadas(pendentes, particoes or [])]
+        df, fontes_disponiveis, colunas_resolvidas = carregar_pre_processado(
+            caminho_entrada,
+            diretorio_cache,
+            limite_cache_mb,
+            entrada,
+            colunas_necessarias(especs_contagem),
+            derivadas_necessarias(especs_contagem),
+        )
+        # Com partições, as contagens globais e as particionadas saem juntas
+        contagens = contar_especs(df, fontes_disponiveis, especs_contagem) if particoes else None
+    resultados = executar_construtores(
+        df, fontes_disponiveis, pendentes, diretorio_saida, jobs, processos, contagens
+    )
+    if particoes:
+        construir_particoes(df, fontes_disponiveis, pendentes, diretorio_saida, particoes, contagens)
+    _registrar_manifesto(
+        diretorio_saida,
+        manifesto,
+        dict(entrada, colunas=colunas_resolvidas),
+        codigo_base,
+        assinaturas,
+        resultados,
+    )
+    _atualizar_pacote(diretorio_saida)
+
+
+def listar_entradas(padrao: str) -> List[Path]:
+    """Expande ``--in``: um arquivo, um diretório (todas as planilhas nele) ou um padrão glob."""
+    caminho = Path(padrao)
+    if caminho.is_dir():
+        candidatos = sorted(caminho.iterdir())
+    elif any(caractere in padrao for caractere in "*?["):
+        candidatos = sorted(Path(item) for item in glob.glob(padrao))
+    else:
+        return [caminho]
+    # Ignora arquivos de trava do Excel (~$planilha.xlsx)
+    return [
+        candidato
+        for candidato in candidatos
+        if candidato.is_file()
+        and candidato.suffix.lower() in EXTENSOES_PLANILHA
+        and not candidato.name.startswith("~$")
+    ]
+
+
+def _diretorios_por_arquivo(caminhos: Sequence[Path], diretorio_saida: Path) -> Dict[Path, Path]:
+    destinos: Dict[Path, Path] = {}
+    usados = {NOME_CONJUNTO_GERAL}
+    for caminho in caminhos:
+        nome = caminho.stem
+        if nome in usados:
+            # Mesmo nome em pastas ou extensões diferentes
+            nome = f"{caminho.parent.name}_{caminho.name}".replace(".", "_")
+        usados.add(nome)
+        destinos[caminho] = diretorio_saida / nome
+    return destinos
+
+
+def _descrever_conjunto(entradas: Sequence[Dict]) -> Dict:
+    digest = hashlib.sha256()
+    for entrada in entradas:
+        digest.update(entrada["sha256"].encode("utf-8"))
+    return {"arquivos": list(entradas), "sha256": digest.hexdigest()}
+
+
+def _tudo_atualizado(
+    diretorio_saida: Path,
+    entrada: Dict,
+    codigo_base: str,
+    assinaturas: Dict[str, str],
+) -> bool:
+    manifesto = carregar_manifesto(diretorio_saida)
+    return all(
+        dataset_atualizado(manifesto, entrada, codigo_base, nome, assinatura, diretorio_saida)
+        for nome, assinatura in assinaturas.items()
+    )
+
+
+def _construir_arquivo_do_lote(
+    caminho_entrada: Path,
+    diretorio_saida: Path,
+    especs: Dict[str, Dict],
+    forcar: bool,
+    diretorio_cache: Optional[Path],
+    limite_cache_mb: int,
+    tamanho_lote: Optional[int],
+    particoes: Optional[Sequence[str]] = None,
+    configuracao_metricas: Optional[Dict] = None,
+) -> Tuple[str, Contagens, pd.DataFrame, set, Dict, Dict[str, Dict]]:
+    # Roda num processo trabalhador: as mensagens voltam como texto para serem
+    # impressas em ordem, e as contagens e métricas voltam ao processo principal
+    if configuracao_metricas is not None:
+        ativar(ColetorMetricas(**configuracao_metricas))
+    saida = io.StringIO()
+    with redirect_stdout(saida):
+        diretorio_saida.mkdir(parents=True, exist_ok=True)
+        manifesto = {} if forcar else carregar_manifesto(diretorio_saida)
+        with etapa("manifesto.entrada"):
+            entrada = descrever_entrada(caminho_entrada, manifesto.get("entrada"))
+        codigo_base = hash_codigo_base()
+        assinaturas = assinaturas_datasets(especs, particoes)
+        pendentes = _datasets_pendentes(
+            manifesto, entrada, codigo_base, especs, assinaturas, diretorio_saida
+        )
+        contagens, amostra, fontes_disponiveis, colunas_resolvidas = contar_arquivo(
+            caminho_entrada, especs, diretorio_cache, limite_cache_mb, tamanho_lote, entrada, particoes
+        )
+        entrada = dict(entrada, colunas=colunas_resolvidas)
+        if pendentes:
+            resultados = executar_construtores(
+                amostra, fontes_disponiveis, pendentes, diretorio_saida, contagens=contagens
+            )
+            if particoes:
+                construir_particoes(amostra, fontes_disponiveis, pendentes, diretorio_saida, particoes, contagens)
+            _registrar_manifesto(diretorio_saida, manifesto, entrada, codigo_base, assinaturas, resultados)
+        _atualizar_pacote(diretorio_saida)
+    etapas = coletor_ativo().retirar_etapas() if configuracao_metricas is not None else {}
+    return saida.getvalue(), contagens, amostra, fontes_disponiveis, entrada, etapas
+
+
+def construir_lote_arquivos(
+    caminhos: Sequence[Path],
+    diretorio_saida: Path,
+    jobs: int = 1,
+    forcar: bool = False,
+    diretorio_cache: Optional[Path] = None,
+    usar_cache: bool = True,
+    limite_cache_mb: int = LIMITE_PADRAO_MB,
+    tamanho_lote: Optional[int] = None,
+    especs: Optional[Dict[str, Dict]] = None,
+    particoes: Optional[Sequence[str]] = None,
+) -> None:
+    """Gera os datasets de várias planilhas (por exemplo, uma por campus) de uma vez.
+
+    Cada planilha é lida num processo do pool (``jobs`` processos) e tem seus
+    CSVs em ``diretorio_saida/<nome do arquivo>/``. As contagens de todas são
+    somadas para gerar o conjunto geral em ``diretorio_saida/todos/``, sem
+    concatenar os quadros. A situação simplificada segue a fonte de status de
+    cada planilha.
+
+    Args:
+        caminhos (Sequence[Path]): As planilhas de entrada.
+        diretorio_saida (Path): O diretório raiz de saída.
+        jobs (int): Quantidade de planilhas processadas em paralelo.
+        forcar (bool): Ignora os manifestos de build.
+        diretorio_cache (Optional[Path]): O cache de quadros (padrão:
+            ``diretorio_cache_padrao``).
+        usar_cache (bool): Se o cache de quadros deve ser usado.
+        limite_cache_mb (int): Tamanho máximo de cada diretório de cache.
+        tamanho_lote (Optional[int]): Lê cada planilha em lotes de N linhas.
+        especs (Optional[Dict[str, Dict]]): Os datasets a gerar (padrão: ``especs_padrao``).
+        particoes (Optional[Sequence[str]]): Colunas pelas quais cada conjunto
+            também é particionado (ver ``construir_particoes``).
+    """
+    if especs is None:
+        especs = especs_padrao()
+    for caminho in caminhos:
+        if not caminho.exists():
+            raise FileNotFoundError(f"Arquivo não encontrado: {caminho}")
+    descartar_pre_processado(caminhos)
+    destinos = _diretorios_por_arquivo(caminhos, diretorio_saida)
+    destino_geral = diretorio_saida / NOME_CONJUNTO_GERAL
+    codigo_base = hash_codigo_base()
+    assinaturas = assinaturas_datasets(especs, particoes)
+
+    if not forcar:
+        entradas = [
+            descrever_entrada(caminho, carregar_manifesto(destinos[caminho]).get("entrada"))
+            for caminho in caminhos
+        ]
+        if all(
+            _tudo_atualizado(destinos[caminho], entrada, codigo_base, assinaturas)
+            for caminho, entrada in zip(caminhos, entradas)
+        ) and _tudo_atualizado(destino_geral, _descrever_conjunto(entradas), codigo_base, assinaturas):
+            print(f"Datasets inalterados em {len(caminhos)} arquivo(s) e no conjunto geral")
+            for destino in [*destinos.values(), destino_geral]:
+                _atualizar_pacote(destino)
+            return
+
+    tarefas = [
+        (
+            caminho,
+            destinos[caminho],
+            especs,
+            forcar,
+            (diretorio_cache or diretorio_cache_padrao()) if usar_cache else None,
+            limite_cache_mb,
+            tamanho_lote,
+            particoes,
+        )
+        for caminho in caminhos
+    ]
+    coletor = coletor_ativo()
+    if jobs <= 1 or len(caminhos) == 1:
+        resultados = [_construir_arquivo_do_lote(*tarefa) for tarefa in tarefas]
+    else:
+        metodos = multiprocessing.get_all_start_methods()
+        contexto = multiprocessing.get_context("fork" if "fork" in metodos else None)
+        configuracao_metricas = None if coletor is None else coletor.configuracao()
+        tarefas = [(*tarefa, configuracao_metricas) for tarefa in tarefas]
+        with ProcessPoolExecutor(max_workers=min(jobs, len(tarefas)), mp_context=contexto) as executor:
+            resultados = list(executor.map(_construir_arquivo_do_lote, *zip(*tarefas)))
+
+    total: Contagens = {}
+    amostras: List[pd.DataFrame] = []
+    fontes_disponiveis: set = set()
+    entradas = []
+    for caminho, (mensagens, contagens, amostra, fontes_arquivo, entrada, etapas) in zip(caminhos, resultados):
+        print(f"== {caminho.name} -> {destinos[caminho]}")
+        print(mensagens, end="")
+        if coletor is not None:
+            for nome_etapa, dados in etapas.items():
+                coletor.acumular(nome_etapa, dados)
+        somar_contagens(total, contagens)
+        amostras.append(amostra)
+        fontes_disponiveis |= fontes_arquivo
+        entradas.append(entrada)
+
+    print(f"== {NOME_CONJUNTO_GERAL} -> {destino_geral}")
+    destino_geral.mkdir(parents=True, exist_ok=True)
+    manifesto = {} if forcar else carregar_manifesto(destino_geral)
+    entrada_geral = _descrever_conjunto(entradas)
+    pendentes = _datasets_pendentes(
+        manifesto, entrada_geral, codigo_base, especs, assinaturas, destino_geral
+    )
+    if not pendentes:
+        _atualizar_pacote(destino_geral)
+        return
+    amostra_geral = amostrar(pd.concat(amostras, ignore_index=True))
+    with etapa("contagens.somar"):
+        contagens_gerais = ordenar_contagens(total)
+    resultados_geral = executar_construtores(
+        amostra_geral, fontes_disponiveis, pendentes, destino_geral, contagens=contagens_gerais
+    )
+    if particoes:
+        construir_particoes(
+            amostra_geral, fontes_disponiveis, pendentes, destino_geral, particoes, contagens_gerais
+        )
+    _registrar_manifesto(destino_geral, manifesto, entrada_geral, codigo_base, assinaturas, resultados_geral)
+    _atualizar_pacote(destino_geral)
+
+
+def verificar_entrada(
+    caminho_entrada: Path,
+    especs: Dict[str, Dict],
+    diretorio_saida: Optional[Path] = None,
+    particoes: Optional[Sequence[str]] = None,
+) -> Dict[str, bool]:
+    """Informa o que o build faria com cada dataset lendo só o cabeçalho da planilha.
+
+    Nem os dados nem o pandas são carregados, então um dataset que seria
+    gerado ainda pode sair vazio (coluna presente, mas sem valores).
+
+    Args:
+        caminho_entrada (Path): A planilha mestre.
+        especs (Dict[str, Dict]): Os datasets a verificar.
+        diretorio_saida (Optional[Path]): Com ele, os datasets já atualizados
+            segundo o manifesto de build são informados como inalterados.
+        particoes (Optional[Sequence[str]]): As partições pedidas no build,
+            que fazem parte da assinatura dos datasets.
+
+    Returns:
+        Dict[str, bool]: Por arquivo, se o dataset seria gerado ou já está atualizado.
+    """
+    if not caminho_entrada.exists():
+        raise FileNotFoundError(f"Arquivo não encontrado: {caminho_entrada}")
+    colunas_resolvidas = resolver_colunas(ler_cabecalho_planilha(caminho_entrada))
+    ausentes = [canonica for canonica in SINONIMOS_COLUNAS if canonica not in colunas_resolvidas]
+    print(f"Colunas reconhecidas: {len(colunas_resolvidas)} de {len(SINONIMOS_COLUNAS)}")
+    if ausentes:
+        print(f"Colunas ausentes: {', '.join(ausentes)}")
+
+    manifesto: Dict = {}
+    if diretorio_saida is not None:
+        manifesto = carregar_manifesto(diretorio_saida)
+    if manifesto:
+        entrada = descrever_entrada(caminho_entrada, manifesto.get("entrada"))
+        codigo_base = hash_codigo_base()
+        assinaturas = assinaturas_datasets(especs, particoes)
+
+    resultados: Dict[str, bool] = {}
+    fontes_disponiveis = set(colunas_resolvidas)
+    for nome_arquivo, spec in especs.items():
+        builder_name = spec.get("builder")
+        if builder_name not in CONSTRUTORES:
+            print(f"Construtor não encontrado para: {nome_arquivo}")
+            resultados[nome_arquivo] = False
+        elif not tem_fontes_necessarias(fontes_disponiveis, spec):
+            print(f"Dataset pulado (fontes ausentes): {nome_arquivo}")
+            resultados[nome_arquivo] = False
+        elif manifesto and dataset_atualizado(
+            manifesto, entrada, codigo_base, nome_arquivo, assinaturas[nome_arquivo], diretorio_saida
+        ):
+            print(f"Dataset inalterado: {nome_arquivo}")
+            resultados[nome_arquivo] = True
+        else:
+            print(f"Seria gerado: {nome_arquivo}")
+            resultados[nome_arquivo] = True
+    return resultados
 
 
 def parse_args(argv: Optional[Iterable[str]] = None):
     parser = argparse.ArgumentParser(description="Gera datasets agregados em CSV")
-    parser.add_argument("--in", dest="caminho_entrada", required=True, help="Arquivo mestre (.xls/.xlsx)")
+    parser.add_argument(
+        "--in",
+        dest="caminho_entrada",
+        required=True,
+        help=(
+            "Arquivo mestre (.xls/.xlsx); um diretório ou padrão glob (entre aspas) "
+            "gera um conjunto por arquivo e o conjunto geral somado"
+        ),
+    )
     parser.add_argument("--out", dest="diretorio_saida", required=True, help="Diretório de saída para CSVs")
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="Construtores executados em paralelo; com várias entradas, arquivos lidos em paralelo (padrão: 1)",
+    )
+    parser.add_argument(
+        "--processos",
+        action="store_true",
+        help="Usa processos em vez de threads quando --jobs > 1",
+    )
+    parser.add_argument(
+        "--forcar",
+        action="store_true",
+        help="Regera todos os datasets, ignorando o manifesto de build",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        dest="diretorio_cache",
+        help=(
+            f"Diretório do cache de quadros (padrão: $XDG_CACHE_HOME/{NOME_DIRETORIO_CACHE}). Os arquivos são"
+            " pickles, carregados sem verificação: use só um diretório em que apenas você grava"
+        ),
+    )
+    parser.add_argument(
+        "--cache-max-mb",
+        dest="limite_cache_mb",
+        type=int,
+        default=LIMITE_PADRAO_MB,
+        help=f"Tamanho máximo do cache em MB (padrão: {LIMITE_PADRAO_MB})",
+    )
+    parser.add_argument(
+        "--sem-cache",
+        action="store_true",
+        help="Não lê nem grava o cache de quadros",
+    )
+    parser.add_argument(
+        "--lote",
+        dest="tamanho_lote",
+        type=int,
+        help="Lê a planilha em lotes de N linhas, limitando a memória (dispensa o cache de quadros)",
+    )
+    parser.add_argument(
+        "--only",
+        dest="apenas",
+        nargs="+",
+        metavar="DATASET",
+        help="Gera apenas estes datasets, inclusive os opcionais, como o cubo (ex.: alunos_por_situacao ou alunos_por_situacao.csv)",
+    )
+    parser.add_argument(
+        "--exclude",
+        dest="excluir",
+        nargs="+",
+        metavar="DATASET",
+        help="Não gera estes datasets",
+    )
+    parser.add_argument(
+        "--particoes",
+        nargs="*",
+        choices=DIMENSOES_PARTICAO,
+        metavar="DIMENSAO",
+        help=(
+            "Grava também os datasets de cada valor destas colunas em particoes/<coluna>/<valor>/, "
+            f"com o índice particoes/indice.json ({', '.join(DIMENSOES_PARTICAO)}; "
+            f"sem argumentos: {' '.join(PARTICOES_PADRAO)})"
+        ),
+    )
+    parser.add_argument(
+        "--metrics",
+        dest="caminho_metricas",
+        metavar="ARQUIVO",
+        help="Grava em JSON o tempo, a CPU, as linhas e a memória de cada etapa e construtor",
+    )
+    parser.add_argument(
+        "--perfil",
+        metavar="ETAPA",
+        help=(
+            "Perfila uma etapa ou construtor (ex.: pre_processar.datas, carregar.excel, "
+            "alunos_por_situacao); o perfil vai para o diretório do --metrics"
+        ),
+    )
+    parser.add_argument(
+        "--perfilador",
+        choices=PERFILADORES,
+        default=PERFILADORES[0],
+        help=f"Perfilador usado por --perfil (padrão: {PERFILADORES[0]})",
+    )
+    parser.add_argument(
+        "--vigiar",
+        action="store_true",
+        help=(
+            "Fica residente: regera os datasets afetados sempre que a entrada mudar, "
+            "mantendo o pandas e o último quadro em memória"
+        ),
+    )
+    parser.add_argument(
+        "--intervalo",
+        type=float,
+        default=INTERVALO_PADRAO,
+        help=f"Segundos entre as verificações da entrada com --vigiar (padrão: {INTERVALO_PADRAO:g})",
+    )
+    parser.add_argument(
+        "--check",
+        dest="verificar",
+        action="store_true",
+        help=(
+            "Só lê o cabeçalho, resolve as colunas e lista os datasets que seriam gerados; "
+            "sai com erro se nenhum seria"
+        ),
+    )
     return parser.parse_args(argv)
 
 
+def executar(args, especs: Dict[str, Dict]) -> None:
+    """Roda o build descrito pelos argumentos da linha de comando."""
+    diretorio_saida = Path(args.diretorio_saida)
+    entradas = listar_entradas(args.caminho_entrada)
+    if not entradas:
+        sys.exit(f"Nenhuma planilha encontrada em: {args.caminho_entrada}")
+    varios_arquivos = len(entradas) > 1 or Path(args.caminho_entrada).is_dir()
+    particoes = args.particoes
+    if particoes is not None and not particoes:
+        particoes = PARTICOES_PADRAO
+
+    if args.verificar:
+        destinos = (
+            _diretorios_por_arquivo(entradas, diretorio_saida)
+            if varios_arquivos
+            else {entradas[0]: diretorio_saida}
+        )
+        algum = False
+        for caminho in entradas:
+            if varios_arquivos:
+                print(f"== {caminho.name} -> {destinos[caminho]}")
+            try:
+                resultados = verificar_entrada(
+                    caminho, especs, None if args.forcar else destinos[caminho], particoes
+                )
+            except FileNotFoundError as err:
+                sys.exit(str(err))
+            algum = algum or any(resultados.values())
+        if not algum:
+            sys.exit("Nenhum dataset seria gerado")
+        return
+
+    if varios_arquivos:
+        construir_lote_arquivos(
+            entradas,
+            diretorio_saida,
+            jobs=args.jobs,
+            forcar=args.forcar,
+            diretorio_cache=Path(args.diretorio_cache) if args.diretorio_cache else None,
+            usar_cache=not args.sem_cache,
+            limite_cache_mb=args.limite_cache_mb,
+            tamanho_lote=args.tamanho_lote,
+            especs=especs,
+            particoes=particoes,
+        )
+        return
+
+    caminho_entrada = entradas[0]
+    diretorio_cache = None
+    if not args.sem_cache:
+        diretorio_cache = Path(args.diretorio_cache) if args.diretorio_cache else diretorio_cache_padrao()
+    construir_datasets(
+        caminho_entrada,
+        diretorio_saida,
+        jobs=args.jobs,
+        processos=args.processos,
+        forcar=args.forcar,
+        diretorio_cache=diretorio_cache,
+        limite_cache_mb=args.limite_cache_mb,
+        tamanho_lote=args.tamanho_lote,
+        especs=especs,
+        particoes=particoes,
+    )
+
+
+def _executar_com_metricas(args, especs: Dict[str, Dict], argumentos: List[str]) -> None:
+    if not (args.caminho_metricas or args.perfil):
+        executar(args, especs)
+        return
+    caminho_metricas = Path(args.caminho_metricas) if args.caminho_metricas else None
+    coletor = ColetorMetricas(
+        alvo_perfil=args.perfil,
+        perfilador=args.perfilador,
+        diretorio_perfil=caminho_metricas.parent if caminho_metricas else None,
+    )
+    ativar(coletor)
+    try:
+        executar(args, especs)
+    finally:
+        ativar(None)
+        if caminho_metricas is not None:
+            coletor.salvar(
+                caminho_metricas,
+                entrada=args.caminho_entrada,
+                saida=args.diretorio_saida,
+                argumentos=argumentos,
+            )
+        for caminho in coletor.perfis_gravados:
+            print(f"Perfil: {caminho}")
+
+
 def main(argv: Optional[Iterable[str]] = None) -> None:
     args = parse_args(argv)
-    caminho_entrada = Path(args.caminho_entrada)
-    diretorio_saida = Path(args.diretorio_saida)
-    construir_datasets(caminho_entrada, diretorio_saida)
+    argumentos = sys.argv[1:] if argv is None else list(argv)
+    try:
+        especs = selecionar_especs(args.apenas, args.excluir)
+    except ValueError as err:
+        sys.exit(str(err))
+    if not especs:
+        sys.exit("Nenhum dataset selecionado")
+    if args.vigiar and args.verificar:
+        sys.exit("--vigiar e --check não podem ser usados juntos")
 
+    if not args.vigiar:
+        _executar_com_metricas(args, especs, argumentos)
+        return
+    # Processo residente: pandas, construtores e o último quadro ficam carregados
+    # entre builds; cada build regrava as métricas, se pedidas
+    manter_pre_processado_em_memoria()
+    print(f"Vigiando {args.caminho_entrada} a cada {args.intervalo:g}s")
+    vigiar(
+        lambda: listar_entradas(args.caminho_entrada),
+        lambda: _executar_com_metricas(args, especs, argumentos),
+        args.intervalo,
+    )
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,46 @@
+"""Construtores dos datasets de ESPECS_SAIDA.
+
+Cada módulo expõe ``construir(df, ..., contagens=None)`` e só é importado
+quando o seu dataset é gerado.
+"""
+import importlib
+from types import ModuleType
+from typing import Dict, Optional
+
+# Registro estático: nome usado em ``builder`` -> módulo que o implementa
+CONSTRUTORES: Dict[str, str] = {
+    nome: f"{__name__}.{nome}"
+    for nome in (
+        "alunos_por_situacao",
+        "cota_mec",
+        "cota_sistec",
+        "coorte_situacao",
+        "cotas",
+        "cubo",
+        "curva_conclusao",
+        "dist_percentual_progresso",
+        "etnia_raca",
+        "forma_ingresso",
+        "modalidade",
+        "natureza_escola",
+        "natureza_participacao",
+        "necessidades_especiais",
+        "situacao_escola",
+        "tempo_conclusao",
+        "tipo_escola_origem",
+        "transporte_tipo",
+        "turno",
+    )
+}
+
+
+def carregar_construtor(nome: str) -> Optional[ModuleType]:
+    """Importa o módulo do construtor ``nome`` (``None`` se não registrado).
+
+    O ``import_module`` já guarda o módulo em ``sys.modules``: só o primeiro
+    uso de cada construtor paga a importação.
+    """
+    caminho = CONSTRUTORES.get(nome)
+    if caminho is None:
+        return None
+    return importlib.import_module(caminho)
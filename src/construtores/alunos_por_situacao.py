@@ -1,10 +1,14 @@
 """Constrói o dataset de alunos por situação."""
 from typing import Optional
+
+import numpy as np
 import pandas as pd
+from agregacao import Contagens, obter_contagem
 
 def construir(
     df: pd.DataFrame,
     coluna_status: str,
+    contagens: Optional[Contagens] = None,
 ) -> pd.DataFrame:
     """
     Constrói o dataset de alunos por situação.
@@ -12,18 +16,18 @@ def construir(
     Args:
         df (pd.DataFrame): O DataFrame pré-processado.
         coluna_status (str): A coluna de status a ser usada.
+        contagens (Optional[Contagens]): Contagens pré-calculadas por agrupamento.
 
     Returns:
         pd.DataFrame: O DataFrame do dataset.
     """
-    series = df[coluna_status].fillna("Não informado")
+    contagem = obter_contagem(df, contagens, coluna_status, incluir_ausentes=True)
+    situacoes = np.where(contagem.index.isna(), "Não informado", contagem.index.astype(object))
     agrupado = (
-        series.groupby(series)
-        .size()
+        contagem.groupby(situacoes)
+        .sum()
         .reset_index(name="qtd")
         .sort_values("qtd", ascending=False)
-        .rename(columns={coluna_status: "Situacao"})
     )
-    agrupado = agrupado.rename(columns={series.name: "Situacao"})
     agrupado.columns = ["Situacao", "qtd"]
     return agrupado
@@ -0,0 +1,29 @@
+"""Constrói o dataset de situação por coorte de ingresso e curso."""
+from typing import Optional
+
+import pandas as pd
+from agregacao import Contagens, obter_contagem
+
+def construir(df: pd.DataFrame, contagens: Optional[Contagens] = None) -> pd.DataFrame:
+    """
+    Gera a matriz coorte × curso × situação em formato esparso.
+
+    Só as combinações com alunos viram linhas (a contagem já omite as
+    células vazias), então o tamanho acompanha os dados e não o produto
+    cartesiano das três dimensões.
+
+    Args:
+        df (pd.DataFrame): O DataFrame pré-processado.
+        contagens (Optional[Contagens]): Contagens pré-calculadas por agrupamento.
+
+    Returns:
+        pd.DataFrame: O DataFrame do dataset.
+    """
+    agrupado = obter_contagem(df, contagens, "coorte_ano", "curso", "status_simplificado").reset_index(name="qtd")
+    agrupado.columns = ["Coorte", "Curso", "Situacao", "qtd"]
+    if agrupado.empty:
+        return agrupado
+    agrupado["Coorte"] = agrupado["Coorte"].astype("int64")
+    total_coorte = agrupado.groupby(["Coorte", "Curso"], sort=False)["qtd"].transform("sum")
+    agrupado["pct_coorte"] = (agrupado["qtd"] / total_coorte * 100).round(2)
+    return agrupado
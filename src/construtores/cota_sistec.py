@@ -1,13 +1,17 @@
 """Constrói o dataset de cota Sistec."""
+from typing import Optional
+
 import pandas as pd
+from agregacao import Contagens
 from grafico_utils import contar_categoria_simples
 
-def construir(df: pd.DataFrame) -> pd.DataFrame:
+def construir(df: pd.DataFrame, contagens: Optional[Contagens] = None) -> pd.DataFrame:
     """
     Constrói o dataset de cota Sistec.
 
     Args:
         df (pd.DataFrame): O DataFrame pré-processado.
+        contagens (Optional[Contagens]): Contagens pré-calculadas por agrupamento.
 
     Returns:
         pd.DataFrame: O DataFrame do dataset.
@@ -19,4 +23,5 @@ def construir(df: pd.DataFrame) -> pd.DataFrame:
         incluir_percentual=True,
         nome_percentual="pct_total",
         casas_percentual=2,
+        contagens=contagens,
     )
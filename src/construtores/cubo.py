@@ -0,0 +1,40 @@
+"""Constrói o cubo de contagens sobre várias dimensões."""
+from typing import Optional, Sequence
+
+import pandas as pd
+from agregacao import Contagens, obter_contagem
+
+def construir(
+    df: pd.DataFrame,
+    dimensoes: Sequence[str],
+    contagens: Optional[Contagens] = None,
+) -> pd.DataFrame:
+    """
+    Gera o cubo de contagens de ``dimensoes`` em formato esparso (COO).
+
+    Cada linha é uma combinação presente nos dados, com a sua quantidade; as
+    dimensões saem como categorias, que o JSON grava como códigos inteiros
+    mais o dicionário de rótulos. O front-end fatia e soma o cubo para
+    montar qualquer cruzamento dessas dimensões sem um novo build.
+
+    Args:
+        df (pd.DataFrame): O DataFrame pré-processado.
+        dimensoes (Sequence[str]): As colunas do cubo.
+        contagens (Optional[Contagens]): Contagens pré-calculadas por agrupamento.
+
+    Returns:
+        pd.DataFrame: O DataFrame do dataset.
+    """
+    contagem = obter_contagem(df, contagens, *dimensoes, incluir_ausentes=True)
+    indice = contagem.index
+    if not isinstance(indice, pd.MultiIndex):
+        indice = pd.MultiIndex.from_arrays([indice], names=[dimensoes[0]])
+    # Os códigos do índice já são a fatoração de cada dimensão (-1 para ausentes)
+    cubo = pd.DataFrame(
+        {
+            dimensao: pd.Categorical.from_codes(codigos, categories=niveis)
+            for dimensao, codigos, niveis in zip(dimensoes, indice.codes, indice.levels)
+        }
+    )
+    cubo["qtd"] = contagem.to_numpy()
+    return cubo
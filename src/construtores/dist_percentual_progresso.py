@@ -1,22 +1,24 @@
 """Constrói o dataset de distribuição de percentual de progresso."""
+from typing import Optional
+
 import pandas as pd
+from agregacao import Contagens, obter_contagem
 
 ORDEM_BUCKET = ["0-25%", "25-50%", "50-75%", "75-100%"]
 
-def construir(df: pd.DataFrame) -> pd.DataFrame:
+def construir(df: pd.DataFrame, contagens: Optional[Contagens] = None) -> pd.DataFrame:
     """
     Constrói o dataset de distribuição de percentual de progresso.
 
     Args:
         df (pd.DataFrame): O DataFrame pré-processado.
+        contagens (Optional[Contagens]): Contagens pré-calculadas por agrupamento.
 
     Returns:
         pd.DataFrame: O DataFrame do dataset.
     """
-    filtrado = df[df["bucket_progresso"].notna()]
     agrupado = (
-        filtrado.groupby("bucket_progresso")
-        .size()
+        obter_contagem(df, contagens, "bucket_progresso")
         .reset_index(name="qtd")
         .rename(columns={"bucket_progresso": "Bucket_Progresso"})
     )
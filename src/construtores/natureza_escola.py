@@ -1,18 +1,18 @@
 """Constrói o dataset de natureza e tipo de escola."""
+from typing import Optional
+
 import pandas as pd
+from agregacao import Contagens, obter_contagem
 
-def construir(df: pd.DataFrame) -> pd.DataFrame:
+def construir(df: pd.DataFrame, contagens: Optional[Contagens] = None) -> pd.DataFrame:
     """
     Gera o dataset combinado de natureza de participação e tipo de escola.
 
     Args:
         df (pd.DataFrame): O DataFrame pré-processado.
+        contagens (Optional[Contagens]): Contagens pré-calculadas por agrupamento.
 
     Returns:
         pd.DataFrame: O DataFrame do dataset.
     """
-    return (
-        df.groupby(["natureza_participacao", "tipo_escola_origem"])
-        .size()
-        .reset_index(name="qtd")
-    )
+    return obter_contagem(df, contagens, "natureza_participacao", "tipo_escola_origem").reset_index(name="qtd")
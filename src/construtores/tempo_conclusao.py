@@ -0,0 +1,35 @@
+"""Constrói o dataset de tempo até a conclusão por curso e coorte."""
+from typing import Optional
+
+import pandas as pd
+from agregacao import Contagens, obter_contagem, quantis_de_contagem
+
+QUANTIS = {"p25": 0.25, "mediana": 0.5, "p75": 0.75, "p90": 0.9}
+
+def construir(df: pd.DataFrame, contagens: Optional[Contagens] = None) -> pd.DataFrame:
+    """
+    Gera mediana e percentis de ``tempo_curso_meses`` dos concluintes por curso e coorte.
+
+    Os quantis saem da contagem por tempo (ver ``quantis_de_contagem``), o
+    que os mantém exatos também na leitura em lotes e no conjunto geral.
+    Tempos negativos (conclusão anterior à matrícula) são descartados.
+
+    Args:
+        df (pd.DataFrame): O DataFrame pré-processado.
+        contagens (Optional[Contagens]): Contagens pré-calculadas por agrupamento.
+
+    Returns:
+        pd.DataFrame: O DataFrame do dataset.
+    """
+    contagem = obter_contagem(df, contagens, "curso", "coorte_ano", "status_simplificado", "tempo_curso_meses")
+    situacoes = contagem.index.get_level_values("status_simplificado")
+    tempos = contagem.index.get_level_values("tempo_curso_meses")
+    concluidos = contagem[(situacoes == "Concluído") & (tempos >= 0)].droplevel("status_simplificado")
+    if concluidos.empty:
+        return pd.DataFrame()
+
+    agrupado = quantis_de_contagem(concluidos, "tempo_curso_meses", list(QUANTIS.values()))
+    agrupado.columns = ["Curso", "Coorte", "concluidos", *QUANTIS]
+    agrupado["Coorte"] = agrupado["Coorte"].astype("int64")
+    agrupado[list(QUANTIS)] = agrupado[list(QUANTIS)].round(2)
+    return agrupado
@@ -1,33 +1,42 @@
 """Constrói o dataset de tipo de transporte."""
+from typing import Optional
+
+import numpy as np
 import pandas as pd
+from agregacao import Contagens, obter_contagem
 from grafico_utils import contar_categoria_simples
 
-def construir(df: pd.DataFrame) -> pd.DataFrame:
+def construir(df: pd.DataFrame, contagens: Optional[Contagens] = None) -> pd.DataFrame:
     """
     Gera o dataset de transporte combinado.
 
     Args:
         df (pd.DataFrame): O DataFrame pré-processado.
+        contagens (Optional[Contagens]): Contagens pré-calculadas por agrupamento.
 
     Returns:
         pd.DataFrame: O DataFrame do dataset.
     """
-    df_copia = df.copy()
-    # Combina as colunas, tratando valores ausentes
-    df_copia["transporte_combinado"] = (
-        df_copia["transporte_tipo"].fillna("Não informado")
-        + " - "
-        + df_copia["transporte_publico"].fillna("Não informado")
+    contagem = obter_contagem(
+        df, contagens, "transporte_tipo", "transporte_publico", incluir_ausentes=True
     )
+    # Combina as colunas, tratando valores ausentes
+    partes = [
+        np.where(pd.isna(nivel), "Não informado", nivel.astype(object))
+        for nivel in (
+            contagem.index.get_level_values("transporte_tipo"),
+            contagem.index.get_level_values("transporte_publico"),
+        )
+    ]
+    combinado = pd.Index(partes[0] + " - " + partes[1], name="transporte_combinado")
     # Limpa entradas que são apenas separadores
-    df_copia["transporte_combinado"] = df_copia["transporte_combinado"].replace(
-        "Não informado - Não informado", "Não informado"
-    )
+    combinado = combinado.where(combinado != "Não informado - Não informado", "Não informado")
     return contar_categoria_simples(
-        df_copia,
+        df,
         "transporte_combinado",
         nome_coluna_saida="Transporte_Tipo",
         incluir_percentual=True,
         nome_percentual="pct_total",
         casas_percentual=2,
+        contagens={("transporte_combinado",): pd.Series(contagem.to_numpy(), index=combinado)},
     )
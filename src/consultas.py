@@ -0,0 +1,182 @@
+"""Contagens sob demanda sobre o quadro pré-processado, com cache LRU dos resultados (``/api/agg``)."""
+from __future__ import annotations
+
+import gzip
+import hashlib
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from agregacao import calcular_contagens, fatorar
+from cache_quadros import LIMITE_PADRAO_MB
+from construir_datasets import COLUNAS_CATEGORICAS, carregar_pre_processado, quadro_para_json
+from importacao import importar_sob_demanda
+
+np = importar_sob_demanda("numpy")
+pd = importar_sob_demanda("pandas")
+
+# Colunas que podem ser agrupadas ou filtradas: as categóricas e as derivadas discretas
+DIMENSOES_CONSULTA = [*COLUNAS_CATEGORICAS, "status_simplificado", "bucket_progresso", "tem_ne", "coorte_ano"]
+
+CAPACIDADE_PADRAO = 512
+# Resultados menores que isso não compensam a versão gzip
+LIMITE_GZIP = 1024
+
+# Dimensões, na ordem pedida, e filtros (coluna, valores aceitos), em ordem de coluna
+Consulta = Tuple[Tuple[str, ...], Tuple[Tuple[str, Tuple[str, ...]], ...]]
+
+
+class Resultado(NamedTuple):
+    corpo: bytes
+    gzip: Optional[bytes]
+    etag: str
+
+
+def _verificar_dimensao(coluna: str) -> None:
+    if coluna not in DIMENSOES_CONSULTA:
+        raise ValueError(f"Dimensão desconhecida: {coluna} (use uma de: {', '.join(DIMENSOES_CONSULTA)})")
+
+
+def normalizar_consulta(dimensoes: Iterable[str], filtros: Iterable[str]) -> Consulta:
+    """Valida e normaliza ``dims`` e ``filter``; consultas equivalentes dão a mesma chave.
+
+    ``dimensoes`` são nomes de coluna (repetições são ignoradas) e cada
+    filtro tem a forma ``coluna:valor`` ou ``coluna:valor1|valor2``; filtros
+    repetidos na mesma coluna se combinam (só os valores comuns passam).
+
+    Raises:
+        ValueError: Se alguma coluna não puder ser consultada ou um filtro estiver malformado.
+    """
+    colunas = tuple(dict.fromkeys(dimensao.strip() for dimensao in dimensoes if dimensao.strip()))
+    for coluna in colunas:
+        _verificar_dimensao(coluna)
+    aceitos: Dict[str, set] = {}
+    for filtro in filtros:
+        coluna, separador, valores = filtro.partition(":")
+        coluna = coluna.strip()
+        if not separador or not coluna:
+            raise ValueError(f"Filtro malformado: {filtro!r} (use coluna:valor ou coluna:valor1|valor2)")
+        _verificar_dimensao(coluna)
+        conjunto = {valor.strip() for valor in valores.split("|")}
+        aceitos[coluna] = aceitos[coluna] & conjunto if coluna in aceitos else conjunto
+    return colunas, tuple((coluna, tuple(sorted(aceitos[coluna]))) for coluna in sorted(aceitos))
+
+
+def _rotulo(valor) -> str:
+    # Como o valor aparece nos CSVs: anos em float (2021.0) são comparados como 2021
+    if isinstance(valor, (float, np.floating)) and float(valor).is_integer():
+        return str(int(valor))
+    return str(valor)
+
+
+class ConsultasAgregadas:
+    """Responde contagens por dimensões e filtros sobre o quadro de ``pre_processar``.
+
+    O quadro é carregado uma vez (pelo cache de quadros do build, se houver)
+    e recarregado quando o mtime ou o tamanho da entrada mudam; nesse
+    momento o cache de resultados é esvaziado. Os resultados já vão
+    serializados (JSON em colunas, como os datasets) e ficam num LRU de
+    ``capacidade`` consultas, chaveado pela consulta normalizada.
+    Seguro para uso por várias threads.
+    """
+
+    def __init__(
+        self,
+        caminho_entrada: Path,
+        diretorio_cache: Optional[Path] = None,
+        capacidade: int = CAPACIDADE_PADRAO,
+        limite_cache_mb: int = LIMITE_PADRAO_MB,
+    ) -> None:
+        self.caminho_entrada = caminho_entrada
+        self.diretorio_cache = diretorio_cache
+        self.capacidade = capacidade
+        self.limite_cache_mb = limite_cache_mb
+        self._trava_quadro = threading.Lock()
+        self._trava_resultados = threading.Lock()
+        self._versao: Optional[Tuple[int, int]] = None
+        self._quadro: Optional[pd.DataFrame] = None
+        self._fatorados: Dict[str, Tuple[np.ndarray, List[str]]] = {}
+        self._resultados: "OrderedDict[Consulta, Resultado]" = OrderedDict()
+        self.acertos = 0
+        self.faltas = 0
+
+    def carregar(self) -> pd.DataFrame:
+        """Devolve o quadro atual, recarregando-o se a entrada mudou desde a última leitura."""
+        estado = self.caminho_entrada.stat()
+        versao = (estado.st_mtime_ns, estado.st_size)
+        if versao == self._versao:
+            return self._quadro
+        with self._trava_quadro:
+            if versao != self._versao:
+                df, _, _ = carregar_pre_processado(self.caminho_entrada, self.diretorio_cache, self.limite_cache_mb)
+                with self._trava_resultados:
+                    self._quadro = df
+                    self._fatorados = {}
+                    self._resultados.clear()
+                    self._versao = versao
+        return self._quadro
+
+    @staticmethod
+    def _codigos(df: pd.DataFrame, fatorados: Dict, coluna: str) -> Tuple[np.ndarray, List[str]]:
+        # Fatorado uma vez por versão do quadro; os rótulos em texto servem aos filtros
+        guardado = fatorados.get(coluna)
+        if guardado is None:
+            codigos, valores = fatorar(df[coluna])
+            guardado = (codigos, [_rotulo(valor) for valor in valores])
+            fatorados[coluna] = guardado
+        return guardado
+
+    def _calcular(self, df: pd.DataFrame, fatorados: Dict, consulta: Consulta) -> pd.DataFrame:
+        dimensoes, filtros = consulta
+        mascara = np.ones(len(df), dtype=bool)
+        for coluna, valores in filtros:
+            codigos, rotulos = self._codigos(df, fatorados, coluna)
+            aceitos = set(valores)
+            # Posição 0 para ausentes (código -1), que nenhum filtro aceita
+            permitidos = np.array([False] + [rotulo in aceitos for rotulo in rotulos], dtype=bool)
+            mascara &= permitidos[codigos + 1]
+        if not dimensoes:
+            return pd.DataFrame({"qtd": [int(mascara.sum())]})
+        quadro = df.loc[mascara, list(dimensoes)] if filtros else df
+        # Ausentes incluídos, como no cubo: as quantidades somam o total filtrado
+        contagem = calcular_contagens(quadro, [dimensoes])[dimensoes]
+        return contagem.reset_index()
+
+    def consultar(self, dimensoes: Iterable[str], filtros: Sequence[str] = ()) -> Resultado:
+        """Conta as combinações de ``dimensoes`` entre as linhas que passam por ``filtros``.
+
+        Args:
+            dimensoes (Iterable[str]): As colunas agrupadas (nenhuma: só o total).
+            filtros (Sequence[str]): Filtros ``coluna:valor1|valor2``, combinados com E.
+
+        Returns:
+            Resultado: O JSON em colunas (``dimensões..., qtd``), sua versão gzip e a ETag.
+
+        Raises:
+            ValueError: Se a consulta for inválida (ver ``normalizar_consulta``).
+        """
+        consulta = normalizar_consulta(dimensoes, filtros)
+        self.carregar()
+        with self._trava_resultados:
+            # Quadro, fatorações e versão do mesmo carregamento
+            df, fatorados, versao = self._quadro, self._fatorados, self._versao
+            resultado = self._resultados.get(consulta)
+            if resultado is not None:
+                self._resultados.move_to_end(consulta)
+                self.acertos += 1
+                return resultado
+            self.faltas += 1
+        corpo = quadro_para_json(self._calcular(df, fatorados, consulta))
+        resultado = Resultado(
+            corpo,
+            gzip.compress(corpo, compresslevel=6, mtime=0) if len(corpo) >= LIMITE_GZIP else None,
+            f'"{hashlib.sha256(corpo).hexdigest()[:32]}"',
+        )
+        with self._trava_resultados:
+            # Um recarregamento no meio do cálculo torna o resultado velho para o cache
+            if versao == self._versao:
+                self._resultados[consulta] = resultado
+                while len(self._resultados) > self.capacidade:
+                    self._resultados.popitem(last=False)
+        return resultado
@@ -0,0 +1,264 @@
+#!/usr/bin/env -S ./.venv/bin/python
+"""Gera exportações mestre sintéticas do SUAP para medir o desempenho do build."""
+import argparse
+import unicodedata
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from construir_datasets import SINONIMOS_COLUNAS
+
+DATA_BASE_EXCEL = datetime(1899, 12, 30)
+
+# Valores plausíveis por coluna canônica; a ordem não importa
+VALORES = {
+    "curso": [
+        "Técnico em Informática Integrado ao Ensino Médio",
+        "Técnico em Edificações",
+        "Técnico em Eletrotécnica Subsequente",
+        "Tecnologia em Análise e Desenvolvimento de Sistemas",
+        "Licenciatura em Matemática",
+        "Bacharelado em Engenharia Elétrica",
+        "Especialização em Educação Profissional",
+        "PROEJA Técnico em Comércio",
+    ],
+    "situacao_curso": [
+        "Matriculado",
+        "Em curso",
+        "Concluído",
+        "Formado",
+        "Cancelado",
+        "Evasão",
+        "Desligado",
+        "Trancado",
+        "Transferido Externo",
+        "Jubilado",
+    ],
+    "situacao_sistema": ["Ativo", "Inativo", "Ativo - Em curso", "Cancelado", "Concluído"],
+    "modalidade": [
+        "Integrado",
+        "Subsequente",
+        "Concomitante",
+        "Tecnologia",
+        "Licenciatura",
+        "Bacharelado",
+        "Especialização",
+        "PROEJA",
+    ],
+    "turno": ["Matutino", "Vespertino", "Noturno", "Integral", "EAD"],
+    "forma_ingresso": [
+        "Processo Seletivo",
+        "SISU",
+        "Transferência Externa",
+        "Portador de Diploma",
+        "Reingresso",
+        "Vestibular",
+    ],
+    "campus": ["Cuiabá", "Rondonópolis", "Várzea Grande", "Cáceres", "Sorriso", "Barra do Garças"],
+    "cota_mec": [
+        "Não optante",
+        "Escola pública, renda <= 1,5 SM, PPI",
+        "Escola pública, renda <= 1,5 SM",
+        "Escola pública, PPI",
+        "Escola pública",
+        "Pessoa com deficiência",
+    ],
+    "cota_sistec": ["Não se aplica", "Escola pública", "Renda", "Étnico-racial", "PcD"],
+    "etnia_raca": ["Parda", "Branca", "Preta", "Amarela", "Indígena", "Não declarado"],
+    "necessidades_especiais": [
+        "Não possui",
+        "Não",
+        "Nenhuma",
+        "Deficiência Visual",
+        "Deficiência Auditiva",
+        "Deficiência Física",
+        "Transtorno do Espectro Autista",
+        "Altas Habilidades/Superdotação",
+    ],
+    "pendencias_conclusao": ["", "Estágio", "TCC", "Atividades complementares", "ENADE"],
+    "estado": ["MT", "MS", "GO", "RO", "PA"],
+    "cidade": ["Cuiabá", "Várzea Grande", "Rondonópolis", "Cáceres", "Sinop", "Tangará da Serra"],
+    "polo": ["", "Polo Jaciara", "Polo Primavera do Leste", "Polo Alto Araguaia"],
+    "transporte_publico": ["Municipal", "Estadual"],
+    "transporte_tipo": ["Ônibus", "Van", "Barco", "Bicicleta", "Outro"],
+    "tipo_escola_origem": ["Pública", "Privada", "Pública Federal", "Comunitária"],
+    "natureza_participacao": ["Presencial", "Remota", "Semipresencial"],
+}
+
+# Proporção de células vazias por coluna (as demais usam PROPORCAO_VAZIOS_PADRAO)
+PROPORCAO_VAZIOS = {
+    "data_conclusao": 0.65,
+    "data_integralizacao": 0.75,
+    "necessidades_especiais": 0.4,
+    "polo": 0.6,
+    "transporte_publico": 0.7,
+    "transporte_tipo": 0.7,
+    "situacao_curso": 0.02,
+}
+PROPORCAO_VAZIOS_PADRAO = 0.05
+
+EXTRAS = ["Matrícula", "Nome", "E-mail Acadêmico", "CPF", "Telefone", "Nome da Mãe", "Endereço"]
+
+
+def _variante_cabecalho(rng: np.random.Generator, canonica: str) -> str:
+    # Sinônimo aleatório, às vezes sem acentos ou em maiúsculas: resolver_colunas aceita todos
+    nome = str(rng.choice(SINONIMOS_COLUNAS[canonica]))
+    sorteio = rng.random()
+    if sorteio < 0.2:
+        nome = "".join(
+            ch for ch in unicodedata.normalize("NFKD", nome) if not unicodedata.combining(ch)
+        )
+    elif sorteio < 0.3:
+        nome = nome.upper()
+    return nome
+
+
+def _datas(rng: np.random.Generator, linhas: int, inicio: datetime, dias: int) -> np.ndarray:
+    """Mistura datetime, texto dd/mm/aaaa, texto ISO e seriais do Excel, como nas exportações reais."""
+    deslocamentos = rng.integers(0, dias, size=linhas)
+    formatos = rng.choice(4, size=linhas, p=[0.45, 0.3, 0.1, 0.15])
+    valores = np.empty(linhas, dtype=object)
+    for indice, (deslocamento, formato) in enumerate(zip(deslocamentos, formatos)):
+        data = inicio + timedelta(days=int(deslocamento))
+        if formato == 0:
+            valores[indice] = data
+        elif formato == 1:
+            valores[indice] = data.strftime("%d/%m/%Y")
+        elif formato == 2:
+            valores[indice] = data.strftime("%Y-%m-%d")
+        else:
+            valores[indice] = float((data - DATA_BASE_EXCEL).days)
+    return valores
+
+
+def _percentuais(rng: np.random.Generator, linhas: int) -> np.ndarray:
+    numeros = np.round(rng.uniform(0, 100, size=linhas), 1)
+    formatos = rng.choice(4, size=linhas, p=[0.5, 0.2, 0.2, 0.1])
+    valores = np.empty(linhas, dtype=object)
+    for indice, (numero, formato) in enumerate(zip(numeros, formatos)):
+        if formato == 0:
+            valores[indice] = f"{numero:.1f}".replace(".", ",") + "%"
+        elif formato == 1:
+            valores[indice] = f"{numero:.1f}"
+        elif formato == 2:
+            valores[indice] = float(numero)
+        else:
+            valores[indice] = "100%"
+    return valores
+
+
+def _anos(rng: np.random.Generator, linhas: int) -> np.ndarray:
+    anos = rng.integers(2012, 2026, size=linhas)
+    formatos = rng.choice(3, size=linhas, p=[0.6, 0.3, 0.1])
+    valores = np.empty(linhas, dtype=object)
+    for indice, (ano, formato) in enumerate(zip(anos, formatos)):
+        if formato == 0:
+            valores[indice] = int(ano)
+        elif formato == 1:
+            valores[indice] = str(ano)
+        else:
+            valores[indice] = f"{ano}/{rng.integers(1, 3)}"
+    return valores
+
+
+def gerar_colunas(linhas: int, semente: int = 0, extras: int = 4) -> Dict[str, np.ndarray]:
+    """Gera os valores de cada coluna, indexados pelo nome de cabeçalho sorteado.
+
+    Args:
+        linhas (int): Quantidade de linhas (alunos).
+        semente (int): Semente do gerador aleatório; a mesma semente gera os mesmos dados.
+        extras (int): Colunas adicionais fora de SINONIMOS_COLUNAS, como nas exportações largas.
+
+    Returns:
+        Dict[str, np.ndarray]: Os valores por coluna, na ordem do cabeçalho.
+    """
+    rng = np.random.default_rng(semente)
+    colunas: Dict[str, np.ndarray] = {}
+    for canonica in SINONIMOS_COLUNAS:
+        if canonica in VALORES:
+            valores = rng.choice(np.array(VALORES[canonica], dtype=object), size=linhas)
+        elif canonica == "data_matricula":
+            valores = _datas(rng, linhas, datetime(2012, 1, 15), 14 * 365)
+        elif canonica in ("data_conclusao", "data_integralizacao"):
+            valores = _datas(rng, linhas, datetime(2015, 6, 30), 11 * 365)
+        elif canonica == "percentual_progresso":
+            valores = _percentuais(rng, linhas)
+        elif canonica == "ano_ingresso":
+            valores = _anos(rng, linhas)
+        elif canonica == "frequencia_periodo":
+            valores = np.round(rng.uniform(40, 100, size=linhas), 2).astype(object)
+        elif canonica == "media_final_periodo":
+            valores = np.round(rng.uniform(0, 10, size=linhas), 1).astype(object)
+        else:
+            valores = np.full(linhas, "", dtype=object)
+        vazios = rng.random(linhas) < PROPORCAO_VAZIOS.get(canonica, PROPORCAO_VAZIOS_PADRAO)
+        valores[vazios] = None
+        colunas[_variante_cabecalho(rng, canonica)] = valores
+
+    for indice in range(extras):
+        nome = EXTRAS[indice % len(EXTRAS)]
+        if nome in colunas:
+            nome = f"{nome} {indice}"
+        colunas[nome] = rng.integers(10**6, 10**7, size=linhas).astype(str).astype(object)
+    return colunas
+
+
+def escrever_xlsx(caminho: Path, colunas: Dict[str, np.ndarray]) -> None:
+    """Grava as colunas numa planilha .xlsx em modo de escrita contínua (memória constante)."""
+    from openpyxl import Workbook
+
+    livro = Workbook(write_only=True)
+    planilha = livro.create_sheet("Alunos")
+    planilha.append(list(colunas))
+    valores: List[np.ndarray] = list(colunas.values())
+    for linha in zip(*valores):
+        planilha.append(list(linha))
+    caminho.parent.mkdir(parents=True, exist_ok=True)
+    temporario = caminho.with_name(f".{caminho.name}.tmp")
+    livro.save(temporario)
+    temporario.replace(caminho)
+
+
+def gerar_exportacao(caminho: Path, linhas: int, semente: int = 0, extras: int = 4) -> Path:
+    """Gera a exportação sintética em ``caminho`` (.xlsx) e devolve o caminho."""
+    escrever_xlsx(caminho, gerar_colunas(linhas, semente, extras))
+    return caminho
+
+
+def exportacao_em_cache(
+    diretorio: Path,
+    linhas: int,
+    semente: int = 0,
+    extras: int = 4,
+) -> Path:
+    """Devolve a exportação sintética de ``linhas`` linhas, gerando-a só se ainda não existir."""
+    caminho = diretorio / f"suap_sintetico_{linhas}_s{semente}_e{extras}.xlsx"
+    if not caminho.exists():
+        gerar_exportacao(caminho, linhas, semente, extras)
+    return caminho
+
+
+def parse_args(argv: Optional[Iterable[str]] = None):
+    parser = argparse.ArgumentParser(description="Gera uma exportação mestre sintética do SUAP")
+    parser.add_argument("--linhas", type=int, default=10_000, help="Quantidade de linhas (padrão: 10000)")
+    parser.add_argument("--out", dest="caminho_saida", required=True, help="Arquivo .xlsx de saída")
+    parser.add_argument("--semente", type=int, default=0, help="Semente do gerador aleatório (padrão: 0)")
+    parser.add_argument(
+        "--extras",
+        type=int,
+        default=4,
+        help="Colunas adicionais fora de SINONIMOS_COLUNAS (padrão: 4)",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[Iterable[str]] = None) -> None:
+    args = parse_args(argv)
+    caminho = gerar_exportacao(Path(args.caminho_saida), args.linhas, args.semente, args.extras)
+    print(f"Gerado: {caminho} ({args.linhas} linhas)")
+
+
+if __name__ == "__main__":
+    main()
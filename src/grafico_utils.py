@@ -1,9 +1,13 @@
 from __future__ import annotations
 
 """Funções auxiliares para montar estatísticas de uma coluna."""
-from typing import Optional
+from typing import Callable, Optional
 
-import pandas as pd
+from agregacao import Contagens, obter_contagem
+from importacao import importar_sob_demanda
+
+np = importar_sob_demanda("numpy")
+pd = importar_sob_demanda("pandas")
 
 
 def _normalizar_valor_categorico(valor):
@@ -16,6 +20,21 @@ def _normalizar_valor_categorico(valor):
     return texto
 
 
+def mapear_por_categoria(serie: pd.Series, funcao: Callable) -> pd.Series:
+    """Aplica ``funcao`` uma vez por valor distinto e devolve o resultado por linha.
+
+    A série é tratada como ``pd.Categorical``: a função roda só sobre as
+    categorias (e uma vez para o valor ausente, recebendo ``NaN``) e o
+    resultado volta para as linhas através dos códigos.
+    """
+    if not isinstance(serie.dtype, pd.CategoricalDtype):
+        serie = serie.astype("category")
+    categorias = serie.cat.categories
+    # O código -1 (ausente) aponta para o último elemento da tabela
+    tabela = np.array([funcao(valor) for valor in categorias] + [funcao(np.nan)], dtype=object)
+    return pd.Series(tabela[serie.cat.codes.to_numpy()], index=serie.index, name=serie.name)
+
+
 def contar_categoria_simples(
     dados: pd.DataFrame,
     coluna: str,
@@ -28,25 +47,33 @@ def contar_categoria_simples(
     ordenar_por: Optional[str] = None,
     ordem_decrescente: bool = True,
     limite: Optional[int] = None,
+    contagens: Optional[Contagens] = None,
 ) -> pd.DataFrame:
-    """Conta a frequência de uma coluna categórica sem combinar variáveis."""
-    if coluna not in dados.columns:
+    """Conta a frequência de uma coluna categórica sem combinar variáveis.
+
+    Quando ``contagens`` traz a contagem pré-calculada de ``(coluna,)`` ela é
+    usada no lugar de uma nova passada sobre ``dados``.
+    """
+    pre_calculada = contagens is not None and (coluna,) in contagens
+    if coluna not in dados.columns and not pre_calculada:
         col_nome = nome_coluna_saida or coluna
         colunas = [col_nome, "qtd"]
         if incluir_percentual:
             colunas.append(nome_percentual)
         return pd.DataFrame(columns=colunas)
 
-    quadro = dados[[coluna]].copy()
-    quadro[coluna] = quadro[coluna].apply(_normalizar_valor_categorico)
+    bruta = obter_contagem(dados, contagens, coluna, incluir_ausentes=True)
+    # Normaliza apenas os valores distintos e reagrupa as quantidades
+    rotulos = np.array([_normalizar_valor_categorico(valor) for valor in bruta.index], dtype=object)
+    preenchidos = pd.notna(rotulos)
 
     if ignorar_vazios:
-        quadro = quadro[quadro[coluna].notna()]
+        bruta = bruta[preenchidos]
+        rotulos = rotulos[preenchidos]
     else:
-        quadro[coluna] = quadro[coluna].fillna(rotulo_vazio)
-        quadro[coluna] = quadro[coluna].replace("", rotulo_vazio)
+        rotulos = np.where(preenchidos, rotulos, rotulo_vazio)
 
-    if quadro.empty:
+    if bruta.empty:
         col_nome = nome_coluna_saida or coluna
         colunas = [col_nome, "qtd"]
         if incluir_percentual:
@@ -54,8 +81,9 @@ def contar_categoria_simples(
         return pd.DataFrame(columns=colunas)
 
     contagem = (
-        quadro.groupby(coluna)
-        .size()
+        bruta.groupby(rotulos)
+        .sum()
+        .rename_axis(coluna)
         .reset_index(name="qtd")
     )
 
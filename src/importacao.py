@@ -0,0 +1,23 @@
+"""Importação sob demanda das dependências pesadas (pandas, numpy)."""
+import importlib.util
+import sys
+from types import ModuleType
+
+
+def importar_sob_demanda(nome: str) -> ModuleType:
+    """Registra o módulo ``nome`` sem executá-lo; o código roda no primeiro acesso a um atributo.
+
+    Assim ``--check`` e os builds em que tudo está atualizado não pagam a
+    importação do pandas. Se o módulo já foi importado, devolve o existente.
+    """
+    if nome in sys.modules:
+        return sys.modules[nome]
+    spec = importlib.util.find_spec(nome)
+    if spec is None:
+        sys.exit(f"Dependência ausente: {nome}")
+    carregador = importlib.util.LazyLoader(spec.loader)
+    spec.loader = carregador
+    modulo = importlib.util.module_from_spec(spec)
+    sys.modules[nome] = modulo
+    carregador.exec_module(modulo)
+    return modulo
@@ -0,0 +1,275 @@
+"""Leitura da planilha mestre em lotes de linhas, com memória limitada ao lote."""
+from __future__ import annotations
+
+import math
+import posixpath
+import sys
+import zipfile
+from datetime import time
+from pathlib import Path
+from typing import Collection, Dict, Iterator, List, Optional
+from xml.etree import ElementTree
+
+from importacao import importar_sob_demanda
+
+np = importar_sob_demanda("numpy")
+pd = importar_sob_demanda("pandas")
+
+Linha = List[object]
+
+
+def _converter_celula_openpyxl(celula) -> object:
+    # Mesma conversão de pd.read_excel(engine="openpyxl")
+    from openpyxl.cell.cell import TYPE_ERROR, TYPE_NUMERIC
+
+    if celula.value is None:
+        return ""
+    if celula.data_type == TYPE_ERROR:
+        return np.nan
+    if celula.data_type == TYPE_NUMERIC:
+        inteiro = int(celula.value)
+        if inteiro == celula.value:
+            return inteiro
+        return float(celula.value)
+    return celula.value
+
+
+def _linhas_xlsx(caminho: Path) -> Iterator[Linha]:
+    from openpyxl import load_workbook
+
+    livro = load_workbook(caminho, read_only=True, data_only=True, keep_links=False)
+    try:
+        planilha = livro.worksheets[0]
+        planilha.reset_dimensions()
+        for linha in planilha.iter_rows():
+            convertida = [_converter_celula_openpyxl(celula) for celula in linha]
+            while convertida and convertida[-1] == "":
+                convertida.pop()
+            yield convertida
+    finally:
+        livro.close()
+
+
+def _linhas_xls(caminho: Path) -> Iterator[Linha]:
+    # O xlrd carrega a aba inteira; as linhas ainda são convertidas sob demanda
+    from xlrd import XL_CELL_BOOLEAN, XL_CELL_DATE, XL_CELL_ERROR, XL_CELL_NUMBER, open_workbook, xldate
+
+    livro = open_workbook(str(caminho), on_demand=True)
+    try:
+        planilha = livro.sheet_by_index(0)
+        epoca1904 = livro.datemode
+
+        def converter(valor, tipo):
+            # Mesma conversão de pd.read_excel(engine="xlrd")
+            if tipo == XL_CELL_DATE:
+                try:
+                    valor = xldate.xldate_as_datetime(valor, epoca1904)
+                except OverflowError:
+                    return valor
+                ano = valor.timetuple()[0:3]
+                if (not epoca1904 and ano == (1899, 12, 31)) or (epoca1904 and ano == (1904, 1, 1)):
+                    valor = time(valor.hour, valor.minute, valor.second, valor.microsecond)
+            elif tipo == XL_CELL_ERROR:
+                valor = np.nan
+            elif tipo == XL_CELL_BOOLEAN:
+                valor = bool(valor)
+            elif tipo == XL_CELL_NUMBER and math.isfinite(valor):
+                inteiro = int(valor)
+                if inteiro == valor:
+                    valor = inteiro
+            return valor
+
+        for indice in range(planilha.nrows):
+            yield [
+                converter(valor, tipo)
+                for valor, tipo in zip(planilha.row_values(indice), planilha.row_types(indice))
+            ]
+    finally:
+        livro.release_resources()
+
+
+def _linhas_planilha(caminho: Path) -> Iterator[Linha]:
+    ext = caminho.suffix.lower()
+    try:
+        if ext == ".xls":
+            yield from _linhas_xls(caminho)
+        else:
+            yield from _linhas_xlsx(caminho)
+    except ImportError as err:
+        sys.exit(f"Dependência ausente para leitura de {ext}: {err}")
+
+
+def _montar_lote(cabecalho: Linha, linhas: List[Linha]) -> pd.DataFrame:
+    from pandas.io.parsers import TextParser
+
+    largura = max(len(linha) for linha in [cabecalho, *linhas])
+    dados = [linha + [""] * (largura - len(linha)) for linha in [cabecalho, *linhas]]
+    return TextParser(dados, header=0, skip_blank_lines=False).read()
+
+
+def _nome_local(tag: str) -> str:
+    # Sem o namespace: o OOXML "strict" usa outro URI para os mesmos elementos
+    return tag.rsplit("}", 1)[-1]
+
+
+def _texto_rico(elemento) -> str:
+    # <si>/<is>: texto simples (<t>) ou em trechos formatados (<r><t>); <rPh> é fonética, ignorada
+    partes = []
+    for filho in elemento:
+        nome = _nome_local(filho.tag)
+        if nome == "t":
+            partes.append(filho.text or "")
+        elif nome == "r":
+            partes.extend(neto.text or "" for neto in filho if _nome_local(neto.tag) == "t")
+    return "".join(partes)
+
+
+def _partes_primeira_aba(arquivo: zipfile.ZipFile) -> Dict[str, str]:
+    # A primeira aba é a primeira de <sheets> no workbook.xml (a que o pandas lê), não sheet1.xml
+    livro = ElementTree.fromstring(arquivo.read("xl/workbook.xml"))
+    abas = next(elemento for elemento in livro if _nome_local(elemento.tag) == "sheets")
+    primeira = next(elemento for elemento in abas if _nome_local(elemento.tag) == "sheet")
+    id_aba = next(valor for chave, valor in primeira.attrib.items() if _nome_local(chave) == "id")
+    partes = {}
+    for relacao in ElementTree.fromstring(arquivo.read("xl/_rels/workbook.xml.rels")):
+        alvo = relacao.get("Target", "")
+        alvo = alvo.lstrip("/") if alvo.startswith("/") else posixpath.normpath(posixpath.join("xl", alvo))
+        if relacao.get("Id") == id_aba:
+            partes["aba"] = alvo
+        elif relacao.get("Type", "").endswith("/sharedStrings"):
+            partes["textos"] = alvo
+    partes.setdefault("textos", "xl/sharedStrings.xml")
+    return partes
+
+
+def _textos_compartilhados(arquivo: zipfile.ZipFile, caminho: str, ultimo: int) -> List[str]:
+    # Só até o maior índice usado pelo cabeçalho, sem ler a tabela inteira
+    textos: List[str] = []
+    with arquivo.open(caminho) as fluxo:
+        for _, elemento in ElementTree.iterparse(fluxo):
+            if _nome_local(elemento.tag) != "si":
+                continue
+            textos.append(_texto_rico(elemento))
+            elemento.clear()
+            if len(textos) > ultimo:
+                break
+    return textos
+
+
+def _cabecalho_xlsx(caminho: Path) -> Linha:
+    """Primeira linha da primeira aba, lida direto do XML, parando ao fim dela.
+
+    O ``load_workbook(read_only=True)`` percorre a aba inteira quando ela não
+    traz ``<dimension>``; aqui só a linha 1 e o início da tabela de textos
+    compartilhados são lidos. A conversão é a do ``_converter_celula_openpyxl``.
+    """
+    with zipfile.ZipFile(caminho) as arquivo:
+        partes = _partes_primeira_aba(arquivo)
+        celulas: List[tuple] = []
+        with arquivo.open(partes["aba"]) as fluxo:
+            for _, elemento in ElementTree.iterparse(fluxo):
+                nome = _nome_local(elemento.tag)
+                if nome == "c":
+                    tipo = elemento.get("t", "n")
+                    filhos = {_nome_local(filho.tag): filho for filho in elemento}
+                    if tipo == "inlineStr":
+                        celulas.append(("str", _texto_rico(filhos["is"]) if "is" in filhos else ""))
+                    elif "v" in filhos and filhos["v"].text is not None:
+                        celulas.append((tipo, filhos["v"].text))
+                    elemento.clear()
+                elif nome == "row":
+                    # Sem o atributo r as linhas são sequenciais; uma primeira linha vazia vira cabeçalho vazio
+                    if elemento.get("r", "1") != "1":
+                        celulas = []
+                    break
+        indices = [int(valor) for tipo, valor in celulas if tipo == "s"]
+        textos = _textos_compartilhados(arquivo, partes["textos"], max(indices)) if indices else []
+
+    linha: Linha = []
+    for tipo, valor in celulas:
+        if tipo == "s":
+            linha.append(textos[int(valor)])
+        elif tipo == "n":
+            numero = float(valor)
+            linha.append(int(numero) if numero.is_integer() else numero)
+        elif tipo == "b":
+            linha.append(valor == "1")
+        elif tipo != "e":
+            # "str" (resultado de fórmula) e "d" (data ISO) ficam como texto
+            linha.append(valor)
+    return linha
+
+
+def ler_cabecalho_planilha(caminho: Path) -> List[str]:
+    """Lê só a primeira linha da planilha, sem passar pelo pandas (usado pelo ``--check``).
+
+    No ``.xlsx`` nem a aba inteira é carregada: o XML é lido só até o fim da
+    primeira linha. O ``.xls`` passa pelo xlrd, que decodifica a aba inteira.
+    """
+    cabecalho = None
+    if caminho.suffix.lower() != ".xls":
+        try:
+            cabecalho = _cabecalho_xlsx(caminho)
+        except (KeyError, StopIteration, ElementTree.ParseError, zipfile.BadZipFile):
+            # Estrutura fora do comum: a leitura completa dá o resultado (ou o erro) de sempre
+            cabecalho = None
+    if cabecalho is None:
+        linhas = _linhas_planilha(caminho)
+        try:
+            cabecalho = next(linhas, [])
+        finally:
+            linhas.close()
+    return [str(nome) for nome in cabecalho if nome != ""]
+
+
+def ler_planilha_em_lotes(
+    caminho: Path,
+    tamanho_lote: int,
+    colunas: Optional[Collection[object]] = None,
+) -> Iterator[pd.DataFrame]:
+    """Lê a primeira aba da planilha em quadros de até ``tamanho_lote`` linhas.
+
+    Cada lote passa pela mesma conversão de células e inferência de tipos de
+    ``pd.read_excel``, de modo que a concatenação dos lotes equivale à
+    leitura completa. A inferência só enxerga o lote: numa coluna que mistura
+    texto e números, um lote em que todo o texto é numérico ("24.7") sai com
+    números, que o ``pre_processar`` trata como o texto equivalente. Como no
+    ``read_excel``, linhas vazias no fim da
+    planilha são descartadas. Com ``colunas`` (nomes do cabeçalho) só essas
+    colunas são montadas, como no ``usecols``.
+    """
+    if tamanho_lote < 1:
+        raise ValueError("tamanho_lote deve ser positivo")
+    if not caminho.exists():
+        raise FileNotFoundError(f"Arquivo não encontrado: {caminho}")
+    linhas = _linhas_planilha(caminho)
+    cabecalho = next(linhas, None)
+    if cabecalho is None:
+        return
+    indices = None
+    if colunas is not None:
+        indices = [indice for indice, nome in enumerate(cabecalho) if nome in colunas]
+        cabecalho = [cabecalho[indice] for indice in indices]
+
+    lote: List[Linha] = []
+    vazias: List[Linha] = []
+    emitidos = 0
+    for linha in linhas:
+        if not linha:
+            # Só entram no lote se houver alguma linha com dados depois delas
+            vazias.append(linha)
+            continue
+        if vazias:
+            lote.extend(vazias)
+            vazias = []
+        if indices is not None:
+            # A seleção vem depois do teste de linha vazia, como no read_excel
+            linha = [linha[indice] if indice < len(linha) else "" for indice in indices]
+        lote.append(linha)
+        if len(lote) >= tamanho_lote:
+            yield _montar_lote(cabecalho, lote)
+            emitidos += 1
+            lote = []
+    if lote or not emitidos:
+        # Planilha só com cabeçalho ainda produz um quadro vazio com as colunas
+        yield _montar_lote(cabecalho, lote)
@@ -0,0 +1,126 @@
+"""Manifesto de build usado para pular datasets que não mudaram."""
+import hashlib
+import importlib.util
+import json
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from saidas import sufixos_disponiveis
+
+NOME_MANIFESTO = "manifesto_build.json"
+VERSAO_MANIFESTO = 1
+
+# Módulos cujo código afeta todos os datasets (pré-processamento, contagens,
+# registro dos construtores e gravação das saídas)
+MODULOS_BASE = ["construir_datasets", "grafico_utils", "agregacao", "leitura_lotes", "saidas", "construtores"]
+
+TAMANHO_BLOCO = 1 << 20
+
+
+def hash_arquivo(caminho: Path) -> str:
+    """Calcula o SHA-256 do conteúdo do arquivo, lendo em blocos."""
+    digest = hashlib.sha256()
+    with caminho.open("rb") as arquivo:
+        for bloco in iter(lambda: arquivo.read(TAMANHO_BLOCO), b""):
+            digest.update(bloco)
+    return digest.hexdigest()
+
+
+def descrever_entrada(caminho: Path, anterior: Optional[Dict] = None) -> Dict:
+    """Identifica o arquivo de entrada pelo conteúdo.
+
+    Se tamanho e mtime coincidirem com a descrição ``anterior`` o hash
+    registrado é reaproveitado, evitando reler o arquivo.
+    """
+    estado = caminho.stat()
+    descricao = {
+        "caminho": str(caminho),
+        "tamanho": estado.st_size,
+        "mtime_ns": estado.st_mtime_ns,
+    }
+    if (
+        anterior
+        and anterior.get("tamanho") == estado.st_size
+        and anterior.get("mtime_ns") == estado.st_mtime_ns
+        and anterior.get("sha256")
+    ):
+        descricao["sha256"] = anterior["sha256"]
+    else:
+        descricao["sha256"] = hash_arquivo(caminho)
+    return descricao
+
+
+def _hash_modulo(nome_modulo: str) -> str:
+    spec = importlib.util.find_spec(nome_modulo)
+    if spec is None or not spec.origin:
+        return ""
+    return hash_arquivo(Path(spec.origin))
+
+
+def hash_codigo_base(modulos: Iterable[str] = MODULOS_BASE) -> str:
+    """Hash combinado do código compartilhado por todos os construtores."""
+    digest = hashlib.sha256()
+    for nome_modulo in modulos:
+        digest.update(nome_modulo.encode("utf-8"))
+        digest.update(_hash_modulo(nome_modulo).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def assinatura_construtor(spec: Dict) -> str:
+    """Hash da especificação do dataset somado ao código-fonte do seu construtor."""
+    digest = hashlib.sha256(json.dumps(spec, sort_keys=True).encode("utf-8"))
+    builder_name = spec.get("builder")
+    if builder_name:
+        digest.update(_hash_modulo(f"construtores.{builder_name}").encode("utf-8"))
+    return digest.hexdigest()
+
+
+def carregar_manifesto(diretorio_saida: Path) -> Dict:
+    caminho = diretorio_saida / NOME_MANIFESTO
+    try:
+        manifesto = json.loads(caminho.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    if manifesto.get("versao") != VERSAO_MANIFESTO:
+        return {}
+    return manifesto
+
+
+def salvar_manifesto(diretorio_saida: Path, manifesto: Dict) -> None:
+    caminho = diretorio_saida / NOME_MANIFESTO
+    manifesto = dict(manifesto, versao=VERSAO_MANIFESTO)
+    temporario = caminho.with_suffix(".tmp")
+    temporario.write_text(json.dumps(manifesto, ensure_ascii=False, indent=2), encoding="utf-8")
+    temporario.replace(caminho)
+
+
+def arquivos_do_dataset(diretorio_saida: Path, nome_arquivo: str) -> List[Path]:
+    """O CSV, o JSON ao lado e as versões comprimidas de cada um gravados para o dataset."""
+    caminho = diretorio_saida / nome_arquivo
+    return [
+        arquivo.with_name(arquivo.name + sufixo)
+        for arquivo in (caminho, caminho.with_suffix(".json"))
+        for sufixo in ("", *sufixos_disponiveis())
+    ]
+
+
+def dataset_atualizado(
+    manifesto: Dict,
+    entrada: Dict,
+    codigo_base: str,
+    nome_arquivo: str,
+    assinatura: str,
+    diretorio_saida: Path,
+) -> bool:
+    """Indica se o dataset registrado no manifesto ainda corresponde à entrada e ao código."""
+    if manifesto.get("entrada", {}).get("sha256") != entrada["sha256"]:
+        return False
+    if manifesto.get("codigo_base") != codigo_base:
+        return False
+    registro = manifesto.get("datasets", {}).get(nome_arquivo)
+    if not registro or registro.get("assinatura") != assinatura:
+        return False
+    # Um conjunto gravado pela metade (faltando o JSON ou uma variante) é refeito
+    return not registro.get("gerado") or all(
+        arquivo.exists() for arquivo in arquivos_do_dataset(diretorio_saida, nome_arquivo)
+    )
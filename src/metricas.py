@@ -0,0 +1,210 @@
+"""Métricas de tempo, CPU e memória por etapa do build."""
+import json
+import os
+import resource
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, Optional
+
+VERSAO_METRICAS = 1
+PERFILADORES = ("cprofile", "pyinstrument")
+
+
+def pico_rss_mb() -> float:
+    """Pico de memória residente do processo até agora, em MB."""
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa em KB; macOS em bytes
+    return pico / (1024 * 1024) if sys.platform == "darwin" else pico / 1024
+
+
+def rss_atual_mb() -> Optional[float]:
+    """Memória residente atual em MB (só onde /proc está disponível)."""
+    try:
+        with open("/proc/self/statm") as arquivo:
+            paginas = int(arquivo.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return paginas * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+
+
+def _nome_corresponde(nome: str, alvo: str) -> bool:
+    # Nome exato da etapa; um construtor também responde por "turno.csv" ou "turno"
+    return alvo == nome or nome in (f"construtor.{alvo}", f"construtor.{alvo}.csv")
+
+
+class ColetorMetricas:
+    """Acumula, por nome de etapa, tempo de relógio, CPU, linhas e variação de memória.
+
+    Etapas com o mesmo nome (por exemplo, uma por lote) são somadas e contadas
+    em ``chamadas``. O tempo de CPU é o da thread que executou a etapa, de modo
+    que construtores em paralelo por threads não se misturam; a variação de RSS
+    é do processo inteiro.
+    """
+
+    def __init__(
+        self,
+        alvo_perfil: Optional[str] = None,
+        perfilador: str = "cprofile",
+        diretorio_perfil: Optional[Path] = None,
+    ) -> None:
+        self.etapas: Dict[str, Dict] = {}
+        self.alvo_perfil = alvo_perfil
+        self.perfilador = perfilador
+        self.diretorio_perfil = diretorio_perfil or Path(".")
+        self.perfis_gravados = []
+        self._trava = threading.Lock()
+        self._inicio = time.perf_counter()
+        self._inicio_cpu = time.process_time()
+
+    def configuracao(self) -> Dict:
+        """Argumentos para criar um coletor equivalente, vazio, em outro processo."""
+        return {
+            "alvo_perfil": self.alvo_perfil,
+            "perfilador": self.perfilador,
+            "diretorio_perfil": self.diretorio_perfil,
+        }
+
+    @contextmanager
+    def etapa(self, nome: str, linhas_entrada: Optional[int] = None) -> Iterator[Dict]:
+        """Mede o bloco; quem chama pode preencher ``registro["linhas_saida"]``."""
+        registro: Dict = {"linhas_saida": None}
+        perfil = self._iniciar_perfil(nome)
+        rss_antes = rss_atual_mb()
+        inicio = time.perf_counter()
+        inicio_cpu = time.thread_time()
+        try:
+            yield registro
+        finally:
+            parede = time.perf_counter() - inicio
+            cpu = time.thread_time() - inicio_cpu
+            rss_depois = rss_atual_mb()
+            if perfil is not None:
+                self._encerrar_perfil(nome, perfil)
+            self.acumular(
+                nome,
+                {
+                    "chamadas": 1,
+                    "parede_s": parede,
+                    "cpu_s": cpu,
+                    "linhas_entrada": linhas_entrada,
+                    "linhas_saida": registro["linhas_saida"],
+                    "delta_rss_mb": None
+                    if rss_antes is None or rss_depois is None
+                    else rss_depois - rss_antes,
+                    "pico_rss_mb": pico_rss_mb(),
+                },
+            )
+
+    def acumular(self, nome: str, dados: Dict) -> None:
+        """Soma ``dados`` à etapa ``nome`` (também usado para etapas vindas de outros processos)."""
+        with self._trava:
+            atual = self.etapas.get(nome)
+            if atual is None:
+                self.etapas[nome] = dict(dados)
+                return
+            for chave in ("chamadas", "parede_s", "cpu_s", "linhas_entrada", "linhas_saida", "delta_rss_mb"):
+                if dados.get(chave) is not None:
+                    atual[chave] = (atual.get(chave) or 0) + dados[chave]
+            atual["pico_rss_mb"] = max(atual.get("pico_rss_mb") or 0, dados.get("pico_rss_mb") or 0)
+
+    def retirar_etapas(self) -> Dict[str, Dict]:
+        """Devolve as etapas acumuladas e recomeça do zero (usado nos processos trabalhadores)."""
+        with self._trava:
+            etapas, self.etapas = self.etapas, {}
+        return etapas
+
+    def exportar(self, **contexto) -> Dict:
+        etapas = {}
+        for nome, dados in self.etapas.items():
+            saida = dict(dados)
+            for chave in ("parede_s", "cpu_s"):
+                saida[chave] = round(saida[chave], 6)
+            for chave in ("delta_rss_mb", "pico_rss_mb"):
+                if saida.get(chave) is not None:
+                    saida[chave] = round(saida[chave], 1)
+            etapas[nome] = saida
+        return {
+            "versao": VERSAO_METRICAS,
+            "gerado_em": datetime.now().isoformat(timespec="seconds"),
+            **contexto,
+            "total": {
+                "parede_s": round(time.perf_counter() - self._inicio, 6),
+                "cpu_s": round(time.process_time() - self._inicio_cpu, 6),
+                "pico_rss_mb": round(pico_rss_mb(), 1),
+            },
+            "perfis": [str(caminho) for caminho in self.perfis_gravados],
+            "etapas": etapas,
+        }
+
+    def salvar(self, caminho: Path, **contexto) -> None:
+        caminho.parent.mkdir(parents=True, exist_ok=True)
+        temporario = caminho.with_name(f".{caminho.name}.tmp")
+        temporario.write_text(
+            json.dumps(self.exportar(**contexto), ensure_ascii=False, indent=2) + "\n",
+            encoding="utf-8",
+        )
+        temporario.replace(caminho)
+
+    def _iniciar_perfil(self, nome: str):
+        if not self.alvo_perfil or not _nome_corresponde(nome, self.alvo_perfil):
+            return None
+        if self.perfilador == "pyinstrument":
+            try:
+                from pyinstrument import Profiler
+            except ImportError as err:
+                sys.exit(f"Dependência ausente para o perfilador pyinstrument: {err}")
+            perfil = Profiler()
+            perfil.start()
+            return perfil
+        import cProfile
+
+        perfil = cProfile.Profile()
+        perfil.enable()
+        return perfil
+
+    def _encerrar_perfil(self, nome: str, perfil) -> None:
+        self.diretorio_perfil.mkdir(parents=True, exist_ok=True)
+        base = self.diretorio_perfil / f"perfil_{nome}_{os.getpid()}"
+        if self.perfilador == "pyinstrument":
+            perfil.stop()
+            caminho = base.with_name(f"{base.name}.html")
+            caminho.write_text(perfil.output_html(), encoding="utf-8")
+        else:
+            import pstats
+
+            perfil.disable()
+            caminho = base.with_name(f"{base.name}.prof")
+            perfil.dump_stats(str(caminho))
+            # Resumo legível ao lado do .prof (abra o .prof com snakeviz ou pstats)
+            with base.with_name(f"{base.name}.txt").open("w", encoding="utf-8") as arquivo:
+                pstats.Stats(perfil, stream=arquivo).sort_stats("cumulative").print_stats(30)
+        with self._trava:
+            self.perfis_gravados.append(caminho)
+
+
+# Coletor do processo; None desliga a instrumentação (etapa vira um bloco vazio)
+_COLETOR: Optional[ColetorMetricas] = None
+
+
+def ativar(coletor: Optional[ColetorMetricas]) -> None:
+    global _COLETOR
+    _COLETOR = coletor
+
+
+def coletor_ativo() -> Optional[ColetorMetricas]:
+    return _COLETOR
+
+
+@contextmanager
+def etapa(nome: str, linhas_entrada: Optional[int] = None) -> Iterator[Dict]:
+    """Mede o bloco no coletor ativo, se houver; sem coletor não faz nada."""
+    coletor = _COLETOR
+    if coletor is None:
+        yield {"linhas_saida": None}
+        return
+    with coletor.etapa(nome, linhas_entrada) as registro:
+        yield registro
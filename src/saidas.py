@@ -0,0 +1,184 @@
+"""Gravação atômica dos arquivos publicados e das suas versões pré-comprimidas."""
+import gzip
+import hashlib
+import json
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# Sufixos das versões comprimidas gravadas ao lado de cada arquivo (".br" só com o módulo brotli)
+SUFIXOS_COMPRIMIDOS = (".gz", ".br")
+
+# Qualidade brotli padrão e a usada em muitos arquivos pequenos (as partições), onde
+# a 11 custa dezenas de vezes mais tempo para arquivos só uns 2% menores
+QUALIDADE_BROTLI = 11
+QUALIDADE_BROTLI_RAPIDA = 5
+
+
+def _modulo_brotli():
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli
+
+
+def sufixos_disponiveis() -> List[str]:
+    """Sufixos que podem ser gerados neste ambiente."""
+    return [sufixo for sufixo in SUFIXOS_COMPRIMIDOS if sufixo != ".br" or _modulo_brotli() is not None]
+
+
+def comprimir(conteudo: bytes, qualidade_brotli: int = QUALIDADE_BROTLI) -> Dict[str, bytes]:
+    """Versões gzip e brotli de ``conteudo``, com saída determinística (mesma entrada, mesmos bytes)."""
+    variantes = {".gz": gzip.compress(conteudo, compresslevel=9, mtime=0)}
+    brotli = _modulo_brotli()
+    if brotli is not None:
+        variantes[".br"] = brotli.compress(conteudo, quality=qualidade_brotli)
+    return variantes
+
+
+def _mesmo_conteudo(caminho: Path, conteudo: bytes) -> bool:
+    try:
+        return caminho.stat().st_size == len(conteudo) and caminho.read_bytes() == conteudo
+    except OSError:
+        return False
+
+
+def gravar_atomico(caminho: Path, conteudo: bytes) -> bool:
+    """Grava num temporário ao lado e renomeia sobre ``caminho``; devolve ``False`` se nada mudou.
+
+    Quem lê o arquivo (o dashboard, o rsync do ``sync-web``) vê a versão
+    anterior ou a nova, nunca uma gravação pela metade. Um arquivo idêntico
+    não é regravado, preservando o mtime.
+    """
+    if _mesmo_conteudo(caminho, conteudo):
+        return False
+    temporario = caminho.with_name(f".{caminho.name}.tmp")
+    try:
+        temporario.write_bytes(conteudo)
+        temporario.replace(caminho)
+    except OSError:
+        # Disco cheio ou sem permissão: não deixa o temporário para trás
+        temporario.unlink(missing_ok=True)
+        raise
+    return True
+
+
+def gravar_com_variantes(caminho: Path, conteudo: bytes, qualidade_brotli: int = QUALIDADE_BROTLI) -> bool:
+    """Grava ``conteudo`` e as versões ``.gz``/``.br`` ao lado; devolve se o arquivo principal mudou.
+
+    As variantes são gravadas antes do arquivo principal, e a compressão é
+    pulada quando o arquivo principal e todas as variantes já estão em dia.
+    """
+    variantes = [caminho.with_name(caminho.name + sufixo) for sufixo in sufixos_disponiveis()]
+    if _mesmo_conteudo(caminho, conteudo) and all(variante.exists() for variante in variantes):
+        return False
+    for sufixo, comprimido in comprimir(conteudo, qualidade_brotli).items():
+        gravar_atomico(caminho.with_name(caminho.name + sufixo), comprimido)
+    return gravar_atomico(caminho, conteudo)
+
+
+NOME_PACOTE = "datasets.bundle.json"
+VERSAO_PACOTE = 1
+
+
+def _arquivos_do_pacote(diretorio: Path, arquivo: str) -> List[Path]:
+    return [diretorio / arquivo, *(diretorio / f"{arquivo}{sufixo}" for sufixo in SUFIXOS_COMPRIMIDOS)]
+
+
+def gravar_pacote(diretorio: Path, nomes: List[str]) -> Optional[str]:
+    """Junta os JSON em colunas de ``nomes`` num único pacote versionado pelo conteúdo.
+
+    O pacote ``datasets.bundle.<hash>.json`` traz todos os datasets presentes
+    no diretório e nunca muda de conteúdo, então pode ficar em cache para
+    sempre; ``datasets.bundle.json`` é o manifesto pequeno que aponta para
+    ele, com o hash de cada dataset. O pacote anterior é mantido (um cliente
+    pode ter acabado de ler o manifesto antigo) e os mais velhos são removidos.
+
+    Args:
+        diretorio (Path): O diretório de saída dos datasets.
+        nomes (List[str]): Os CSVs que podem entrar no pacote, na ordem desejada.
+
+    Returns:
+        Optional[str]: O nome do pacote, se ele foi gravado agora.
+    """
+    partes = []
+    datasets = {}
+    for nome in nomes:
+        caminho_json = (diretorio / nome).with_suffix(".json")
+        if not (diretorio / nome).exists() or not caminho_json.exists():
+            continue
+        conteudo = caminho_json.read_bytes()
+        partes.append(json.dumps(nome, ensure_ascii=False).encode("utf-8") + b":" + conteudo)
+        datasets[nome] = {"sha256": hashlib.sha256(conteudo).hexdigest()}
+    # Os JSON já são compactos: o pacote é montado por concatenação, sem reserializar
+    pacote = b'{"versao":%d,"datasets":{' % VERSAO_PACOTE + b",".join(partes) + b"}}"
+    digest = hashlib.sha256(pacote).hexdigest()
+    arquivo = f"datasets.bundle.{digest[:12]}.json"
+
+    caminho_manifesto = diretorio / NOME_PACOTE
+    try:
+        anterior = json.loads(caminho_manifesto.read_text(encoding="utf-8")).get("arquivo")
+    except (OSError, ValueError, AttributeError):
+        anterior = None
+    if anterior == arquivo and (diretorio / arquivo).exists():
+        return None
+
+    gravar_com_variantes(diretorio / arquivo, pacote)
+    manifesto = {
+        "versao": VERSAO_PACOTE,
+        "arquivo": arquivo,
+        "sha256": digest,
+        "datasets": datasets,
+    }
+    gravar_com_variantes(
+        caminho_manifesto,
+        json.dumps(manifesto, ensure_ascii=False, separators=(",", ":")).encode("utf-8"),
+    )
+    manter = set(_arquivos_do_pacote(diretorio, arquivo))
+    if anterior:
+        manter.update(_arquivos_do_pacote(diretorio, anterior))
+    for velho in diretorio.glob("datasets.bundle.*.json*"):
+        if velho not in manter:
+            velho.unlink(missing_ok=True)
+    return arquivo
+
+
+NOME_INDICE_PARTICOES = "indice.json"
+VERSAO_INDICE_PARTICOES = 1
+
+
+def gravar_indice_particoes(raiz: Path, particoes: Dict[str, Dict[str, str]], nomes: List[str]) -> bool:
+    """Grava ``indice.json`` com os datasets presentes em cada partição, com tamanho e hash.
+
+    Cada partição fica em ``raiz/<dimensão>/<diretório>/``; o índice traz o
+    valor original (o diretório é só uma versão segura dele para caminhos) e,
+    por dataset, o tamanho e o SHA-256 do JSON em colunas, que é o que o
+    dashboard baixa.
+
+    Args:
+        raiz (Path): O diretório das partições.
+        particoes (Dict[str, Dict[str, str]]): Por dimensão, o valor de cada diretório.
+        nomes (List[str]): Os CSVs que podem constar do índice, na ordem desejada.
+
+    Returns:
+        bool: Se o índice mudou.
+    """
+    dimensoes = {}
+    for dimensao, valores in particoes.items():
+        entradas = []
+        for diretorio, valor in valores.items():
+            datasets = {}
+            for nome in nomes:
+                caminho = raiz / dimensao / diretorio / nome
+                caminho_json = caminho.with_suffix(".json")
+                if not caminho.exists() or not caminho_json.exists():
+                    continue
+                conteudo = caminho_json.read_bytes()
+                datasets[nome] = {"bytes": len(conteudo), "sha256": hashlib.sha256(conteudo).hexdigest()}
+            entradas.append({"valor": valor, "diretorio": f"{dimensao}/{diretorio}", "datasets": datasets})
+        dimensoes[dimensao] = entradas
+    indice = {"versao": VERSAO_INDICE_PARTICOES, "dimensoes": dimensoes}
+    return gravar_com_variantes(
+        raiz / NOME_INDICE_PARTICOES,
+        json.dumps(indice, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8"),
+    )
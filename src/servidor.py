@@ -0,0 +1,369 @@
+#!/usr/bin/env -S ./.venv/bin/python
+"""Servidor HTTP do dashboard: ETag, respostas 304, variantes pré-comprimidas e cache longo nos pacotes versionados."""
+import argparse
+import email.utils
+import gzip
+import hashlib
+import io
+import os
+import re
+import signal
+import sys
+import threading
+from functools import partial
+from http import HTTPStatus
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+DIRETORIO_PADRAO = "web"
+PORTA_PADRAO = 8000
+
+# Arquivos cujo nome traz o hash do conteúdo (``datasets.bundle.<hash>.json``) nunca mudam
+PADRAO_VERSIONADO = re.compile(r"\.[0-9a-f]{8,}\.[A-Za-z0-9]+$")
+CACHE_VERSIONADO = "public, max-age=31536000, immutable"
+# Os demais são revalidados a cada uso; com o ETag, a resposta costuma ser um 304 sem corpo
+CACHE_REVALIDAR = "no-cache"
+
+# Preferência entre as variantes gravadas pelo build (saidas.SUFIXOS_COMPRIMIDOS)
+CODIFICACOES = (("br", ".br"), ("gzip", ".gz"))
+TIPOS_COMPRIMIVEIS = ("text/", "application/json", "application/javascript", "image/svg+xml")
+# Arquivos sem variante e maiores que isso vão sem compressão, em vez de ocupar memória
+LIMITE_GZIP_EM_MEMORIA = 8 * 1024 * 1024
+
+# Rotas da API de contagens (``--api``); o restante de ``/api/`` responde 404
+PREFIXO_API = "/api/"
+ROTA_AGREGACAO = "/api/agg"
+
+# (mtime_ns, tamanho): identifica a versão de um arquivo já vista pelo cache
+Versao = Tuple[int, int]
+
+
+class CacheArquivos:
+    """ETags (hash do conteúdo) e corpos gzip calculados uma vez por versão de cada arquivo.
+
+    A versão é identificada por mtime e tamanho, então um arquivo regravado
+    pelo build (inclusive no modo ``--vigiar``) é recalculado no acesso seguinte.
+    """
+
+    def __init__(self) -> None:
+        self._trava = threading.Lock()
+        self._etags: Dict[str, Tuple[Versao, str]] = {}
+        self._gzip: Dict[str, Tuple[Versao, bytes]] = {}
+
+    def etag(self, caminho: Path, informacoes: os.stat_result) -> str:
+        versao = (informacoes.st_mtime_ns, informacoes.st_size)
+        with self._trava:
+            guardado = self._etags.get(str(caminho))
+        if guardado is not None and guardado[0] == versao:
+            return guardado[1]
+        resumo = hashlib.sha256()
+        with caminho.open("rb") as arquivo:
+            for bloco in iter(lambda: arquivo.read(1 << 16), b""):
+                resumo.update(bloco)
+        etag = f'"{resumo.hexdigest()[:32]}"'
+        with self._trava:
+            self._etags[str(caminho)] = (versao, etag)
+        return etag
+
+    def gzip(self, caminho: Path, informacoes: os.stat_result) -> bytes:
+        versao = (informacoes.st_mtime_ns, informacoes.st_size)
+        with self._trava:
+            guardado = self._gzip.get(str(caminho))
+        if guardado is not None and guardado[0] == versao:
+            return guardado[1]
+        comprimido = gzip.compress(caminho.read_bytes(), compresslevel=6, mtime=0)
+        with self._trava:
+            self._gzip[str(caminho)] = (versao, comprimido)
+        return comprimido
+
+
+def codificacoes_aceitas(cabecalho: Optional[str]) -> List[str]:
+    """Codificações de ``Accept-Encoding`` com q > 0 (``*`` vale para as não citadas)."""
+    aceitas: Dict[str, float] = {}
+    for item in (cabecalho or "").split(","):
+        nome, _, parametros = item.strip().partition(";")
+        nome = nome.strip().lower()
+        if not nome:
+            continue
+        qualidade = 1.0
+        for parametro in parametros.split(";"):
+            chave, _, valor = parametro.strip().partition("=")
+            if chave.strip().lower() == "q":
+                try:
+                    qualidade = float(valor)
+                except ValueError:
+                    qualidade = 0.0
+        aceitas[nome] = qualidade
+    coringa = aceitas.get("*", 0.0)
+    return [nome for nome, _ in CODIFICACOES if aceitas.get(nome, coringa) > 0]
+
+
+def etag_corresponde(cabecalho: str, etag: str) -> bool:
+    """Compara ``If-None-Match`` com ``etag`` (comparação fraca, como pede o RFC 9110)."""
+    if cabecalho.strip() == "*":
+        return True
+    candidatos = (candidato.strip() for candidato in cabecalho.split(","))
+    return any(candidato.removeprefix("W/") == etag for candidato in candidatos)
+
+
+class ManipuladorTabula(SimpleHTTPRequestHandler):
+    """Serve ``web/`` com conexões persistentes, ETag forte e variantes ``.br``/``.gz``."""
+
+    protocol_version = "HTTP/1.1"
+    # Cabeçalho e corpo saem em gravações separadas; com Nagle, cada resposta numa conexão
+    # persistente esperaria o ACK atrasado do cliente (~40 ms)
+    disable_nagle_algorithm = True
+    server_version = "Tabula"
+    extensions_map = {
+        **SimpleHTTPRequestHandler.extensions_map,
+        ".csv": "text/csv; charset=utf-8",
+        ".js": "text/javascript",
+        ".json": "application/json",
+    }
+
+    def __init__(self, *args, cache: CacheArquivos, silencioso: bool = False, consultas=None, **kwargs) -> None:
+        self.cache = cache
+        self.silencioso = silencioso
+        # ``consultas.ConsultasAgregadas`` (só com ``--api``, que exige pandas)
+        self.consultas = consultas
+        super().__init__(*args, **kwargs)
+
+    def log_message(self, format: str, *args) -> None:
+        if not self.silencioso:
+            super().log_message(format, *args)
+
+    def send_head(self):
+        if self.path.startswith(PREFIXO_API):
+            return self._responder_api()
+        caminho = Path(self.translate_path(self.path))
+        # Temporários da gravação atômica (``.x.tmp``) e demais ocultos não são publicados;
+        # a checagem vale para o caminho já decodificado ("/%2Egit" também é ".git")
+        if any(parte.startswith(".") for parte in caminho.relative_to(self.directory).parts):
+            self.send_error(HTTPStatus.NOT_FOUND, "File not found")
+            return None
+        if caminho.is_dir():
+            indice = caminho / "index.html"
+            if not self.path.split("?", 1)[0].endswith("/") or not indice.is_file():
+                # Redirecionamento para a barra final e listagem ficam com o comportamento padrão
+                return super().send_head()
+            caminho = indice
+        if not caminho.is_file():
+            self.send_error(HTTPStatus.NOT_FOUND, "File not found")
+            return None
+
+        tipo = self.guess_type(str(caminho))
+        comprimivel = tipo.startswith(TIPOS_COMPRIMIVEIS)
+        variantes = [
+            (codificacao, caminho.with_name(caminho.name + sufixo))
+            for codificacao, sufixo in CODIFICACOES
+            if caminho.with_name(caminho.name + sufixo).is_file()
+        ]
+        aceitas = codificacoes_aceitas(self.headers.get("Accept-Encoding"))
+
+        codificacao, arquivo = None, caminho
+        for candidata, variante in variantes:
+            if candidata in aceitas:
+                codificacao, arquivo = candidata, variante
+                break
+        try:
+            informacoes = arquivo.stat()
+            etag = self.cache.etag(arquivo, informacoes)
+        except OSError:
+            self.send_error(HTTPStatus.NOT_FOUND, "File not found")
+            return None
+
+        corpo = None
+        if codificacao is None and comprimivel and "gzip" in aceitas and informacoes.st_size <= LIMITE_GZIP_EM_MEMORIA:
+            codificacao = "gzip"
+            corpo = self.cache.gzip(arquivo, informacoes)
+            etag = etag[:-1] + '-gz"'
+
+        cabecalhos = {
+            "ETag": etag,
+            "Cache-Control": CACHE_VERSIONADO if PADRAO_VERSIONADO.search(caminho.name) else CACHE_REVALIDAR,
+            "Last-Modified": self.date_time_string(int(informacoes.st_mtime)),
+        }
+        if variantes or comprimivel:
+            cabecalhos["Vary"] = "Accept-Encoding"
+
+        if self._nao_modificado(etag, informacoes):
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            for nome, valor in cabecalhos.items():
+                self.send_header(nome, valor)
+            self.end_headers()
+            return None
+
+        if corpo is None:
+            try:
+                saida = arquivo.open("rb")
+            except OSError:
+                self.send_error(HTTPStatus.NOT_FOUND, "File not found")
+                return None
+            tamanho = informacoes.st_size
+        else:
+            saida = io.BytesIO(corpo)
+            tamanho = len(corpo)
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", tipo)
+        self.send_header("Content-Length", str(tamanho))
+        if codificacao is not None:
+            self.send_header("Content-Encoding", codificacao)
+        for nome, valor in cabecalhos.items():
+            self.send_header(nome, valor)
+        self.end_headers()
+        return saida
+
+    def _responder_api(self):
+        url = urlsplit(self.path)
+        if self.consultas is None or url.path != ROTA_AGREGACAO:
+            self.send_error(HTTPStatus.NOT_FOUND, "File not found")
+            return None
+        parametros = parse_qs(url.query, keep_blank_values=True)
+        dimensoes = [dimensao for valor in parametros.get("dims", []) for dimensao in valor.split(",")]
+        try:
+            resultado = self.consultas.consultar(dimensoes, parametros.get("filter", []))
+        except ValueError as erro:
+            # A mensagem vem da consulta do cliente: vai no corpo, não na linha de status (latin-1)
+            self.send_error(HTTPStatus.BAD_REQUEST, "Consulta inválida", str(erro))
+            return None
+        except OSError:
+            self.send_error(HTTPStatus.SERVICE_UNAVAILABLE, "Entrada da API indisponível")
+            return None
+
+        corpo, codificacao, etag = resultado.corpo, None, resultado.etag
+        if resultado.gzip is not None and "gzip" in codificacoes_aceitas(self.headers.get("Accept-Encoding")):
+            corpo, codificacao, etag = resultado.gzip, "gzip", etag[:-1] + '-gz"'
+        cabecalhos = {"ETag": etag, "Cache-Control": CACHE_REVALIDAR, "Vary": "Accept-Encoding"}
+
+        if_none_match = self.headers.get("If-None-Match")
+        if if_none_match is not None and etag_corresponde(if_none_match, etag):
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            for nome, valor in cabecalhos.items():
+                self.send_header(nome, valor)
+            self.end_headers()
+            return None
+
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(corpo)))
+        if codificacao is not None:
+            self.send_header("Content-Encoding", codificacao)
+        for nome, valor in cabecalhos.items():
+            self.send_header(nome, valor)
+        self.end_headers()
+        return io.BytesIO(corpo)
+
+    def _nao_modificado(self, etag: str, informacoes: os.stat_result) -> bool:
+        if_none_match = self.headers.get("If-None-Match")
+        if if_none_match is not None:
+            # Com If-None-Match presente, If-Modified-Since é ignorado
+            return etag_corresponde(if_none_match, etag)
+        if_modified_since = self.headers.get("If-Modified-Since")
+        if if_modified_since is None:
+            return False
+        try:
+            data = email.utils.parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError, IndexError, OverflowError):
+            return False
+        return data is not None and int(informacoes.st_mtime) <= data.timestamp()
+
+
+class ServidorTabula(ThreadingHTTPServer):
+    """Uma thread por conexão, com fila de conexões pendentes maior que a padrão (5)."""
+
+    daemon_threads = True
+    request_queue_size = 128
+
+
+def criar_servidor(
+    diretorio: Path, porta: int, endereco: str = "", silencioso: bool = False, consultas=None
+) -> ServidorTabula:
+    """Cria o servidor (uma thread por conexão) servindo ``diretorio`` em ``endereco:porta``.
+
+    Args:
+        diretorio (Path): O diretório publicado (normalmente ``web/``).
+        porta (int): A porta TCP; ``0`` escolhe uma livre.
+        endereco (str): O endereço de escuta (vazio para todas as interfaces).
+        silencioso (bool): Se deve omitir o log de cada requisição.
+        consultas (ConsultasAgregadas): Se dado, responde ``/api/agg`` com as contagens dele.
+
+    Returns:
+        ServidorTabula: O servidor, ainda não iniciado.
+    """
+    manipulador = partial(
+        ManipuladorTabula,
+        directory=str(diretorio),
+        cache=CacheArquivos(),
+        silencioso=silencioso,
+        consultas=consultas,
+    )
+    return ServidorTabula((endereco, porta), manipulador)
+
+
+def parse_args(argv: Optional[Iterable[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Serve o dashboard com cache HTTP e compressão")
+    parser.add_argument(
+        "--porta",
+        type=int,
+        default=int(os.environ.get("PORT", PORTA_PADRAO)),
+        help=f"Porta TCP (padrão: $PORT ou {PORTA_PADRAO})",
+    )
+    parser.add_argument("--endereco", default="", help="Endereço de escuta (padrão: todas as interfaces)")
+    parser.add_argument(
+        "--diretorio", default=DIRETORIO_PADRAO, help=f"Diretório publicado (padrão: {DIRETORIO_PADRAO})"
+    )
+    parser.add_argument("--silencioso", action="store_true", help="Não registra cada requisição no stderr")
+    parser.add_argument(
+        "--api",
+        dest="entrada_api",
+        metavar="ENTRADA",
+        help="Planilha mestre para responder /api/agg?dims=...&filter=coluna:valor (exige pandas)",
+    )
+    parser.add_argument(
+        "--api-capacidade",
+        type=int,
+        default=512,
+        help="Consultas da API mantidas no cache de resultados (padrão: 512)",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        dest="diretorio_cache",
+        help="Diretório do cache de quadros usado pela API (padrão: o mesmo do build)",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[Iterable[str]] = None) -> None:
+    args = parse_args(argv)
+    diretorio = Path(args.diretorio)
+    if not diretorio.is_dir():
+        sys.exit(f"Diretório não encontrado: {diretorio}")
+    consultas = None
+    if args.entrada_api:
+        # Importado só aqui: sem --api, o servidor roda só com a biblioteca padrão
+        from cache_quadros import diretorio_cache_padrao
+        from consultas import ConsultasAgregadas
+
+        entrada = Path(args.entrada_api)
+        if not entrada.is_file():
+            sys.exit(f"Entrada da API não encontrada: {entrada}")
+        diretorio_cache = Path(args.diretorio_cache) if args.diretorio_cache else diretorio_cache_padrao()
+        consultas = ConsultasAgregadas(entrada, diretorio_cache, args.api_capacidade)
+        # Carrega antes de aceitar conexões, para a primeira consulta não pagar a leitura da planilha
+        consultas.carregar()
+    servidor = criar_servidor(diretorio, args.porta, args.endereco, args.silencioso, consultas)
+    # Como PID 1 no contêiner, sem tratador o SIGTERM do ``docker stop`` seria ignorado
+    signal.signal(signal.SIGTERM, lambda _numero, _quadro: sys.exit(0))
+    print(f"Servindo {diretorio} em http://{args.endereco or 'localhost'}:{servidor.server_address[1]}", flush=True)
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Modo residente: vigia as planilhas de entrada e regera os datasets quando mudam."""
+import signal
+import sys
+import threading
+import time
+import traceback
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+INTERVALO_PADRAO = 2.0
+
+# Por arquivo: (mtime_ns, tamanho)
+Estado = Dict[str, Tuple[int, int]]
+
+
+def estado_entradas(caminhos: Iterable[Path]) -> Estado:
+    """Fotografa mtime e tamanho das entradas; arquivos que sumiram ficam de fora."""
+    estado: Estado = {}
+    for caminho in caminhos:
+        try:
+            informacoes = caminho.stat()
+        except OSError:
+            continue
+        estado[str(caminho)] = (informacoes.st_mtime_ns, informacoes.st_size)
+    return estado
+
+
+def _instalar_sinais(parar: threading.Event) -> None:
+    if threading.current_thread() is not threading.main_thread():
+        return
+
+    def encerrar(numero, _quadro):
+        print(f"Sinal {signal.Signals(numero).name} recebido; encerrando após o build em andamento")
+        parar.set()
+
+    signal.signal(signal.SIGTERM, encerrar)
+    signal.signal(signal.SIGINT, encerrar)
+
+
+def vigiar(
+    listar: Callable[[], Iterable[Path]],
+    reconstruir: Callable[[], None],
+    intervalo: float = INTERVALO_PADRAO,
+    parar: Optional[threading.Event] = None,
+) -> None:
+    """Roda ``reconstruir`` ao iniciar e a cada mudança nas entradas devolvidas por ``listar``.
+
+    As entradas são consultadas por ``stat`` a cada ``intervalo`` segundos,
+    o que funciona igual em volumes montados, onde o inotify não enxerga
+    gravações feitas fora do contêiner. Uma mudança só dispara o build quando
+    o estado se repete em duas consultas seguidas, para não ler uma
+    exportação ainda sendo copiada. Uma falha no build é informada e o
+    processo segue vigiando; SIGTERM e SIGINT encerram entre dois builds.
+
+    Args:
+        listar (Callable[[], Iterable[Path]]): Devolve as planilhas vigiadas
+            (relistadas a cada consulta, para enxergar arquivos novos).
+        reconstruir (Callable[[], None]): Executa o build.
+        intervalo (float): Segundos entre consultas.
+        parar (Optional[threading.Event]): Encerra a vigilância quando acionado.
+    """
+    if parar is None:
+        parar = threading.Event()
+    _instalar_sinais(parar)
+    construido: Optional[Estado] = None
+    pendente: Optional[Estado] = None
+    while not parar.is_set():
+        estado = estado_entradas(listar())
+        if estado and estado != construido:
+            if estado != pendente:
+                # Primeira vez que vemos este estado: espera confirmar que o arquivo assentou
+                pendente = estado
+            else:
+                inicio = time.perf_counter()
+                try:
+                    reconstruir()
+                except Exception:
+                    traceback.print_exc()
+                    print("Build falhou; aguardando a próxima mudança nas entradas")
+                else:
+                    print(f"Build concluído em {time.perf_counter() - inicio:.1f}s")
+                construido = estado
+                pendente = None
+                sys.stdout.flush()
+                continue
+        parar.wait(intervalo)
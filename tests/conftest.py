@@ -0,0 +1,15 @@
+"""Os módulos de ``src/`` são importados pelo nome, como os scripts fazem entre si."""
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+
+@pytest.fixture(scope="session")
+def exportacao(tmp_path_factory):
+    """Exportação sintética pequena do SUAP (.xlsx), gerada uma vez por sessão."""
+    from gerar_sintetico import gerar_exportacao
+
+    return gerar_exportacao(tmp_path_factory.mktemp("entrada") / "master.xlsx", 300, semente=3)
@@ -0,0 +1,117 @@
+"""Contagens de ``agregacao`` comparadas ao ``groupby`` do pandas sobre as mesmas linhas."""
+import numpy as np
+import pandas as pd
+import pytest
+
+import agregacao
+
+N = 500
+
+
+def _quadro(semente: int = 0, linhas: int = N) -> pd.DataFrame:
+    gerador = np.random.default_rng(semente)
+    campus = pd.Series(gerador.choice(["CBA", "ROO", "VGD", None], linhas), dtype=object)
+    turno = pd.Categorical(gerador.choice(["Matutino", "Noturno", "Vespertino"], linhas))
+    ano = pd.Series(gerador.choice([2019, 2020, 2021, np.nan], linhas))
+    meses = gerador.integers(0, 60, linhas).astype(float)
+    meses[gerador.random(linhas) < 0.1] = np.nan
+    return pd.DataFrame({"campus": campus, "turno": turno, "coorte_ano": ano, "tempo_curso_meses": meses})
+
+
+def _esperado(df: pd.DataFrame, colunas) -> pd.Series:
+    # groupby conta categorias sem linhas; as contagens só trazem combinações presentes
+    contagem = df.groupby(list(colunas), dropna=False, observed=True).size()
+    return contagem[contagem > 0]
+
+
+def _como_dict(contagem: pd.Series) -> dict:
+    # Ausentes (NaN/None) viram None para que chaves iguais se comparem iguais
+    return {
+        tuple(None if pd.isna(valor) else valor for valor in (chave if isinstance(chave, tuple) else (chave,))): int(qtd)
+        for chave, qtd in contagem.items()
+    }
+
+
+@pytest.mark.parametrize(
+    "agrupamento",
+    [("campus",), ("turno",), ("coorte_ano",), ("campus", "turno"), ("turno", "coorte_ano", "campus")],
+)
+def test_calcular_contagens_igual_ao_groupby(agrupamento):
+    df = _quadro()
+    contagem = agregacao.calcular_contagens(df, [agrupamento])[agrupamento]
+    assert _como_dict(contagem) == _como_dict(_esperado(df, agrupamento))
+    assert contagem.sum() == len(df)
+
+
+def test_calcular_contagens_sem_bincount_igual(monkeypatch):
+    df = _quadro()
+    agrupamento = ("campus", "turno", "coorte_ano")
+    esperado = agregacao.calcular_contagens(df, [agrupamento])[agrupamento]
+    monkeypatch.setattr(agregacao, "LIMITE_BINCOUNT", 0)
+    assert agregacao.calcular_contagens(df, [agrupamento])[agrupamento].equals(esperado)
+    monkeypatch.setattr(agregacao, "LIMITE_CODIGO_COMBINADO", 0)
+    assert agregacao.calcular_contagens(df, [agrupamento])[agrupamento].equals(esperado)
+
+
+def test_obter_contagem_descarta_ausentes_como_o_groupby():
+    df = _quadro()
+    contagem = agregacao.obter_contagem(df, None, "campus", "coorte_ano")
+    assert _como_dict(contagem) == _como_dict(df.groupby(["campus", "coorte_ano"]).size())
+
+
+def test_planejar_agrupamentos_sem_repeticao():
+    especs = [{"contagens": [["campus"], ["campus", "turno"]]}, {"contagens": [["campus"]]}, {}]
+    assert agregacao.planejar_agrupamentos(especs) == [("campus",), ("campus", "turno")]
+
+
+def test_somar_contagens_de_partes_igual_ao_quadro_inteiro():
+    df = _quadro()
+    agrupamentos = [("campus",), ("turno", "coorte_ano"), ("campus", "turno", "tempo_curso_meses")]
+    total = {}
+    for inicio in range(0, N, 77):
+        agregacao.somar_contagens(total, agregacao.calcular_contagens(df.iloc[inicio:inicio + 77], agrupamentos))
+    esperado = agregacao.calcular_contagens(df, agrupamentos)
+    for agrupamento, contagem in agregacao.ordenar_contagens(total).items():
+        pd.testing.assert_series_equal(contagem, esperado[agrupamento], check_index_type=False)
+
+
+@pytest.mark.parametrize("tamanho_lote", [10, 37, 1000])
+def test_contar_em_lotes_igual_a_leitura_completa(exportacao, tamanho_lote):
+    import construir_datasets as cd
+
+    especs = list(cd.especs_padrao().values())
+    agrupamentos = agregacao.planejar_agrupamentos(especs)
+    df, _, _ = cd.carregar_pre_processado(exportacao)
+    esperado = agregacao.calcular_contagens(df, agrupamentos)
+    contagens, _, _, _ = cd.contar_em_lotes(exportacao, agrupamentos, tamanho_lote)
+    assert contagens.keys() == esperado.keys()
+    for agrupamento, contagem in contagens.items():
+        assert _como_dict(contagem) == _como_dict(esperado[agrupamento]), agrupamento
+
+
+@pytest.mark.parametrize("quantis", [[0.5], [0.0, 0.25, 0.5, 0.75, 1.0], [0.1, 0.9]])
+def test_quantis_de_contagem_iguais_ao_groupby_quantile(quantis):
+    df = _quadro().dropna()
+    agrupamento = ("campus", "turno", "tempo_curso_meses")
+    contagem = agregacao.obter_contagem(df, None, *agrupamento)
+    obtido = agregacao.quantis_de_contagem(contagem, "tempo_curso_meses", quantis)
+
+    agrupado = df.groupby(["campus", "turno"], observed=True)["tempo_curso_meses"]
+    esperado = agrupado.quantile(quantis).unstack()
+    obtido = obtido.set_index(["campus", "turno"])
+    assert obtido["qtd"].to_dict() == agrupado.size().to_dict()
+    for quantil in quantis:
+        valores = obtido[quantil]
+        assert valores.to_dict() == pytest.approx(esperado.loc[valores.index, quantil].to_dict())
+
+
+def test_quantis_de_contagens_somadas_iguais_aos_do_quadro_inteiro():
+    df = _quadro(semente=7).dropna()
+    agrupamento = ("turno", "tempo_curso_meses")
+    total = {}
+    for parte in (df.iloc[:150], df.iloc[150:]):
+        agregacao.somar_contagens(total, agregacao.calcular_contagens(parte, [agrupamento]))
+    contagem = agregacao.ordenar_contagens(total)[agrupamento]
+    obtido = agregacao.quantis_de_contagem(contagem, "tempo_curso_meses", [0.5]).set_index("turno")[0.5]
+    esperado = df.groupby("turno", observed=True)["tempo_curso_meses"].median()
+    assert obtido.to_dict() == pytest.approx(esperado.to_dict())
@@ -0,0 +1,140 @@
+"""``/api/agg``: contagens sob demanda comparadas ao ``groupby``, cache LRU e respostas HTTP."""
+import http.client
+import json
+import shutil
+import threading
+
+import pandas as pd
+import pytest
+
+import construir_datasets as cd
+import consultas
+import servidor
+from gerar_sintetico import gerar_exportacao
+
+
+@pytest.fixture
+def entrada(exportacao, tmp_path):
+    return shutil.copy(exportacao, tmp_path / "master.xlsx")
+
+
+@pytest.fixture
+def api(entrada):
+    return consultas.ConsultasAgregadas(entrada, capacidade=2)
+
+
+def _linhas(corpo: bytes) -> dict:
+    # JSON em colunas (ver quadro_para_json) -> {(dimensões...): qtd}
+    documento = json.loads(corpo)
+    colunas = []
+    for nome, valores in zip(documento["colunas"], documento["valores"]):
+        categorias = documento.get("categorias", {}).get(nome)
+        if categorias is not None:
+            valores = [None if codigo is None else categorias[codigo] for codigo in valores]
+        colunas.append(valores)
+    *dimensoes, quantidades = colunas
+    if not dimensoes:
+        return {(): qtd for qtd in quantidades}
+    return {tuple(linha): qtd for linha, qtd in zip(zip(*dimensoes), quantidades)}
+
+
+def _esperado(df: pd.DataFrame, dimensoes) -> dict:
+    contagem = df.groupby(list(dimensoes), dropna=False, observed=True).size()
+    return {
+        tuple(None if pd.isna(valor) else valor for valor in (chave if isinstance(chave, tuple) else (chave,))): qtd
+        for chave, qtd in contagem.items()
+        if qtd
+    }
+
+
+def test_contagem_igual_ao_groupby(entrada, api):
+    df, _, _ = cd.carregar_pre_processado(entrada)
+    assert _linhas(api.consultar(["campus", "turno"]).corpo) == _esperado(df, ["campus", "turno"])
+
+
+def test_filtros_combinam_valores_e_colunas(entrada, api):
+    df, _, _ = cd.carregar_pre_processado(entrada)
+    campi = sorted(df["campus"].dropna().unique())[:2]
+    turno = df["turno"].dropna().iloc[0]
+    filtros = [f"campus:{'|'.join(campi)}", f"turno:{turno}"]
+    filtrado = df[df["campus"].isin(campi) & (df["turno"] == turno)]
+    obtido = _linhas(api.consultar(["status_simplificado"], filtros).corpo)
+    assert obtido == _esperado(filtrado, ["status_simplificado"])
+    assert _linhas(api.consultar([], filtros).corpo) == {(): len(filtrado)}
+
+
+def test_consultas_equivalentes_tem_a_mesma_chave():
+    assert consultas.normalizar_consulta(["campus", " turno", "campus"], ["turno:A|B", "campus:X", "turno:B|C"]) == (
+        ("campus", "turno"),
+        (("campus", ("X",)), ("turno", ("B",))),
+    )
+
+
+@pytest.mark.parametrize(
+    "dimensoes, filtros", [(["nome_aluno"], []), (["campus"], ["campus"]), (["campus"], ["senha:1"])]
+)
+def test_consulta_invalida(dimensoes, filtros):
+    with pytest.raises(ValueError):
+        consultas.normalizar_consulta(dimensoes, filtros)
+
+
+def test_lru_guarda_as_ultimas_consultas(api):
+    primeira = api.consultar(["campus"])
+    assert api.consultar(["campus"]) is primeira
+    api.consultar(["turno"])
+    api.consultar(["modalidade"])
+    assert api.consultar(["campus"]) is not primeira
+    assert (api.acertos, api.faltas) == (1, 4)
+
+
+def test_entrada_nova_esvazia_o_cache(entrada, api):
+    antes = api.consultar([])
+    gerar_exportacao(entrada, 120, semente=9)
+    depois = api.consultar([])
+    assert _linhas(antes.corpo) == {(): 300}
+    assert _linhas(depois.corpo) == {(): 120}
+    assert depois.etag != antes.etag
+
+
+@pytest.fixture
+def requisitar(api, tmp_path):
+    instancia = servidor.criar_servidor(tmp_path, 0, "127.0.0.1", silencioso=True, consultas=api)
+    thread = threading.Thread(target=instancia.serve_forever, kwargs={"poll_interval": 0.01}, daemon=True)
+    thread.start()
+
+    def get(caminho, **cabecalhos):
+        conexao = http.client.HTTPConnection("127.0.0.1", instancia.server_address[1], timeout=10)
+        try:
+            conexao.request("GET", caminho, headers={nome.replace("_", "-"): v for nome, v in cabecalhos.items()})
+            resposta = conexao.getresponse()
+            return resposta.status, dict(resposta.getheaders()), resposta.read()
+        finally:
+            conexao.close()
+
+    yield get
+    instancia.shutdown()
+    instancia.server_close()
+
+
+def test_api_responde_json_e_304(requisitar, api):
+    status, cabecalhos, corpo = requisitar("/api/agg?dims=campus,turno")
+    assert status == 200
+    assert cabecalhos["Content-Type"] == "application/json"
+    assert corpo == api.consultar(["campus", "turno"]).corpo
+    status, _, corpo = requisitar("/api/agg?dims=campus,turno", If_None_Match=cabecalhos["ETag"])
+    assert (status, corpo) == (304, b"")
+
+
+def test_api_com_gzip(requisitar, api):
+    status, cabecalhos, corpo = requisitar("/api/agg?dims=curso,turno", Accept_Encoding="gzip")
+    resultado = api.consultar(["curso", "turno"])
+    assert resultado.gzip is not None
+    assert (status, cabecalhos["Content-Encoding"], corpo) == (200, "gzip", resultado.gzip)
+
+
+@pytest.mark.parametrize(
+    "caminho, status",
+    [("/api/agg?dims=nome_aluno", 400), ("/api/agg?filter=campus", 400), ("/api/outra", 404)],
+)
+def test_api_erros(requisitar, caminho, status):
+    assert requisitar(caminho)[0] == status
@@ -0,0 +1,86 @@
+"""Leitura em lotes comparada ao ``pd.read_excel`` da mesma planilha."""
+import pandas as pd
+import pytest
+
+import leitura_lotes
+
+
+def _em_lotes(caminho, tamanho_lote, colunas=None) -> pd.DataFrame:
+    lotes = list(leitura_lotes.ler_planilha_em_lotes(caminho, tamanho_lote, colunas))
+    return pd.concat(lotes, ignore_index=True)
+
+
+@pytest.mark.parametrize("tamanho_lote", [37, 128, 300, 1000])
+def test_lotes_concatenados_iguais_ao_read_excel(exportacao, tamanho_lote):
+    esperado = pd.read_excel(exportacao, engine="openpyxl")
+    # Cada lote infere os próprios tipos (int64 num lote, object no quadro todo)
+    pd.testing.assert_frame_equal(_em_lotes(exportacao, tamanho_lote), esperado, check_dtype=False)
+
+
+def test_lotes_respeitam_o_tamanho(exportacao):
+    tamanhos = [len(lote) for lote in leitura_lotes.ler_planilha_em_lotes(exportacao, 128)]
+    assert tamanhos == [128, 128, 44]
+
+
+def test_colunas_selecionadas_iguais_ao_usecols(exportacao):
+    cabecalho = list(pd.read_excel(exportacao, engine="openpyxl", nrows=0).columns)
+    colunas = set(cabecalho[::3])
+    esperado = pd.read_excel(exportacao, engine="openpyxl", usecols=lambda nome: nome in colunas)
+    pd.testing.assert_frame_equal(_em_lotes(exportacao, 50, colunas), esperado, check_dtype=False)
+
+
+def test_linhas_vazias_no_fim_descartadas_e_no_meio_mantidas(tmp_path):
+    from openpyxl import Workbook
+
+    livro = Workbook()
+    aba = livro.active
+    for linha in [["Campus", "Turno"], ["CBA", "Noturno"], [], ["ROO", None], [], []]:
+        aba.append(linha)
+    caminho = tmp_path / "vazias.xlsx"
+    livro.save(caminho)
+    esperado = pd.read_excel(caminho, engine="openpyxl")
+    pd.testing.assert_frame_equal(_em_lotes(caminho, 2), esperado, check_dtype=False)
+
+
+def test_texto_numerico_de_um_lote_sai_como_numero(exportacao):
+    # Com uma linha por lote, "24.7" não tem vizinhos "19,8%" que mantenham a coluna textual
+    coluna = "Percentual de Progresso"
+    esperado = pd.read_excel(exportacao, engine="openpyxl")[coluna]
+    obtido = _em_lotes(exportacao, 1, {coluna})[coluna]
+    for lido, referencia in zip(obtido, esperado):
+        if isinstance(lido, float) and isinstance(referencia, str):
+            assert lido == float(referencia)
+        else:
+            assert lido == referencia or (pd.isna(lido) and pd.isna(referencia))
+
+
+def test_tamanho_lote_invalido(exportacao):
+    with pytest.raises(ValueError):
+        next(leitura_lotes.ler_planilha_em_lotes(exportacao, 0))
+
+
+def test_cabecalho_igual_ao_read_excel(exportacao):
+    assert leitura_lotes.ler_cabecalho_planilha(exportacao) == list(pd.read_excel(exportacao, nrows=0).columns)
+
+
+@pytest.mark.parametrize(
+    "linhas",
+    [
+        [["Campus", None, 2021, 3.5, True, "=CONCAT(\"a\", \"b\")"], ["CBA", "x", 1, 2, False, "y"]],
+        [[], ["Campus", "Turno"], ["CBA", "Noturno"]],
+        [["Só cabeçalho"]],
+    ],
+)
+def test_cabecalho_do_xml_igual_a_leitura_completa(tmp_path, monkeypatch, linhas):
+    from openpyxl import Workbook
+
+    livro = Workbook()
+    livro.active.title = "Dados"
+    for linha in linhas:
+        livro.active.append(linha)
+    caminho = tmp_path / "cabecalho.xlsx"
+    livro.save(caminho)
+
+    rapido = leitura_lotes.ler_cabecalho_planilha(caminho)
+    monkeypatch.setattr(leitura_lotes, "_cabecalho_xlsx", lambda caminho: None)
+    assert rapido == leitura_lotes.ler_cabecalho_planilha(caminho)
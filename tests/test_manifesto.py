@@ -0,0 +1,80 @@
+"""Quando o manifesto de build pula um dataset e quando o refaz."""
+import pytest
+
+import construir_datasets as cd
+import manifesto
+from saidas import sufixos_disponiveis
+
+ENTRADA = {"sha256": "a" * 64}
+NOME = "turno.csv"
+
+
+def _registrado(diretorio, gerado=True):
+    for arquivo in manifesto.arquivos_do_dataset(diretorio, NOME):
+        arquivo.write_bytes(b"x")
+    return {
+        "entrada": ENTRADA,
+        "codigo_base": "codigo",
+        "datasets": {NOME: {"assinatura": "assinatura", "gerado": gerado}},
+    }
+
+
+def _atualizado(registro, diretorio, entrada=ENTRADA, codigo_base="codigo", assinatura="assinatura"):
+    return manifesto.dataset_atualizado(registro, entrada, codigo_base, NOME, assinatura, diretorio)
+
+
+def test_dataset_completo_e_inalterado_e_pulado(tmp_path):
+    assert _atualizado(_registrado(tmp_path), tmp_path)
+
+
+@pytest.mark.parametrize(
+    "mudanca",
+    [{"entrada": {"sha256": "b" * 64}}, {"codigo_base": "outro"}, {"assinatura": "outra"}],
+)
+def test_entrada_codigo_ou_assinatura_diferentes_refazem(tmp_path, mudanca):
+    assert not _atualizado(_registrado(tmp_path), tmp_path, **mudanca)
+
+
+@pytest.mark.parametrize("arquivo", ["turno.csv", "turno.json", *(f"turno.json{s}" for s in sufixos_disponiveis())])
+def test_conjunto_gravado_pela_metade_e_refeito(tmp_path, arquivo):
+    registro = _registrado(tmp_path)
+    (tmp_path / arquivo).unlink()
+    assert not _atualizado(registro, tmp_path)
+
+
+def test_dataset_nao_gerado_nao_exige_arquivos(tmp_path):
+    registro = _registrado(tmp_path, gerado=False)
+    for arquivo in manifesto.arquivos_do_dataset(tmp_path, NOME):
+        arquivo.unlink()
+    assert _atualizado(registro, tmp_path)
+
+
+@pytest.mark.parametrize("modulo", ["saidas", "construtores", "agregacao"])
+def test_codigo_base_muda_com_os_modulos_compartilhados(monkeypatch, modulo):
+    antes = manifesto.hash_codigo_base()
+    original = manifesto._hash_modulo
+    monkeypatch.setattr(
+        manifesto, "_hash_modulo", lambda nome: "alterado" if nome == modulo else original(nome)
+    )
+    assert manifesto.hash_codigo_base() != antes
+
+
+def test_segundo_build_pula_e_refaz_so_o_incompleto(exportacao, tmp_path, monkeypatch):
+    especs = cd.selecionar_especs(["turno", "modalidade"])
+    cd.construir_datasets(exportacao, tmp_path, especs=especs)
+
+    gerados = []
+    original = cd.executar_construtores
+
+    def espiao(df, fontes, pendentes, *args, **kwargs):
+        gerados.extend(pendentes)
+        return original(df, fontes, pendentes, *args, **kwargs)
+
+    monkeypatch.setattr(cd, "executar_construtores", espiao)
+    cd.construir_datasets(exportacao, tmp_path, especs=especs)
+    assert gerados == []
+
+    (tmp_path / "modalidade.json.gz").unlink()
+    cd.construir_datasets(exportacao, tmp_path, especs=especs)
+    assert gerados == ["modalidade.csv"]
+    assert (tmp_path / "modalidade.json.gz").exists()
@@ -0,0 +1,57 @@
+"""Quadros pré-processados mantidos em memória entre builds do ``--vigiar``."""
+import os
+import shutil
+
+import pytest
+
+import construir_datasets as cd
+from gerar_sintetico import gerar_exportacao
+
+
+@pytest.fixture
+def leituras(monkeypatch):
+    """Liga o modo residente (só neste teste) e registra cada planilha lida do Excel."""
+    monkeypatch.setattr(cd, "_PRE_PROCESSADO_EM_MEMORIA", None)
+    cd.manter_pre_processado_em_memoria()
+    lidas = []
+    original = cd._ler_bruto
+
+    def espiao(caminho, colunas):
+        lidas.append(caminho.name)
+        return original(caminho, colunas)
+
+    monkeypatch.setattr(cd, "_ler_bruto", espiao)
+    return lidas
+
+
+def test_planilha_tocada_nao_e_relida(exportacao, tmp_path, leituras):
+    caminho = shutil.copy(exportacao, tmp_path / "master.xlsx")
+    primeiro = cd.carregar_pre_processado(caminho)
+    os.utime(caminho, ns=(0, 0))
+    assert cd.carregar_pre_processado(caminho) is primeiro
+    assert leituras == ["master.xlsx"]
+
+
+def test_lote_so_rele_a_planilha_que_mudou(exportacao, tmp_path, leituras):
+    entrada = tmp_path / "entrada"
+    entrada.mkdir()
+    caminhos = [shutil.copy(exportacao, entrada / "cba.xlsx"), gerar_exportacao(entrada / "roo.xlsx", 200, 4)]
+    especs = cd.selecionar_especs(["turno", "alunos_por_situacao"])
+
+    cd.construir_lote_arquivos(caminhos, tmp_path / "saida", usar_cache=False, especs=especs)
+    assert leituras == ["cba.xlsx", "roo.xlsx"]
+
+    gerar_exportacao(entrada / "roo.xlsx", 250, 5)
+    leituras.clear()
+    cd.construir_lote_arquivos(caminhos, tmp_path / "saida", usar_cache=False, especs=especs)
+    assert leituras == ["roo.xlsx"]
+    # A versão anterior de roo.xlsx foi substituída, não guardada ao lado
+    assert sorted(cd._PRE_PROCESSADO_EM_MEMORIA) == sorted(str(caminho) for caminho in caminhos)
+
+
+def test_planilha_que_saiu_da_entrada_deixa_a_memoria(exportacao, tmp_path, leituras):
+    caminhos = [shutil.copy(exportacao, tmp_path / nome) for nome in ("cba.xlsx", "roo.xlsx")]
+    for caminho in caminhos:
+        cd.carregar_pre_processado(caminho)
+    cd.descartar_pre_processado(caminhos[1:])
+    assert list(cd._PRE_PROCESSADO_EM_MEMORIA) == [str(caminhos[1])]
@@ -0,0 +1,132 @@
+"""Paridade entre o ``pre_processar`` colunar e as funções escalares aplicadas linha a linha."""
+import math
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+import construir_datasets as cd
+
+N = 14
+
+# Cabeçalhos como vêm do SUAP (resolvidos por SINONIMOS_COLUNAS) e valores de borda
+BRUTO = {
+    "Descricao do Curso": [
+        "Informática", "Informática", "ADMINISTRAÇÃO", " Agro ", None, "", "Informática",
+        "Edificações", "Edificações", "Química", "Química", "Informática", "Agro", "Física",
+    ],
+    "Situação no Curso": [
+        "Em curso", "Concluído", "CONCLUIDO", "  Evadido", "Cancelado Compulsório", "Trancado", "",
+        None, "Formado", "Transferido Externo", "Desligado", "ativo", "Jubilado", "em curso",
+    ],
+    "Situação no Sistema": ["Ativo"] * 7 + ["Concluído", None, "", "Cancelado", "Ativo", "Evadido", "Ativo"],
+    "Matricula Data": [
+        "15/03/2021", "2021-03-15", 44270, 44270.75, datetime(2020, 2, 1), "  01/02/2020 ", "",
+        None, "lixo", "13/12/2019", "31/01/2022", "2019-07-30 10:15:00", pd.Timestamp("2018-08-01"), "05/06/2017",
+    ],
+    "Data de Conclusão de Curso": [
+        "", "20/12/2023", 45280, None, "2023-06-30", "", "10/07/2022",
+        "01/01/2021", "30/11/2021", None, "", "2020-02-29", "31/12/2019", "12/06/2020",
+    ],
+    "Progresso (%)": [
+        "45,5%", "100", 75, 12.5, "", None, "abc", "1.234,5%", "-3", "0", "25", "49,99 %", 99.9, "50%",
+    ],
+    "Deficiências/Transtornos/Superdotação": [
+        "Não possui", "N", "na", "Deficiência visual", "", None, "NÃO", "Autismo",
+        "Nao se aplica", "não informado", "TDAH", "sem", "0", "Surdez",
+    ],
+    "Ano_Ingresso": [
+        2020, "2019/1", "turma 2018", 2021.0, None, "", "abc", 2017, "2020.2", math.nan, "1999", "3021", 2022, "2016",
+    ],
+    "Cota MEC": [
+        "Não optante", "ESCOLA PÚBLICA", "  ", None, "L1 - Renda inferior a 1,5 SM", "l1 - renda inferior a 1,5 sm",
+        "Cota 50%", "", "Não optante", "PPI", "PcD", "Ampla concorrência", "A.C.", "Não optante",
+    ],
+    "Campus": ["CBA", "CBA", "ROO", "ROO", "VGD", None, "CBA", "ROO", "VGD", "VGD", "CBA", "", "ROO", "CBA"],
+}
+
+
+def _bruto(**substituicoes) -> pd.DataFrame:
+    # Células vazias chegam do read_excel como NaN, nunca None
+    colunas = {**BRUTO, **substituicoes}
+    return pd.DataFrame(
+        {
+            nome: pd.Series([math.nan if valor is None else valor for valor in valores], dtype=object)
+            for nome, valores in colunas.items()
+        }
+    )
+
+
+def _referencia(bruto: pd.DataFrame) -> pd.DataFrame:
+    """O ``pre_processar`` original: cada coluna derivada por ``apply`` das funções escalares."""
+    resolvido = cd.resolver_colunas(bruto.columns)
+    df = bruto.rename(columns={origem: destino for destino, origem in resolvido.items()})
+    for canonica in cd.SINONIMOS_COLUNAS:
+        if canonica not in df.columns:
+            df[canonica] = pd.NA
+    for coluna in cd.COLUNAS_DATA:
+        df[coluna] = pd.to_datetime(df[coluna].apply(cd.parse_datetime_excel), errors="coerce")
+
+    if "situacao_curso" in resolvido and df["situacao_curso"].notna().any():
+        fonte_status = df["situacao_curso"]
+    else:
+        fonte_status = df["situacao_sistema"]
+    df["status_simplificado"] = fonte_status.apply(cd.simplificar_status)
+    df["percentual_progresso_num"] = df["percentual_progresso"].apply(cd.parse_percentual)
+    df["bucket_progresso"] = df["percentual_progresso_num"].apply(cd.bucketize_progresso)
+    df["tem_ne"] = df["necessidades_especiais"].apply(cd.tem_necessidade_especial)
+
+    hoje = pd.Timestamp(datetime.today().date())
+    df["tempo_curso_meses"] = [
+        cd.meses_entre(inicio, fim if status == "Concluído" else hoje) if not pd.isna(inicio) else math.nan
+        for inicio, fim, status in zip(df["data_matricula"], df["data_conclusao"], df["status_simplificado"])
+    ]
+    df["coorte_ano"] = [cd.parse_ano(ano, data) for ano, data in zip(df["ano_ingresso"], df["data_matricula"])]
+    return df
+
+
+def _valores(serie: pd.Series) -> list:
+    # Compara valores, não tipos: categorias, float32 e ausentes (None/NaN/NaT/NA) normalizados
+    return [None if pd.isna(valor) else valor for valor in serie.astype(object)]
+
+
+@pytest.mark.parametrize("coluna", cd.COLUNAS_DATA)
+def test_datas_iguais_a_conversao_celula_a_celula(coluna):
+    df, _ = cd.pre_processar(_bruto())
+    esperado = _referencia(_bruto())[coluna]
+    assert _valores(df[coluna].astype("datetime64[ns]")) == _valores(esperado.astype("datetime64[ns]"))
+
+
+@pytest.mark.parametrize(
+    "coluna",
+    ["status_simplificado", "bucket_progresso", "tem_ne", "tempo_curso_meses", "coorte_ano"],
+)
+def test_colunas_derivadas_iguais_as_funcoes_escalares(coluna):
+    df, _ = cd.pre_processar(_bruto())
+    assert _valores(df[coluna]) == _valores(_referencia(_bruto())[coluna])
+
+
+def test_percentual_igual_em_float32():
+    df, _ = cd.pre_processar(_bruto())
+    esperado = _referencia(_bruto())["percentual_progresso_num"].astype("float32")
+    assert _valores(df["percentual_progresso_num"]) == _valores(esperado)
+
+
+def test_status_vem_da_situacao_no_sistema_sem_situacao_no_curso():
+    bruto = _bruto(**{"Situação no Curso": [None] * N})
+    df, _ = cd.pre_processar(bruto)
+    assert _valores(df["status_simplificado"]) == _valores(_referencia(bruto)["status_simplificado"])
+
+
+@pytest.mark.parametrize("coluna, origem", [("cota_mec", "Cota MEC"), ("curso", "Descricao do Curso")])
+def test_categoricas_preservam_os_rotulos(coluna, origem):
+    df, _ = cd.pre_processar(_bruto())
+    assert isinstance(df[coluna].dtype, pd.CategoricalDtype)
+    assert _valores(df[coluna]) == _valores(_bruto()[origem])
+
+
+def test_derivadas_restritas_calculam_so_o_pedido():
+    df, _ = cd.pre_processar(_bruto(), derivadas=["bucket_progresso"])
+    assert "bucket_progresso" in df.columns
+    assert "coorte_ano" not in df.columns
+    assert _valores(df["bucket_progresso"]) == _valores(_referencia(_bruto())["bucket_progresso"])
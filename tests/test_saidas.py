@@ -0,0 +1,116 @@
+"""Gravação atômica das saídas, variantes comprimidas e o JSON em colunas."""
+import gzip
+import json
+import os
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+import construir_datasets as cd
+import saidas
+
+
+def test_gravacao_atomica_sem_temporario_e_sem_regravar_igual(tmp_path):
+    caminho = tmp_path / "turno.csv"
+    assert saidas.gravar_atomico(caminho, b"a;b\n1;2\n")
+    os.utime(caminho, ns=(0, 0))
+    assert not saidas.gravar_atomico(caminho, b"a;b\n1;2\n")
+    assert caminho.stat().st_mtime_ns == 0
+    assert saidas.gravar_atomico(caminho, b"a;b\n3;4\n")
+    assert caminho.read_bytes() == b"a;b\n3;4\n"
+    assert [arquivo.name for arquivo in tmp_path.iterdir()] == ["turno.csv"]
+
+
+def test_falha_na_troca_preserva_o_arquivo_anterior(tmp_path, monkeypatch):
+    caminho = tmp_path / "turno.csv"
+    saidas.gravar_atomico(caminho, b"anterior")
+
+    def falhar(self, destino):
+        raise OSError("disco cheio")
+
+    monkeypatch.setattr(Path, "replace", falhar)
+    with pytest.raises(OSError):
+        saidas.gravar_atomico(caminho, b"novo")
+    assert caminho.read_bytes() == b"anterior"
+    assert [arquivo.name for arquivo in tmp_path.iterdir()] == ["turno.csv"]
+
+
+def test_variantes_descomprimem_no_conteudo(tmp_path):
+    caminho = tmp_path / "turno.json"
+    conteudo = json.dumps({"colunas": ["turno"], "valores": [["Noturno"] * 100]}).encode("utf-8")
+    assert saidas.gravar_com_variantes(caminho, conteudo)
+    assert gzip.decompress((tmp_path / "turno.json.gz").read_bytes()) == conteudo
+    if ".br" in saidas.sufixos_disponiveis():
+        import brotli
+
+        assert brotli.decompress((tmp_path / "turno.json.br").read_bytes()) == conteudo
+
+
+def test_variante_ausente_e_refeita_mesmo_com_conteudo_igual(tmp_path):
+    caminho = tmp_path / "turno.json"
+    saidas.gravar_com_variantes(caminho, b'{"colunas":[]}')
+    (tmp_path / "turno.json.gz").unlink()
+    assert not saidas.gravar_com_variantes(caminho, b'{"colunas":[]}')
+    assert (tmp_path / "turno.json.gz").exists()
+
+
+def test_compressao_deterministica():
+    conteudo = b"campus;qtd\n" * 50
+    assert saidas.comprimir(conteudo) == saidas.comprimir(conteudo)
+
+
+def test_json_em_colunas_igual_ao_quadro():
+    df = pd.DataFrame(
+        {
+            "turno": pd.Categorical(["Noturno", None, "Matutino"]),
+            "ano": [2020, 2021, 2022],
+            "pct": [0.5, float("nan"), 1.0],
+        }
+    )
+    documento = json.loads(cd.quadro_para_json(df))
+    assert documento["colunas"] == ["turno", "ano", "pct"]
+    categorias = documento["categorias"]["turno"]
+    assert [None if codigo is None else categorias[codigo] for codigo in documento["valores"][0]] == [
+        "Noturno",
+        None,
+        "Matutino",
+    ]
+    assert documento["valores"][1:] == [[2020, 2021, 2022], [0.5, None, 1.0]]
+
+
+def _dataset(diretorio: Path, nome: str, valores) -> None:
+    caminho = diretorio / nome
+    caminho.write_text("x\n", encoding="utf-8")
+    caminho.with_suffix(".json").write_text(json.dumps({"colunas": ["x"], "valores": [valores]}), encoding="utf-8")
+
+
+def _pacote(diretorio: Path) -> tuple:
+    manifesto = json.loads((diretorio / saidas.NOME_PACOTE).read_text(encoding="utf-8"))
+    return manifesto, json.loads((diretorio / manifesto["arquivo"]).read_text(encoding="utf-8"))
+
+
+def test_pacote_versionado_pelo_conteudo(tmp_path):
+    _dataset(tmp_path, "turno.csv", [1, 2])
+    _dataset(tmp_path, "modalidade.csv", [3])
+    arquivo = saidas.gravar_pacote(tmp_path, ["modalidade.csv", "turno.csv", "ausente.csv"])
+
+    manifesto, pacote = _pacote(tmp_path)
+    assert manifesto["arquivo"] == arquivo
+    assert arquivo == f"datasets.bundle.{manifesto['sha256'][:12]}.json"
+    assert list(pacote["datasets"]) == ["modalidade.csv", "turno.csv"]
+    assert pacote["datasets"]["turno.csv"] == {"colunas": ["x"], "valores": [[1, 2]]}
+    assert (tmp_path / f"{arquivo}.gz").exists()
+    # Mesmo conteúdo: nada é regravado
+    assert saidas.gravar_pacote(tmp_path, ["modalidade.csv", "turno.csv"]) is None
+
+
+def test_pacote_anterior_mantido_e_os_mais_velhos_removidos(tmp_path):
+    nomes = []
+    for valores in ([1], [2], [3]):
+        _dataset(tmp_path, "turno.csv", valores)
+        nomes.append(saidas.gravar_pacote(tmp_path, ["turno.csv"]))
+    assert len(set(nomes)) == 3
+    restantes = {arquivo.name for arquivo in tmp_path.glob("datasets.bundle.*.json")}
+    assert restantes == set(nomes[1:])
+    assert not list(tmp_path.glob(f"{nomes[0]}*"))
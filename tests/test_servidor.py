@@ -0,0 +1,113 @@
+"""Servidor do dashboard: ETag/304, escolha da variante comprimida e arquivos ocultos."""
+import gzip
+import http.client
+import threading
+
+import pytest
+
+import servidor
+
+CONTEUDO = b'{"colunas":["turno"],"valores":[["Noturno","Matutino"]]}' * 20
+
+
+@pytest.fixture
+def web(tmp_path):
+    (tmp_path / "index.html").write_bytes(b"<html></html>")
+    (tmp_path / "turno.json").write_bytes(CONTEUDO)
+    (tmp_path / "turno.json.gz").write_bytes(gzip.compress(CONTEUDO, mtime=0))
+    (tmp_path / "turno.json.br").write_bytes(b"br:" + CONTEUDO)
+    (tmp_path / "datasets.bundle.0123456789ab.json").write_bytes(CONTEUDO)
+    (tmp_path / ".turno.json.tmp").write_bytes(b"pela metade")
+    (tmp_path / ".git").mkdir()
+    (tmp_path / ".git" / "config").write_bytes(b"[core]")
+    return tmp_path
+
+
+@pytest.fixture
+def requisitar(web):
+    """Função que faz um GET no servidor em execução e devolve (status, cabeçalhos, corpo)."""
+    instancia = servidor.criar_servidor(web, 0, "127.0.0.1", silencioso=True)
+    thread = threading.Thread(target=instancia.serve_forever, kwargs={"poll_interval": 0.01}, daemon=True)
+    thread.start()
+
+    def get(caminho, **cabecalhos):
+        conexao = http.client.HTTPConnection("127.0.0.1", instancia.server_address[1], timeout=5)
+        try:
+            conexao.request("GET", caminho, headers={nome.replace("_", "-"): v for nome, v in cabecalhos.items()})
+            resposta = conexao.getresponse()
+            return resposta.status, dict(resposta.getheaders()), resposta.read()
+        finally:
+            conexao.close()
+
+    yield get
+    instancia.shutdown()
+    instancia.server_close()
+
+
+@pytest.mark.parametrize(
+    "aceita, codificacao, corpo",
+    [
+        ("br, gzip", "br", b"br:" + CONTEUDO),
+        ("gzip", "gzip", gzip.compress(CONTEUDO, mtime=0)),
+        ("br;q=0, *", "gzip", gzip.compress(CONTEUDO, mtime=0)),
+        ("identity", None, CONTEUDO),
+    ],
+)
+def test_variante_escolhida_pelo_accept_encoding(requisitar, aceita, codificacao, corpo):
+    status, cabecalhos, recebido = requisitar("/turno.json", Accept_Encoding=aceita)
+    assert status == 200
+    assert cabecalhos.get("Content-Encoding") == codificacao
+    assert cabecalhos["Vary"] == "Accept-Encoding"
+    assert recebido == corpo
+
+
+def test_etag_devolve_304_por_variante(requisitar):
+    _, cabecalhos, _ = requisitar("/turno.json", Accept_Encoding="br")
+    etag = cabecalhos["ETag"]
+    status, cabecalhos, corpo = requisitar("/turno.json", Accept_Encoding="br", If_None_Match=etag)
+    assert (status, corpo, cabecalhos["ETag"]) == (304, b"", etag)
+    # Outra variante tem outro ETag: o do br não vale para o gzip
+    status, _, _ = requisitar("/turno.json", Accept_Encoding="gzip", If_None_Match=etag)
+    assert status == 200
+
+
+def test_sem_variante_comprime_em_memoria(requisitar):
+    status, cabecalhos, corpo = requisitar("/index.html", Accept_Encoding="gzip")
+    assert status == 200
+    assert cabecalhos["Content-Encoding"] == "gzip"
+    assert cabecalhos["ETag"].endswith('-gz"')
+    assert gzip.decompress(corpo) == b"<html></html>"
+
+
+def test_cache_longo_so_nos_arquivos_versionados(requisitar):
+    assert requisitar("/datasets.bundle.0123456789ab.json")[1]["Cache-Control"] == servidor.CACHE_VERSIONADO
+    assert requisitar("/turno.json")[1]["Cache-Control"] == servidor.CACHE_REVALIDAR
+
+
+@pytest.mark.parametrize(
+    "caminho",
+    [
+        "/.turno.json.tmp",
+        "/.git/config",
+        "/%2Egit/config",
+        "/%2egit/%63onfig",
+        "/x/../.git/config",
+        "/%2Eturno.json.tmp",
+    ],
+)
+def test_arquivos_ocultos_nao_sao_servidos(requisitar, caminho):
+    assert requisitar(caminho)[0] == 404
+
+
+@pytest.mark.parametrize(
+    "cabecalho, esperado",
+    [
+        (None, []),
+        ("gzip, deflate, br", ["br", "gzip"]),
+        ("gzip;q=0, br;q=0.5", ["br"]),
+        ("*;q=0.1, br;q=0", ["gzip"]),
+        ("gzip;q=abc", []),
+    ],
+)
+def test_codificacoes_aceitas(cabecalho, esperado):
+    assert servidor.codificacoes_aceitas(cabecalho) == esperado
@@ -1,4 +1,4 @@
-import { loadCSV } from '../utils/csv.js';
+import { loadDataset } from '../utils/csv.js';
 import {
   datasetMissing,
   getColorByIndex,
@@ -18,7 +18,7 @@ export async function renderCotasChart() {
 
   let rows;
   try {
-    rows = await loadCSV(DATASET_PATH);
+    rows = await loadDataset(DATASET_PATH);
   } catch (error) {
     datasetMissing('cotas.csv');
     renderPlaceholder(canvas, 'Sem dados de cotas no arquivo mestre.');
@@ -1,4 +1,4 @@
-import { loadCSV } from '../utils/csv.js';
+import { loadDataset } from '../utils/csv.js';
 import {
   datasetMissing,
   getColorByIndex,
@@ -18,7 +18,7 @@ export async function renderNaturezaChart() {
 
   let rows;
   try {
-    rows = await loadCSV(DATASET_PATH);
+    rows = await loadDataset(DATASET_PATH);
   } catch (error) {
     datasetMissing('natureza_participacao.csv');
     renderPlaceholder(canvas, 'Sem dados de natureza de participação no arquivo mestre.');
@@ -1,5 +1,6 @@
 
-import { loadCSV } from '../utils/csv.js';
+import { loadDataset } from '../utils/csv.js';
+import { createPivot, pivotSeries } from '../utils/pivot.js';
 import {
   datasetMissing,
   getColorByIndex,
@@ -9,24 +10,20 @@ import {
 
 const DATASET_PATH = 'datasets/natureza_escola.csv';
 
+const DIMENSIONS = ['natureza_participacao', 'tipo_escola_origem'];
+
 let chart;
 let currentGrouping = 'natureza'; // 'natureza' or 'escola'
-let originalRows = [];
+let pivot;
 
 function processData(grouping) {
   const group1 = grouping === 'natureza' ? 'natureza_participacao' : 'tipo_escola_origem';
-  const group2 = grouping === 'natureza' ? 'tipo_escola_origem' : 'natureza_participacao';
-
-  const labels = [...new Set(originalRows.map(row => row[group1]))];
-  const categories = [...new Set(originalRows.map(row => row[group2]))];
+  const { labels, series } = pivotSeries(pivot, group1);
 
-  const datasets = categories.map((category, index) => {
+  const datasets = series.map(({ key: category, data }, index) => {
     return {
       label: category,
-      data: labels.map(label => {
-        const row = originalRows.find(r => r[group1] === label && r[group2] === category);
-        return row ? Number(row.qtd) : 0;
-      }),
+      data,
       backgroundColor: getColorByIndex(index),
     };
   });
@@ -52,19 +49,21 @@ export async function renderNaturezaEscolaChart() {
     return;
   }
 
+  let rows;
   try {
-    originalRows = await loadCSV(DATASET_PATH);
+    rows = await loadDataset(DATASET_PATH);
   } catch (error) {
     datasetMissing(DATASET_PATH);
     renderPlaceholder(canvas, 'Sem dados para o gráfico de Natureza e Escola.');
     return;
   }
 
-  if (!originalRows.length) {
+  if (!rows.length) {
     datasetMissing(DATASET_PATH);
     renderPlaceholder(canvas, 'Sem registros para o gráfico de Natureza e Escola.');
     return;
   }
+  pivot = createPivot(rows, DIMENSIONS);
 
   const { labels, datasets } = processData(currentGrouping);
   const group1 = currentGrouping === 'natureza' ? 'Natureza de Participação' : 'Tipo de Escola de Origem';
@@ -1,4 +1,4 @@
-import { loadCSV } from '../utils/csv.js';
+import { loadDataset } from '../utils/csv.js';
 import { datasetMissing, getColorByIndex, numberFormatter } from '../utils/helpers.js';
 
 const DATASET_PATH = 'datasets/dist_percentual_progresso.csv';
@@ -11,7 +11,7 @@ export async function renderProgressoChart() {
 
   let rows;
   try {
-    rows = await loadCSV(DATASET_PATH);
+    rows = await loadDataset(DATASET_PATH);
   } catch (error) {
     datasetMissing('dist_percentual_progresso.csv');
     return;
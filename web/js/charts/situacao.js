@@ -1,4 +1,4 @@
-import { loadCSV } from '../utils/csv.js';
+import { loadDataset } from '../utils/csv.js';
 import {
   datasetMissing,
   getStatusColor,
@@ -18,7 +18,7 @@ export async function renderSituacaoChart() {
 
   let rows;
   try {
-    rows = await loadCSV(DATASET_PATH);
+    rows = await loadDataset(DATASET_PATH);
   } catch (error) {
     datasetMissing('alunos_por_situacao.csv');
     renderPlaceholder(canvas, 'Sem dados de situação acadêmica no arquivo mestre.');
@@ -1,4 +1,5 @@
-import { loadCSV } from '../utils/csv.js';
+import { loadDataset } from '../utils/csv.js';
+import { createPivot, pivotSeries } from '../utils/pivot.js';
 import {
   datasetMissing,
   getColorByIndex,
@@ -9,26 +10,20 @@ import {
 
 const DATASET_PATH = 'datasets/situacao_escola.csv';
 
+const DIMENSIONS = ['tipo_escola_origem', 'status_simplificado'];
+
 let chart;
 let currentGrouping = 'escola'; // 'escola' or 'situacao'
-let originalRows = [];
+let pivot;
 
 function processData(grouping) {
   const group1 = grouping === 'escola' ? 'tipo_escola_origem' : 'status_simplificado';
-  const group2 = grouping === 'escola' ? 'status_simplificado' : 'tipo_escola_origem';
-
-  const labels = [...new Set(originalRows.map((row) => row[group1]))];
-  const categories = [...new Set(originalRows.map((row) => row[group2]))].sort();
+  const { labels, series } = pivotSeries(pivot, group1, { sortColumns: true });
 
-  const datasets = categories.map((category, index) => {
+  const datasets = series.map(({ key: category, data }, index) => {
     return {
       label: category,
-      data: labels.map((label) => {
-        const row = originalRows.find(
-          (r) => r[group1] === label && r[group2] === category
-        );
-        return row ? Number(row.qtd) : 0;
-      }),
+      data,
       backgroundColor:
         grouping === 'escola'
           ? getStatusColor(category, index)
@@ -56,19 +51,21 @@ export async function renderSituacaoEscolaChart() {
   const canvas = document.getElementById('chartSituacaoEscola');
   if (!canvas) return;
 
+  let rows;
   try {
-    originalRows = await loadCSV(DATASET_PATH);
+    rows = await loadDataset(DATASET_PATH);
   } catch (error) {
     datasetMissing(DATASET_PATH);
     renderPlaceholder(canvas, 'Sem dados para o gráfico de Situação e Escola.');
     return;
   }
 
-  if (!originalRows.length) {
+  if (!rows.length) {
     datasetMissing(DATASET_PATH);
     renderPlaceholder(canvas, 'Sem registros para o gráfico de Situação e Escola.');
     return;
   }
+  pivot = createPivot(rows, DIMENSIONS);
 
   const { labels, datasets } = processData(currentGrouping);
   const group1Name =
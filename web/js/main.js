@@ -12,25 +12,34 @@ import { renderTransporteChart } from './charts/transporte.js';
 import { renderNaturezaEscolaChart } from './charts/natureza_escola.js';
 import { renderSituacaoEscolaChart } from './charts/situacao_escola.js';
 
-function loadCharts() {
-  const loaders = [
-    renderSituacaoChart(),
-    renderModalidadeChart(),
-    renderTurnoChart(),
-    renderProgressoChart(),
-    renderFormaIngressoChart(),
-    renderCotasChart(),
-    renderEtniaChart(),
-    renderNecessidadesChart(),
-    renderTipoEscolaChart(),
-    renderNaturezaChart(),
-    renderTransporteChart(),
-    renderNaturezaEscolaChart(),
-    renderSituacaoEscolaChart(),
-  ];
+import { scheduleCharts } from './utils/chart-scheduler.js';
+import { partitionFromURL, renderPartitionFilter } from './utils/partitions.js';
+
+// In page order; each one renders when its canvas nears the viewport
+const CHARTS = [
+  { canvasId: 'chartSituacao', render: renderSituacaoChart },
+  { canvasId: 'chartModalidade', render: renderModalidadeChart },
+  { canvasId: 'chartTurno', render: renderTurnoChart },
+  { canvasId: 'chartProgresso', render: renderProgressoChart },
+  { canvasId: 'chartFormaIngresso', render: renderFormaIngressoChart },
+  { canvasId: 'chartCotas', render: renderCotasChart },
+  { canvasId: 'chartEtnia', render: renderEtniaChart },
+  { canvasId: 'chartNecessidades', render: renderNecessidadesChart },
+  { canvasId: 'chartTipoEscola', render: renderTipoEscolaChart },
+  { canvasId: 'chartNatureza', render: renderNaturezaChart },
+  { canvasId: 'chartTransporte', render: renderTransporteChart },
+  { canvasId: 'chartNaturezaEscola', render: renderNaturezaEscolaChart },
+  { canvasId: 'chartSituacaoEscola', render: renderSituacaoEscolaChart },
+];
 
-  Promise.allSettled(loaders).catch((error) => {
-    console.error('Falha ao carregar os gráficos', error);
+function loadCharts() {
+  // ?campus=… or ?curso=… narrows every chart to that partition's shards
+  partitionFromURL();
+  renderPartitionFilter(document.getElementById('partitionFilter'));
+  scheduleCharts(CHARTS).then((results) => {
+    results
+      .filter((result) => result.status === 'rejected')
+      .forEach((result) => console.error('Falha ao carregar os gráficos', result.reason));
   });
 }
 
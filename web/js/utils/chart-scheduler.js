@@ -0,0 +1,127 @@
+// Viewport-driven chart rendering. Each chart is fetched and drawn only once
+// its container comes near the viewport; pending renders run one at a time in
+// idle callbacks so they do not pile up on the main thread. Charts that leave
+// the viewport have their animations stopped until they come back.
+
+// how far outside the viewport a chart starts loading
+const PRELOAD_MARGIN = '300px 0px';
+// upper bound for waiting on an idle period
+const IDLE_TIMEOUT_MS = 500;
+
+const requestIdle =
+  typeof globalThis.requestIdleCallback === 'function'
+    ? (callback) => globalThis.requestIdleCallback(callback, { timeout: IDLE_TIMEOUT_MS })
+    : (callback) => setTimeout(callback, 0);
+
+function chartFor(canvasId) {
+  const canvas = document.getElementById(canvasId);
+  return canvas && typeof Chart !== 'undefined' ? Chart.getChart(canvas) : undefined;
+}
+
+function pauseChart(entry) {
+  const chart = chartFor(entry.canvasId);
+  if (!chart || entry.savedAnimation !== undefined) {
+    return;
+  }
+  chart.stop();
+  entry.savedAnimation = chart.options.animation;
+  chart.options.animation = false;
+}
+
+function resumeChart(entry) {
+  const chart = chartFor(entry.canvasId);
+  if (!chart || entry.savedAnimation === undefined) {
+    return;
+  }
+  chart.options.animation = entry.savedAnimation;
+  entry.savedAnimation = undefined;
+}
+
+// `charts` is a list of {canvasId, render}; returns a promise settled once
+// every chart has been rendered (or failed)
+export function scheduleCharts(charts) {
+  const queue = [];
+  const settled = [];
+  let pumping = false;
+
+  function pump() {
+    if (pumping || !queue.length) {
+      return;
+    }
+    pumping = true;
+    requestIdle(async () => {
+      const entry = queue.shift();
+      try {
+        await entry.render();
+        if (!entry.visible) {
+          // scrolled away while loading
+          pauseChart(entry);
+        }
+        entry.resolve();
+      } catch (error) {
+        entry.reject(error);
+      }
+      pumping = false;
+      pump();
+    });
+  }
+
+  function enqueue(entry) {
+    if (entry.state !== 'waiting') {
+      return;
+    }
+    entry.state = 'queued';
+    queue.push(entry);
+    pump();
+  }
+
+  const entries = charts
+    .map(({ canvasId, render }) => {
+      const canvas = document.getElementById(canvasId);
+      if (!canvas) {
+        return null;
+      }
+      const entry = { canvasId, render, state: 'waiting', visible: true, savedAnimation: undefined };
+      settled.push(
+        new Promise((resolve, reject) => {
+          entry.resolve = resolve;
+          entry.reject = reject;
+        }),
+      );
+      // the wrapper outlives the canvas when a placeholder replaces it
+      entry.target = canvas.closest('.chart-wrapper') || canvas;
+      return entry;
+    })
+    .filter(Boolean);
+
+  if (typeof globalThis.IntersectionObserver !== 'function') {
+    entries.forEach(enqueue);
+    return Promise.allSettled(settled);
+  }
+
+  const byTarget = new Map(entries.map((entry) => [entry.target, entry]));
+  const observer = new IntersectionObserver(
+    (changes) => {
+      // render in page order when several charts show up at once
+      const visible = changes
+        .filter((change) => change.isIntersecting)
+        .map((change) => byTarget.get(change.target))
+        .sort((left, right) => entries.indexOf(left) - entries.indexOf(right));
+      visible.forEach((entry) => {
+        entry.visible = true;
+        enqueue(entry);
+        resumeChart(entry);
+      });
+      changes
+        .filter((change) => !change.isIntersecting)
+        .forEach((change) => {
+          const entry = byTarget.get(change.target);
+          entry.visible = false;
+          pauseChart(entry);
+        });
+    },
+    { rootMargin: PRELOAD_MARGIN },
+  );
+  entries.forEach((entry) => observer.observe(entry.target));
+  return Promise.allSettled(settled);
+}
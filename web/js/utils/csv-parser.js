@@ -0,0 +1,220 @@
+// Incremental CSV parser shared by the worker and the main-thread fallback.
+// Chunks are scanned with indexOf/slice as they arrive; only lines holding a
+// quote go through the field-by-field scanner. The result has the same
+// columnar layout as the JSON datasets ({colunas, valores}), with numeric
+// columns as Float64Array (NaN for empty fields).
+
+const QUOTE = 34;
+const LF = 10;
+const CR = 13;
+
+// Plain decimal numbers only: zero-padded codes ("001", "0123"), hex or
+// "Infinity" keep their column as text so labels round-trip unchanged
+const NUMERIC = /^-?(?:0|[1-9]\d*)(?:\.\d+)?(?:[eE][+-]?\d+)?$/;
+
+function detectDelimiter(sampleLine) {
+  const commaCount = (sampleLine.match(/,/g) || []).length;
+  const semicolonCount = (sampleLine.match(/;/g) || []).length;
+  return semicolonCount >= commaCount ? ';' : ',';
+}
+
+// Scans one record that contains quotes, possibly spanning several lines.
+// Returns null when the buffer ends before the record does.
+function scanQuotedRecord(text, start, delimiter, final) {
+  const fields = [];
+  let field = '';
+  let segment = start;
+  let pos = start;
+  let inQuotes = false;
+  while (pos < text.length) {
+    if (inQuotes) {
+      const quote = text.indexOf('"', pos);
+      if (quote < 0 || (quote + 1 >= text.length && !final)) {
+        // the closing quote (or what follows it) has not arrived yet
+        return null;
+      }
+      if (text.charCodeAt(quote + 1) === QUOTE) {
+        field += text.slice(segment, quote + 1);
+        pos = quote + 2;
+      } else {
+        field += text.slice(segment, quote);
+        inQuotes = false;
+        pos = quote + 1;
+      }
+      segment = pos;
+      continue;
+    }
+    const code = text.charCodeAt(pos);
+    if (code === QUOTE) {
+      field += text.slice(segment, pos);
+      inQuotes = true;
+      pos += 1;
+      segment = pos;
+    } else if (text[pos] === delimiter) {
+      fields.push((field + text.slice(segment, pos)).trim());
+      field = '';
+      pos += 1;
+      segment = pos;
+    } else if (code === LF || code === CR) {
+      fields.push((field + text.slice(segment, pos)).trim());
+      if (code === CR && text.charCodeAt(pos + 1) === LF) {
+        pos += 1;
+      }
+      return { fields, next: pos + 1 };
+    } else {
+      pos += 1;
+    }
+  }
+  if (!final) {
+    return null;
+  }
+  fields.push((field + text.slice(segment)).trim());
+  return { fields, next: text.length };
+}
+
+export class CSVStreamParser {
+  constructor() {
+    this.pending = '';
+    this.delimiter = null;
+    this.headers = null;
+    this.values = null;
+  }
+
+  push(chunk) {
+    this.pending += chunk;
+    this.consume(false);
+  }
+
+  finish() {
+    this.consume(true);
+    return this.result();
+  }
+
+  addRecord(fields) {
+    if (fields.length === 1 && fields[0] === '') {
+      // blank line
+      return;
+    }
+    if (this.headers === null) {
+      this.headers = fields;
+      this.values = fields.map(() => []);
+      return;
+    }
+    for (let column = 0; column < this.headers.length; column += 1) {
+      this.values[column].push(fields[column] ?? '');
+    }
+  }
+
+  // Fast path for a quote-free line: fields go straight into the columns,
+  // found with indexOf instead of an intermediate split array
+  addLine(text, start, stop) {
+    const { delimiter, values } = this;
+    let fieldStart = start;
+    for (let column = 0; column < values.length; column += 1) {
+      if (fieldStart > stop) {
+        values[column].push('');
+        continue;
+      }
+      let fieldStop = text.indexOf(delimiter, fieldStart);
+      if (fieldStop < 0 || fieldStop > stop) {
+        fieldStop = stop;
+      }
+      const field = text.slice(fieldStart, fieldStop).trim();
+      if (column === 0 && fieldStop === stop && field === '') {
+        // blank line
+        return;
+      }
+      values[column].push(field);
+      fieldStart = fieldStop + 1;
+    }
+  }
+
+  consume(final) {
+    const text = this.pending;
+    let pos = 0;
+    if (this.delimiter === null) {
+      const sample = text.trimStart();
+      const lineEnd = sample.search(/\r?\n/);
+      if (lineEnd < 0 && !final) {
+        return;
+      }
+      this.delimiter = detectDelimiter(lineEnd < 0 ? sample : sample.slice(0, lineEnd));
+    }
+
+    // next quote at or after pos; searched again only once pos passes it
+    let nextQuote = text.indexOf('"');
+    while (pos < text.length) {
+      const lineEnd = text.indexOf('\n', pos);
+      if (lineEnd < 0 && !final) {
+        break;
+      }
+      const end = lineEnd < 0 ? text.length : lineEnd;
+      if (nextQuote >= 0 && nextQuote < pos) {
+        nextQuote = text.indexOf('"', pos);
+      }
+      if (nextQuote < 0 || nextQuote >= end) {
+        const lineStop = end > pos && text.charCodeAt(end - 1) === CR ? end - 1 : end;
+        if (this.headers === null) {
+          this.addRecord(text.slice(pos, lineStop).split(this.delimiter).map((field) => field.trim()));
+        } else {
+          this.addLine(text, pos, lineStop);
+        }
+        pos = end + 1;
+        continue;
+      }
+      const scanned = scanQuotedRecord(text, pos, this.delimiter, final);
+      if (!scanned) {
+        break;
+      }
+      this.addRecord(scanned.fields);
+      pos = scanned.next;
+    }
+    this.pending = pos >= text.length ? '' : text.slice(pos);
+  }
+
+  result() {
+    if (this.headers === null) {
+      return { colunas: [], valores: [] };
+    }
+    const valores = this.values.map((column) => {
+      let filled = 0;
+      for (let row = 0; row < column.length; row += 1) {
+        if (column[row] !== '') {
+          if (!NUMERIC.test(column[row])) {
+            return column;
+          }
+          filled += 1;
+        }
+      }
+      if (!filled) {
+        return column;
+      }
+      const numbers = new Float64Array(column.length);
+      for (let row = 0; row < column.length; row += 1) {
+        numbers[row] = column[row] === '' ? NaN : Number(column[row]);
+      }
+      return numbers;
+    });
+    return { colunas: this.headers, valores };
+  }
+}
+
+// Parses a fetch Response chunk by chunk as the body streams in
+export async function parseCSVResponse(response) {
+  const parser = new CSVStreamParser();
+  if (!response.body || typeof response.body.getReader !== 'function') {
+    parser.push(await response.text());
+    return parser.finish();
+  }
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder('utf-8');
+  for (;;) {
+    const { done, value } = await reader.read();
+    if (done) {
+      break;
+    }
+    parser.push(decoder.decode(value, { stream: true }));
+  }
+  parser.push(decoder.decode());
+  return parser.finish();
+}
@@ -0,0 +1,17 @@
+import { parseCSVResponse } from './csv-parser.js';
+
+// Fetches and parses a CSV off the main thread; numeric columns come back as
+// transferred Float64Array buffers, so nothing is copied on the way back.
+self.onmessage = async ({ data: { id, url } }) => {
+  try {
+    const response = await fetch(url);
+    if (!response.ok) {
+      throw new Error(`Falha ao carregar CSV (${response.status})`);
+    }
+    const payload = await parseCSVResponse(response);
+    const transfer = payload.valores.filter((column) => ArrayBuffer.isView(column)).map((column) => column.buffer);
+    self.postMessage({ id, payload }, transfer);
+  } catch (error) {
+    self.postMessage({ id, error: error.message });
+  }
+};
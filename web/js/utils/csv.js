@@ -1,85 +1,187 @@
-function detectDelimiter(sampleLine) {
-  const commaCount = (sampleLine.match(/,/g) || []).length;
-  const semicolonCount = (sampleLine.match(/;/g) || []).length;
-  return semicolonCount >= commaCount ? ';' : ',';
-}
+import { parseCSVResponse } from './csv-parser.js';
+import { partitionDatasetPath } from './partitions.js';
 
-function parseCSVRows(text, delimiter) {
-  const rows = [];
-  let current = '';
-  let row = [];
-  let inQuotes = false;
+let worker;
+let nextRequest = 0;
+const requests = new Map();
 
-  for (let i = 0; i < text.length; i += 1) {
-    const char = text[i];
+async function loadCSVOnMainThread(url) {
+  const response = await fetch(url);
+  if (!response.ok) {
+    throw new Error(`Falha ao carregar CSV (${response.status})`);
+  }
+  return parseCSVResponse(response);
+}
 
-    if (char === '"') {
-      if (inQuotes && text[i + 1] === '"') {
-        current += '"';
-        i += 1;
-      } else {
-        inQuotes = !inQuotes;
-      }
-      continue;
+function csvWorker() {
+  if (worker !== undefined) {
+    return worker;
+  }
+  worker = null;
+  if (typeof Worker === 'undefined') {
+    return worker;
+  }
+  try {
+    worker = new Worker(new URL('./csv-worker.js', import.meta.url), { type: 'module' });
+  } catch (error) {
+    return worker;
+  }
+  worker.onmessage = ({ data }) => {
+    const request = requests.get(data.id);
+    requests.delete(data.id);
+    if (data.error) {
+      request.reject(new Error(data.error));
+    } else {
+      request.resolve(data.payload);
     }
+  };
+  worker.onerror = () => {
+    // e.g. no module worker support: retry what was queued on the main thread
+    worker.terminate();
+    worker = null;
+    requests.forEach((request) => loadCSVOnMainThread(request.url).then(request.resolve, request.reject));
+    requests.clear();
+  };
+  return worker;
+}
 
-    if (char === delimiter && !inQuotes) {
-      row.push(current.trim());
-      current = '';
-      continue;
-    }
+// Columnar CSV ({colunas, valores}, numeric columns as Float64Array), parsed
+// in a worker while the response streams in so the page stays responsive
+export function loadCSVColumns(url) {
+  const parser = csvWorker();
+  if (!parser) {
+    return loadCSVOnMainThread(url);
+  }
+  // the worker resolves relative URLs against its own script, not the page
+  const absolute = new URL(url, globalThis.location.href).href;
+  return new Promise((resolve, reject) => {
+    const id = nextRequest;
+    nextRequest += 1;
+    requests.set(id, { url: absolute, resolve, reject });
+    parser.postMessage({ id, url: absolute });
+  });
+}
+
+export async function loadCSV(url) {
+  return recordsFromColumns(await loadCSVColumns(url));
+}
 
-    if ((char === '\n' || char === '\r') && !inQuotes) {
-      if (char === '\r' && text[i + 1] === '\n') {
-        i += 1;
+function recordsFromColumns(payload) {
+  const columns = payload.colunas || [];
+  const values = payload.valores || [];
+  // categorical columns arrive as integer codes into these label lists
+  const labels = columns.map((column) => (payload.categorias || {})[column]);
+  const length = values.length ? values[0].length : 0;
+  const records = new Array(length);
+  for (let row = 0; row < length; row += 1) {
+    const record = {};
+    for (let column = 0; column < columns.length; column += 1) {
+      const value = values[column][row];
+      // missing values arrive as null (NaN in numeric CSV columns); the CSV had empty fields
+      if (value === null || value === undefined || Number.isNaN(value)) {
+        record[columns[column]] = '';
+      } else {
+        record[columns[column]] = labels[column] ? labels[column][value] : value;
       }
-      row.push(current.trim());
-      rows.push(row);
-      row = [];
-      current = '';
-      continue;
     }
-
-    current += char;
+    records[row] = record;
   }
+  return records;
+}
 
-  // push the last field
-  if (inQuotes) {
-    row.push(current.trim());
-  } else {
-    row.push(current.trim());
+export async function loadJSONColumns(url) {
+  const response = await fetch(url);
+  if (!response.ok) {
+    throw new Error(`Falha ao carregar JSON (${response.status})`);
   }
-  rows.push(row);
+  return recordsFromColumns(await response.json());
+}
 
-  return rows.filter((r) => !(r.length === 1 && r[0] === ''));
+// Counts from the local query API (`servidor.py --api`): `dimensions` is a
+// list of columns, `filters` maps a column to one accepted value or a list of
+// them. Resolves to records with the dimension columns plus `qtd`.
+export function loadAggregate(dimensions, filters = {}) {
+  const params = new URLSearchParams({ dims: dimensions.join(',') });
+  Object.entries(filters).forEach(([column, accepted]) => {
+    params.append('filter', `${column}:${[].concat(accepted).join('|')}`);
+  });
+  return loadJSONColumns(`api/agg?${params}`);
 }
 
-export async function loadCSV(url) {
-  const response = await fetch(url);
+const BUNDLE_MANIFEST = 'datasets.bundle.json';
+const bundles = new Map();
+
+function splitPath(path) {
+  const index = path.lastIndexOf('/');
+  return index < 0 ? ['', path] : [path.slice(0, index + 1), path.slice(index + 1)];
+}
+
+async function fetchBundle(directory) {
+  // The manifest is tiny and always revalidated; the hashed bundle it points to never changes
+  const response = await fetch(`${directory}${BUNDLE_MANIFEST}`, { cache: 'no-cache' });
   if (!response.ok) {
-    throw new Error(`Falha ao carregar CSV (${response.status})`);
+    return null;
+  }
+  const manifest = await response.json();
+  const bundleResponse = await fetch(`${directory}${manifest.arquivo}`);
+  if (!bundleResponse.ok) {
+    return null;
+  }
+  const bundle = await bundleResponse.json();
+  return bundle.datasets || null;
+}
+
+// One request per directory, shared by every chart that asks for a dataset in it
+export function loadBundle(directory = 'datasets/') {
+  if (!bundles.has(directory)) {
+    bundles.set(directory, fetchBundle(directory).catch(() => null));
   }
+  return bundles.get(directory);
+}
+
+const EMPTY_COLUMNS = { colunas: [], valores: [] };
 
-  const text = await response.text();
-  const trimmed = text.trim();
-  if (!trimmed) {
-    return [];
+// Column payload of a dataset from the active partition, the bundle or its
+// JSON sidecar; null when only the CSV exists. Datasets kept out of the bundle
+// (the cube) pass `bundle: false` and go straight to the sidecar.
+export async function loadDatasetColumns(csvPath, { bundle = true } = {}) {
+  const shardPath = await partitionDatasetPath(csvPath);
+  if (shardPath !== undefined) {
+    if (shardPath === null) {
+      return EMPTY_COLUMNS;
+    }
+    const response = await fetch(shardPath);
+    if (!response.ok) {
+      throw new Error(`Falha ao carregar JSON (${response.status})`);
+    }
+    return response.json();
   }
 
-  const firstLine = trimmed.split(/\r?\n/).find((line) => line.trim().length > 0);
-  const delimiter = detectDelimiter(firstLine || ',');
-  const rows = parseCSVRows(text, delimiter);
-  if (!rows.length) {
-    return [];
+  if (bundle) {
+    const [directory, name] = splitPath(csvPath);
+    const datasets = await loadBundle(directory);
+    if (datasets && datasets[name]) {
+      return datasets[name];
+    }
   }
 
-  const headers = rows[0].map((header) => header.trim());
-  const dataRows = rows.slice(1);
-  return dataRows.map((entries) => {
-    const record = {};
-    headers.forEach((header, index) => {
-      record[header] = entries[index] ?? '';
-    });
-    return record;
-  });
+  const jsonPath = csvPath.replace(/\.csv$/, '.json');
+  if (jsonPath !== csvPath) {
+    try {
+      const response = await fetch(jsonPath);
+      if (response.ok) {
+        return await response.json();
+      }
+    } catch (error) {
+      // fall back to the CSV
+    }
+  }
+  return null;
+}
+
+// Prefer the bundle, then the column JSON written next to each CSV (no text
+// parsing); datasets built before either existed still load from the CSV.
+export async function loadDataset(csvPath) {
+  const payload = await loadDatasetColumns(csvPath);
+  return payload ? recordsFromColumns(payload) : loadCSV(csvPath);
 }
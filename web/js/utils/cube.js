@@ -0,0 +1,150 @@
+import { loadCSVColumns, loadDatasetColumns } from './csv.js';
+
+export const CUBE_PATH = 'datasets/cubo.csv';
+
+const cubes = new Map();
+
+function factorize(values) {
+  const index = new Map();
+  const labels = [];
+  const codes = new Int32Array(values.length);
+  values.forEach((value, row) => {
+    if (value === null || value === undefined || value === '' || Number.isNaN(value)) {
+      codes[row] = -1;
+      return;
+    }
+    let code = index.get(value);
+    if (code === undefined) {
+      code = labels.length;
+      index.set(value, code);
+      labels.push(value);
+    }
+    codes[row] = code;
+  });
+  return { labels, codes };
+}
+
+// Sparse count cube (COO): per dimension an Int32Array of codes into its
+// label list (-1 = missing), plus the count of each combination
+function cubeFromColumns(payload) {
+  const columns = payload.colunas || [];
+  const countColumn = columns.indexOf('qtd');
+  const dimensions = columns.filter((_, column) => column !== countColumn);
+  const labels = {};
+  const codes = {};
+  dimensions.forEach((dimension) => {
+    const values = payload.valores[columns.indexOf(dimension)];
+    const categories = (payload.categorias || {})[dimension];
+    if (categories) {
+      labels[dimension] = categories;
+      codes[dimension] = Int32Array.from(values, (value) => value ?? -1);
+    } else {
+      ({ labels: labels[dimension], codes: codes[dimension] } = factorize(values));
+    }
+  });
+  const counts = Float64Array.from(payload.valores[countColumn] || [], Number);
+  return { dimensions, labels, codes, counts, length: counts.length };
+}
+
+// The cube is not in datasets.bundle: it is fetched only when a view asks for it
+async function fetchCube(path) {
+  const payload = await loadDatasetColumns(path, { bundle: false });
+  if (payload) {
+    return cubeFromColumns(payload);
+  }
+  // CSV fallback: same layout, with labels instead of codes
+  return cubeFromColumns(await loadCSVColumns(path));
+}
+
+export function loadCube(path = CUBE_PATH) {
+  if (!cubes.has(path)) {
+    const pending = fetchCube(path);
+    // a failed load is retried by the next caller
+    pending.catch(() => cubes.delete(path));
+    cubes.set(path, pending);
+  }
+  return cubes.get(path);
+}
+
+function checkDimension(cube, dimension) {
+  if (!cube.codes[dimension]) {
+    throw new Error(`Dimensão desconhecida no cubo: ${dimension}`);
+  }
+}
+
+// Sums the cube over every dimension not in `groupBy`, keeping only the rows
+// whose labels match `filters` ({dimension: label or [labels]}; '' = missing).
+// Returns records shaped like the dataset CSVs: {dimension: label, ..., qtd}.
+export function rollup(cube, groupBy = [], filters = {}) {
+  groupBy.forEach((dimension) => checkDimension(cube, dimension));
+  const masks = Object.entries(filters).map(([dimension, wanted]) => {
+    checkDimension(cube, dimension);
+    const accepted = new Set(Array.isArray(wanted) ? wanted : [wanted]);
+    // slot 0 is the missing code (-1)
+    const allowed = new Uint8Array(cube.labels[dimension].length + 1);
+    allowed[0] = accepted.has('') ? 1 : 0;
+    cube.labels[dimension].forEach((label, code) => {
+      allowed[code + 1] = accepted.has(label) ? 1 : 0;
+    });
+    return [cube.codes[dimension], allowed];
+  });
+
+  const groupCodes = groupBy.map((dimension) => cube.codes[dimension]);
+  const radix = groupBy.map((dimension) => cube.labels[dimension].length + 1);
+  const numericKeys = radix.reduce((total, base) => total * base, 1) <= Number.MAX_SAFE_INTEGER;
+  const totals = new Map();
+  for (let row = 0; row < cube.length; row += 1) {
+    let keep = true;
+    for (let mask = 0; mask < masks.length; mask += 1) {
+      if (!masks[mask][1][masks[mask][0][row] + 1]) {
+        keep = false;
+        break;
+      }
+    }
+    if (!keep) {
+      continue;
+    }
+    let key = numericKeys ? 0 : '';
+    for (let group = 0; group < groupCodes.length; group += 1) {
+      const code = groupCodes[group][row] + 1;
+      key = numericKeys ? key * radix[group] + code : `${key}${code},`;
+    }
+    totals.set(key, (totals.get(key) || 0) + cube.counts[row]);
+  }
+
+  const entries = [];
+  totals.forEach((qtd, key) => {
+    const codes = numericKeys ? [] : key.split(',', groupBy.length).map(Number);
+    if (numericKeys) {
+      let rest = key;
+      for (let group = groupBy.length - 1; group >= 0; group -= 1) {
+        codes[group] = rest % radix[group];
+        rest = Math.floor(rest / radix[group]);
+      }
+    }
+    entries.push([codes, qtd]);
+  });
+  // code order: missing first, then labels as listed in the cube
+  entries.sort(([left], [right]) => {
+    for (let group = 0; group < left.length; group += 1) {
+      if (left[group] !== right[group]) {
+        return left[group] - right[group];
+      }
+    }
+    return 0;
+  });
+  return entries.map(([codes, qtd]) => {
+    const record = {};
+    groupBy.forEach((dimension, group) => {
+      record[dimension] = codes[group] === 0 ? '' : cube.labels[dimension][codes[group] - 1];
+    });
+    record.qtd = qtd;
+    return record;
+  });
+}
+
+// Labels of a dimension, in code order
+export function dimensionLabels(cube, dimension) {
+  checkDimension(cube, dimension);
+  return cube.labels[dimension];
+}
@@ -0,0 +1,91 @@
+// Per-campus / per-course dataset shards written by `--particoes`. When a
+// partition is active, dashboard datasets are read from its directory
+// instead of the global one, so only the selected slice is downloaded.
+
+export const PARTITION_ROOT = 'datasets/particoes/';
+const PARTITION_INDEX = `${PARTITION_ROOT}indice.json`;
+// URL parameters that select a partition, in order of precedence
+export const PARTITION_DIMENSIONS = ['curso', 'campus', 'polo'];
+const DIMENSION_LABELS = { campus: 'Campus', curso: 'Curso', polo: 'Polo' };
+
+let indexPromise;
+let active = null;
+
+export function loadPartitionIndex() {
+  if (!indexPromise) {
+    indexPromise = fetch(PARTITION_INDEX, { cache: 'no-cache' })
+      .then((response) => (response.ok ? response.json() : null))
+      .catch(() => null);
+  }
+  return indexPromise;
+}
+
+export function setPartition(dimension, value) {
+  active = dimension && value ? { dimension, value } : null;
+}
+
+export function activePartition() {
+  return active;
+}
+
+// Reads ?campus=… / ?curso=… / ?polo=… from the page URL
+export function partitionFromURL(search = globalThis.location ? globalThis.location.search : '') {
+  const params = new URLSearchParams(search);
+  const dimension = PARTITION_DIMENSIONS.find((name) => params.get(name));
+  setPartition(dimension, dimension ? params.get(dimension) : null);
+  return active;
+}
+
+// Where a global dataset lives in the active partition: undefined when no
+// partition applies, null when the partition has no such dataset (no rows),
+// otherwise the path of its column JSON
+export async function partitionDatasetPath(csvPath) {
+  if (!active || !csvPath.startsWith('datasets/') || csvPath.indexOf('/', 'datasets/'.length) >= 0) {
+    return undefined;
+  }
+  const index = await loadPartitionIndex();
+  const entries = (index && index.dimensoes && index.dimensoes[active.dimension]) || [];
+  const entry = entries.find((candidate) => String(candidate.valor) === active.value);
+  if (!entry) {
+    throw new Error(`Partição desconhecida: ${active.dimension}=${active.value}`);
+  }
+  const name = csvPath.slice('datasets/'.length);
+  if (!entry.datasets[name]) {
+    return null;
+  }
+  return `${PARTITION_ROOT}${entry.diretorio}/${name.replace(/\.csv$/, '.json')}`;
+}
+
+// Fills a <select> with one option per partition; choosing one reloads the
+// page with the matching URL parameter
+export async function renderPartitionFilter(select) {
+  if (!select) {
+    return;
+  }
+  const index = await loadPartitionIndex();
+  if (!index || !index.dimensoes) {
+    return;
+  }
+  Object.entries(index.dimensoes).forEach(([dimension, entries]) => {
+    if (!entries.length) {
+      return;
+    }
+    const group = document.createElement('optgroup');
+    group.label = DIMENSION_LABELS[dimension] || dimension;
+    entries.forEach((entry) => {
+      const option = document.createElement('option');
+      option.value = new URLSearchParams({ [dimension]: entry.valor }).toString();
+      option.textContent = String(entry.valor);
+      option.selected = Boolean(active && active.dimension === dimension && active.value === String(entry.valor));
+      group.appendChild(option);
+    });
+    select.appendChild(group);
+  });
+  select.addEventListener('change', () => {
+    globalThis.location.search = select.value;
+  });
+  const form = select.closest('form');
+  if (form) {
+    form.hidden = false;
+  }
+}
@@ -0,0 +1,74 @@
+// Keyed index over long-format cross-tab rows (two label columns plus a
+// count). It is built once per dataset load; switching orientation or summing
+// out a dimension then costs one Map lookup per cell instead of a row scan.
+export function createPivot(rows, dimensions, valueField = 'qtd') {
+  const [first, second] = dimensions;
+  const byFirst = new Map();
+  // Maps keep insertion order, so labels come out in order of appearance
+  const secondLabels = new Map();
+  rows.forEach((row) => {
+    const outer = row[first];
+    const inner = row[second];
+    let cells = byFirst.get(outer);
+    if (!cells) {
+      cells = new Map();
+      byFirst.set(outer, cells);
+    }
+    cells.set(inner, (cells.get(inner) || 0) + (Number(row[valueField]) || 0));
+    secondLabels.set(inner, true);
+  });
+  return { dimensions: [first, second], byFirst, secondLabels: [...secondLabels.keys()] };
+}
+
+function checkDimension(pivot, dimension) {
+  if (!pivot.dimensions.includes(dimension)) {
+    throw new Error(`Dimensão desconhecida na tabela: ${dimension}`);
+  }
+}
+
+export function pivotLabels(pivot, dimension) {
+  checkDimension(pivot, dimension);
+  return dimension === pivot.dimensions[0] ? [...pivot.byFirst.keys()] : pivot.secondLabels;
+}
+
+export function pivotValue(pivot, rowDimension, rowLabel, columnLabel) {
+  checkDimension(pivot, rowDimension);
+  const [outer, inner] =
+    rowDimension === pivot.dimensions[0] ? [rowLabel, columnLabel] : [columnLabel, rowLabel];
+  const cells = pivot.byFirst.get(outer);
+  return (cells && cells.get(inner)) || 0;
+}
+
+// Chart-ready series with `rowDimension` on the category axis and one series
+// per label of the other dimension (optionally sorted)
+export function pivotSeries(pivot, rowDimension, { sortColumns = false } = {}) {
+  checkDimension(pivot, rowDimension);
+  const columnDimension = pivot.dimensions.find((dimension) => dimension !== rowDimension);
+  const labels = pivotLabels(pivot, rowDimension);
+  const columns = [...pivotLabels(pivot, columnDimension)];
+  if (sortColumns) {
+    columns.sort();
+  }
+  const series = columns.map((column) => ({
+    key: column,
+    data: labels.map((label) => pivotValue(pivot, rowDimension, label, column)),
+  }));
+  return { labels, series };
+}
+
+// Totals per label of `dimension`, with the other dimension summed out
+export function pivotTotals(pivot, dimension) {
+  checkDimension(pivot, dimension);
+  const totals = new Map();
+  const byRow = dimension === pivot.dimensions[0];
+  if (!byRow) {
+    pivot.secondLabels.forEach((label) => totals.set(label, 0));
+  }
+  pivot.byFirst.forEach((cells, outer) => {
+    cells.forEach((value, inner) => {
+      const key = byRow ? outer : inner;
+      totals.set(key, (totals.get(key) || 0) + value);
+    });
+  });
+  return totals;
+}